@@ -64,6 +64,11 @@ class AIServiceStub(object):
                 request_serializer=ai__pb2.DeleteProjectRequest.SerializeToString,
                 response_deserializer=ai__pb2.IndexingResponse.FromString,
                 _registered_method=True)
+        self.ApplyIndexBatch = channel.unary_unary(
+                '/ai.AIService/ApplyIndexBatch',
+                request_serializer=ai__pb2.IndexBatchRequest.SerializeToString,
+                response_deserializer=ai__pb2.IndexBatchReply.FromString,
+                _registered_method=True)
 
 
 class AIServiceServicer(object):
@@ -105,6 +110,13 @@ class AIServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def ApplyIndexBatch(self, request, context):
+        """Mixed upserts and deletes, applied in batched vector-store calls (HTTP: POST /index/batch)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_AIServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -138,6 +150,11 @@ def add_AIServiceServicer_to_server(servicer, server):
                     request_deserializer=ai__pb2.DeleteProjectRequest.FromString,
                     response_serializer=ai__pb2.IndexingResponse.SerializeToString,
             ),
+            'ApplyIndexBatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.ApplyIndexBatch,
+                    request_deserializer=ai__pb2.IndexBatchRequest.FromString,
+                    response_serializer=ai__pb2.IndexBatchReply.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'ai.AIService', rpc_method_handlers)
@@ -310,3 +327,30 @@ class AIService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def ApplyIndexBatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/ai.AIService/ApplyIndexBatch',
+            ai__pb2.IndexBatchRequest.SerializeToString,
+            ai__pb2.IndexBatchReply.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,97 @@
+"""
+In-memory catalog benchmark: tool-query latency and memory per record.
+
+Seeds the fake Mongo with deterministic projects and users, then runs the
+`find_projects` / `find_users` tool queries against MongoDB (mongomock, an
+in-process scan with no network round trip, so a lower bound for the real
+thing) and against the catalog, plus the catalog lookup on its own, with
+and without its result cache (the tools also build and serialize every
+matching row). Memory is measured with
+tracemalloc while loading the catalog and compared with holding the raw
+Mongo records.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_catalog --projects 20000 --users 50000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import fakes
+
+QUERIES = [
+    ("find_projects", {"skill": "python"}),
+    ("find_projects", {"title": "health"}),
+    ("find_projects", {"skill": "react", "title": "education"}),
+    ("find_users", {"role": "mentor"}),
+    ("find_users", {"role": "leader", "interest": "climate"}),
+]
+
+
+def _time(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def _traced(fn):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = fn()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return value, sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog vs MongoDB for tool queries.")
+    parser.add_argument("--projects", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = fakes.install()
+    fakes.seed_database(db, n_projects=args.projects, n_users=args.users)
+    from services import catalog, db_query_service
+
+    records = args.projects + args.users
+    raw, raw_bytes = _traced(lambda: (
+        list(db["projects"].find({}, catalog.PROJECT_FIELDS)), list(db["users"].find({}, catalog.USER_FIELDS))
+    ))
+    loaded, catalog_bytes = _traced(catalog._load)
+    catalog._catalog.set(loaded)
+    stats = loaded.stats()
+    print(f"{args.projects} projects, {args.users} users, {stats['skills']} skills, {stats['roles']} roles\n")
+    print(f"raw Mongo records   {raw_bytes / records:8.0f} bytes/record (tracemalloc)")
+    print(f"catalog             {catalog_bytes / records:8.0f} bytes/record (tracemalloc)")
+    print(f"catalog estimate    {stats['bytes_per_project']:8d} bytes/project, {stats['bytes_per_user']} bytes/user\n")
+    del raw
+
+    header = f"{'query':<46}{'rows':>7}{'mongo tool ms':>15}{'catalog tool ms':>17}{'cold us':>9}{'cached us':>11}"
+    print(header)
+    print("-" * len(header))
+    for tool, kwargs in QUERIES:
+        fn = getattr(db_query_service, tool)
+        catalog.CATALOG_ENABLED = False
+        mongo = _time(lambda: fn(**kwargs), max(1, args.repeat // 5))
+        catalog.CATALOG_ENABLED = True
+        cached = _time(lambda: fn(**kwargs), args.repeat)
+        # The catalog lookup alone, without building and serializing the tool's JSON
+        cold = _time(lambda: (loaded._results.clear(), getattr(loaded, tool)(**kwargs)), args.repeat)
+        warm = _time(lambda: getattr(loaded, tool)(**kwargs), args.repeat)
+        rows = len(getattr(loaded, tool)(**kwargs))
+        label = f"{tool}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})"
+        print(f"{label:<46}{rows:>7}{mongo * 1000:>15.2f}{cached * 1000:>17.2f}{cold * 1e6:>9.1f}{warm * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
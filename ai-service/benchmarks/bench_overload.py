@@ -0,0 +1,120 @@
+"""
+Overload benchmark: does a /chat burst hurt the cheap endpoints?
+
+Runs `main.app` in-process against the fakes, floods /chat with far more
+concurrent requests than it can serve and, at the same time, drives
+/recommendations at a modest concurrency. Reports /recommendations latency
+and the /chat outcomes (served vs. shed with 503) with admission control
+off and on.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_overload
+    python -m benchmarks.bench_overload --chat-concurrency 200 --requests 400 --llm-latency-ms 800
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import anyio.to_thread
+import httpx
+
+from benchmarks import fakes, load_test
+
+# anyio's default worker-thread limit, used when admission control is off
+DEFAULT_THREADS = 40
+
+
+async def _flood_chat(client, stop, concurrency, outcomes):
+    async def worker(n):
+        i = n
+        while not stop.is_set():
+            try:
+                response = await client.post("/chat", json={"query": f"{load_test.CHAT_QUERIES[i % 6]} #{i}"})
+                outcomes[response.status_code] += 1
+                if response.status_code == 503:
+                    # A well-behaved client backs off; keep the pressure up, but not in a hot loop
+                    await asyncio.sleep(0.05)
+            except httpx.HTTPError:
+                outcomes["error"] += 1
+            i += concurrency
+
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+
+
+async def _cheap_requests(client, total, concurrency):
+    latencies, statuses = [], Counter()
+    counter = iter(range(total))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            response = await client.post("/recommendations", json={"query_text": f"{load_test.PROFILE_TEXTS[i % 4]} {i}"})
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return sorted(latencies), statuses
+
+
+async def run_mode(app, enabled, args):
+    from core import admission
+    admission.ADMISSION_ENABLED = enabled
+    # The in-process transport skips the lifespan, so size the thread pool here
+    anyio.to_thread.current_default_thread_limiter().total_tokens = DEFAULT_THREADS
+    admission.configure_thread_pool()
+
+    outcomes = Counter()
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=300) as client:
+        flood = asyncio.create_task(_flood_chat(client, stop, args.chat_concurrency, outcomes))
+        # Let the burst saturate /chat first
+        await asyncio.sleep(1.0)
+        latencies, statuses = await _cheap_requests(client, args.requests, args.concurrency)
+        stop.set()
+        await flood
+    return {
+        "mode": "on" if enabled else "off",
+        "p50_ms": load_test.percentile(latencies, 50) * 1000,
+        "p99_ms": load_test.percentile(latencies, 99) * 1000,
+        "cheap_errors": sum(n for s, n in statuses.items() if s != 200),
+        "chat_ok": outcomes[200],
+        "chat_shed": outcomes[503],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/recommendations latency under a /chat burst, admission off vs on.")
+    parser.add_argument("--chat-concurrency", type=int, default=120, help="Concurrent /chat clients in the burst")
+    parser.add_argument("--requests", type=int, default=300, help="/recommendations requests measured")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent /recommendations clients")
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--http-latency-ms", type=float, default=150.0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+    from benchmarks import fake_app
+    config = fakes.FakeConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        embed_latency_ms=args.embed_latency_ms,
+        http_latency_ms=args.http_latency_ms,
+    )
+    app = fake_app.create_app(config)
+
+    results = [asyncio.run(run_mode(app, enabled, args)) for enabled in (False, True)]
+    header = f"{'admission':<11}{'rec p50 ms':>12}{'rec p99 ms':>12}{'rec errors':>12}{'chat 200':>10}{'chat 503':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['mode']:<11}{r['p50_ms']:>12.1f}{r['p99_ms']:>12.1f}{r['cheap_errors']:>12}"
+              f"{r['chat_ok']:>10}{r['chat_shed']:>10}")
+
+
+if __name__ == "__main__":
+    main()
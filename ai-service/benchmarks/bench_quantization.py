@@ -0,0 +1,91 @@
+"""
+Quantized snapshot benchmark: memory footprint, query latency and recall@10.
+
+Writes the same synthetic corpus as float32, float16 and int8 snapshots and
+runs identical queries against each. Recall@10 is measured against exact
+float32 search, with and without the float32 re-scoring step.
+
+The corpus is clustered (documents are noisy copies of topic centroids) so
+that neighbours are close together, as with real embeddings.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_quantization --docs 100000 --queries 200
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from benchmarks import fakes
+from services import index_snapshot
+
+
+def clustered_corpus(n_docs, dim, n_clusters=200, noise=0.6, seed=0):
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((n_clusters, dim), dtype=np.float32)
+    assignment = rng.integers(0, n_clusters, n_docs)
+    docs = centroids[assignment] + noise * rng.standard_normal((n_docs, dim), dtype=np.float32)
+    return docs, rng
+
+
+def run(n_docs, n_queries, dim, k, multiplier):
+    docs, rng = clustered_corpus(n_docs, dim)
+    ids = [f"project_{i:024x}" for i in range(n_docs)]
+    metadatas = [{"doc_type": "project"}] * n_docs
+    queries = docs[rng.integers(0, n_docs, n_queries)] + 0.3 * rng.standard_normal((n_queries, dim), dtype=np.float32)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="modx-quant-") as root:
+        snapshots = {}
+        for mode in index_snapshot.QUANTIZATION_MODES:
+            directory = os.path.join(root, mode)
+            version = index_snapshot.write_snapshot(ids, docs, metadatas, directory, quantization=mode)
+            snapshots[mode] = index_snapshot.IndexSnapshot(os.path.join(directory, version), quantization=mode)
+
+        exact = [set(snapshots["none"].search_ids(q, k)) for q in queries]
+        for mode, snapshot in snapshots.items():
+            variants = [("exact", None)] if mode == "none" else [("no re-score", 1), (f"re-score x{multiplier}", multiplier)]
+            for label, mult in variants:
+                latencies, hits = [], 0
+                for q, truth in zip(queries, exact):
+                    start = time.perf_counter()
+                    found = snapshot.search_ids(q, k, rescore_multiplier=mult)
+                    latencies.append(time.perf_counter() - start)
+                    hits += len(truth.intersection(found))
+                latencies.sort()
+                results[(mode, label)] = {
+                    "scan_mb": snapshot.scan_nbytes() / 1024 / 1024,
+                    "p50_ms": statistics.median(latencies) * 1000,
+                    "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+                    "recall": hits / (k * len(queries)),
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized snapshot benchmark.")
+    parser.add_argument("--docs", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=fakes.EMBEDDING_DIM)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore-multiplier", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.docs, args.queries, args.dim, args.k, args.rescore_multiplier)
+    print(f"{args.docs} vectors x {args.dim} dims, {args.queries} queries, k={args.k}\n")
+    header = f"{'storage':<10}{'search':<16}{'scan MB':>9}{'p50 ms':>9}{'p95 ms':>9}{f'recall@{args.k}':>11}"
+    print(header)
+    print("-" * len(header))
+    for (mode, label), r in results.items():
+        print(f"{mode:<10}{label:<16}{r['scan_mb']:>9.1f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['recall']:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
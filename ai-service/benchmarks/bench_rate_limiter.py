@@ -0,0 +1,56 @@
+"""
+Embedding throughput with the Gemini rate limiter enabled.
+
+The other benchmarks run with GEMINI_RATE_LIMIT_ENABLED=false, so they cannot
+see a quota bucket that throttles more than configured. This one embeds
+through the real provider path (fake Gemini client, no simulated latency)
+with the limiter on, and checks that the calls are only held back by the
+buckets that should apply. With the defaults that is GEMINI_EMBED_RPM
+(1500/min, a burst of 250), so `--calls` up to the burst should take no
+measurable time. Exits 1 if throughput falls below what the embed quota
+allows.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_rate_limiter
+    python -m benchmarks.bench_rate_limiter --calls 400
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding calls per second with the rate limiter enabled.")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--slack-seconds", type=float, default=0.5, help="Allowed time beyond the quota's own wait")
+    args = parser.parse_args()
+
+    os.environ["GEMINI_RATE_LIMIT_ENABLED"] = "true"
+    os.environ.setdefault("EMBEDDING_PROVIDER", "gemini")
+    from benchmarks import fakes
+    fakes.install(fakes.FakeConfig(llm_latency_ms=0, embed_latency_ms=0, http_latency_ms=0, jitter=0))
+    from core import rate_limiter
+    from services import vector_store
+
+    bucket = rate_limiter.TokenBucket(rate_limiter.scheduler.endpoint_rpm.get("embed", 0))
+    # Time the embed bucket alone needs for `calls` tokens, starting full
+    expected = 0.0 if bucket.rate <= 0 else max(0.0, (args.calls - bucket.capacity) / bucket.rate)
+
+    start = time.perf_counter()
+    for i in range(args.calls):
+        vector_store.get_embeddings(f"rate limiter throughput {i}")
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.calls} embed calls in {elapsed:.2f} s ({args.calls / elapsed:.0f}/s); "
+          f"the embed quota alone allows {expected:.2f} s")
+    if elapsed > expected + args.slack_seconds:
+        print("FAIL: embedding calls are throttled beyond GEMINI_EMBED_RPM")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
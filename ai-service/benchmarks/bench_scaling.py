@@ -0,0 +1,225 @@
+"""
+Scaling benchmark: indexing, reindexing, retrieval and memory as the corpus grows.
+
+For each scale factor, a fresh process loads a synthetic corpus
+(benchmarks/corpus.py) of `scale x` the base size into the local fakes, with
+deterministic hashing embeddings and no simulated latency, and measures:
+
+- full index: the first /index-new-data run (embed everything, publish the
+  snapshot);
+- incremental: an index run after editing 1% of projects and users, and a
+  run with nothing to do;
+- full reindex: a blue/green rebuild into a new collection, switched in;
+- query latency (p50/p95): project search, member matching, related
+  projects and the find_projects tool;
+- memory: peak RSS of the process and the size of the snapshot matrix.
+
+Each scale runs in its own process so peak RSS is per size. Results are
+printed as tables and can be saved and compared across releases, like
+load_test.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_scaling
+    python -m benchmarks.bench_scaling --scales 1,10,100,1000 --save benchmarks/results/scaling.json
+    python -m benchmarks.bench_scaling --compare benchmarks/results/scaling.json
+
+The 1000x scale (200k projects, 300k users by default) needs several GB of
+memory and a long run, mostly inside the in-process Chroma.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks import corpus, load_test
+
+RESULT_PREFIX = "SCALING_RESULT "
+# Share of projects and users edited before the incremental run
+EDIT_FRACTION = 0.01
+# Metrics where a larger value is a regression, compared by --compare
+TRACKED = ["full_index_s", "incremental_s", "reindex_s", "search_p95_ms", "match_p95_ms",
+           "related_p95_ms", "tool_p95_ms", "peak_rss_mb"]
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _latencies(fn, args_list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return load_test.percentile(latencies, 50) * 1000, load_test.percentile(latencies, 95) * 1000
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(n_projects, n_users, n_queries, seed):
+    """Runs every measurement for one corpus size in this process and returns the results."""
+    os.environ.update(
+        INDEX_SNAPSHOT_DIR=tempfile.mkdtemp(prefix="modx-scaling-"),
+        SNAPSHOT_REFRESH_SECONDS="0",
+        COLLECTION_ALIAS_REFRESH_SECONDS="0",
+        GEMINI_RATE_LIMIT_ENABLED="false",
+        ANSWER_CACHE_ENABLED="false",
+    )
+    from benchmarks import fakes
+    db = fakes.install(fakes.FakeConfig(llm_latency_ms=0, embed_latency_ms=0, http_latency_ms=0, jitter=0))
+    results = {"projects": n_projects, "users": n_users}
+
+    start = time.perf_counter()
+    user_ids, project_ids = corpus.insert_corpus(db, n_projects, n_users, seed=seed)
+    results["generate_s"] = time.perf_counter() - start
+
+    from services import db_query_service, index_snapshot, member_matcher, reindex, related_graph, vector_indexer, vector_store
+
+    results["full_index_s"] = _timed(vector_indexer.index_new_data)
+    results["index_docs_per_s"] = (n_projects + n_users) / results["full_index_s"]
+
+    rng = random.Random(seed)
+    corpus.touch(db, "projects", rng.sample(project_ids, max(1, int(n_projects * EDIT_FRACTION))), seed)
+    corpus.touch(db, "users", rng.sample(user_ids, max(1, int(n_users * EDIT_FRACTION))), seed)
+    results["incremental_s"] = _timed(vector_indexer.index_new_data)
+    results["noop_ms"] = _timed(vector_indexer.index_new_data) * 1000
+
+    results["reindex_s"] = _timed(lambda: reindex.blue_green_reindex(switch=True, wait_seconds=0))
+
+    generator = corpus.CorpusGenerator(seed + 1)
+    texts = [f"{rng.choice(corpus.DOMAINS)} project using {' and '.join(generator.pick_skills(1, 3))}" for _ in range(n_queries)]
+    results["search_p50_ms"], results["search_p95_ms"] = _latencies(
+        vector_store.find_similar_document_ids, [(t, 6) for t in texts]
+    )
+    results["match_p50_ms"], results["match_p95_ms"] = _latencies(
+        member_matcher.match_members_batch, [([{"skill_text": t, "top_k": 10}],) for t in texts]
+    )
+    sample = [str(p) for p in rng.sample(project_ids, min(n_queries, len(project_ids)))]
+    results["related_build_s"] = _timed(related_graph.get_graph)
+    results["related_p50_ms"], results["related_p95_ms"] = _latencies(
+        related_graph.find_related_project_ids, [(p,) for p in sample]
+    )
+    skills = [(generator.pick_skills(1, 1)[0],) for _ in range(n_queries)]
+    results["tool_p50_ms"], results["tool_p95_ms"] = _latencies(db_query_service.find_projects, skills)
+
+    snapshot = index_snapshot.get_snapshot()
+    results["snapshot_mb"] = snapshot.scan_nbytes() / (1024 * 1024) if snapshot is not None else 0.0
+    results["peak_rss_mb"] = _peak_rss_mb()
+    return results
+
+
+def run_scale(n_projects, n_users, n_queries, seed):
+    """Runs `measure` in a fresh interpreter and returns its results."""
+    command = [sys.executable, "-m", "benchmarks.bench_scaling", "--measure", f"{n_projects},{n_users}",
+               "--queries", str(n_queries), "--seed", str(seed)]
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    completed = subprocess.run(command, cwd=root, capture_output=True, text=True)
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"Scale {n_projects}/{n_users} failed:\n{completed.stderr[-2000:]}")
+
+
+def format_tables(results):
+    index_header = (f"{'scale':<7}{'projects':>10}{'users':>10}{'full index s':>14}{'docs/s':>9}"
+                    f"{'1% edits s':>12}{'no-op ms':>10}{'reindex s':>11}")
+    query_header = (f"{'scale':<7}{'search p50/p95 ms':>19}{'match p50/p95 ms':>18}{'related p50/p95 ms':>20}"
+                    f"{'tool p50/p95 ms':>17}{'RSS MB':>9}{'snapshot MB':>13}")
+    lines = ["Indexing", index_header, "-" * len(index_header)]
+    for scale, r in results.items():
+        lines.append(
+            f"{scale:<7}{r['projects']:>10}{r['users']:>10}{r['full_index_s']:>14.2f}{r['index_docs_per_s']:>9.0f}"
+            f"{r['incremental_s']:>12.2f}{r['noop_ms']:>10.1f}{r['reindex_s']:>11.2f}"
+        )
+    lines += ["", "Retrieval and memory", query_header, "-" * len(query_header)]
+    for scale, r in results.items():
+        lines.append(
+            f"{scale:<7}{r['search_p50_ms']:>10.2f}/{r['search_p95_ms']:<8.2f}{r['match_p50_ms']:>9.2f}/{r['match_p95_ms']:<8.2f}"
+            f"{r['related_p50_ms']:>11.3f}/{r['related_p95_ms']:<8.3f}{r['tool_p50_ms']:>8.2f}/{r['tool_p95_ms']:<8.2f}"
+            f"{r['peak_rss_mb']:>9.0f}{r['snapshot_mb']:>13.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance):
+    """Prints the change of each tracked metric against a saved run; returns the regressed (scale, metric) pairs."""
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    for scale, current in results.items():
+        base = baseline.get("results", {}).get(scale)
+        if not base:
+            print(f"{scale:<7}(no baseline)")
+            continue
+        changes = []
+        for metric in TRACKED:
+            if not base.get(metric):
+                continue
+            delta = (current[metric] - base[metric]) / base[metric]
+            if delta > tolerance:
+                regressions.append((scale, metric))
+            changes.append(f"{metric} {delta:+.0%}{' REGRESSION' if delta > tolerance else ''}")
+        print(f"{scale:<7}" + ", ".join(changes))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexing and retrieval at increasing corpus sizes.")
+    parser.add_argument("--scales", default="1,10,100", help="Comma-separated multiples of the base corpus")
+    parser.add_argument("--base-projects", type=int, default=200)
+    parser.add_argument("--base-users", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per latency measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", metavar="PATH", help="Write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Compare results against a saved JSON run")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed relative regression")
+    parser.add_argument("--measure", metavar="PROJECTS,USERS", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        n_projects, n_users = (int(n) for n in args.measure.split(","))
+        print(RESULT_PREFIX + json.dumps(measure(n_projects, n_users, args.queries, args.seed)))
+        return
+
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",") if s.strip()):
+        print(f"Running {scale}x ({args.base_projects * scale} projects, {args.base_users * scale} users)...", flush=True)
+        results[f"{scale}x"] = run_scale(args.base_projects * scale, args.base_users * scale, args.queries, args.seed)
+    print()
+    print(format_tables(results))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("save", "compare", "measure")},
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Scraper page extraction benchmark: streamed lxml extraction vs parsing the whole page.
+
+For each saved page in benchmarks/fixtures/pages (plus the forum page
+repeated to several MB, and a PDF response), compares:
+
+- whole page: download the full body, parse it with BeautifulSoup's
+  html.parser, then cut the paragraph text to SCRAPER_MAX_PAGE_CHARS (the
+  scraper before streaming);
+- streamed: `scraper.read_page_text`, which feeds chunks to the lxml pull
+  parser and stops reading once the text budget is full, the byte cap is
+  reached or the content type is not HTML.
+
+Reports the median time, bytes read, peak traced memory and whether both
+paths extracted the same text. Responses come from memory (fakes), so the
+times are parse cost only; on a real network the bytes not read are also
+transfer time saved.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_scraper
+    python -m benchmarks.bench_scraper --repeat 50 --large-mb 8
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fakes import FakeHTTPResponse
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+class _CountingResponse(FakeHTTPResponse):
+    """Records how many body bytes the caller consumed."""
+
+    bytes_read = 0
+
+    def iter_content(self, chunk_size=8192, decode_unicode=False):
+        for chunk in super().iter_content(chunk_size, decode_unicode):
+            self.bytes_read += len(chunk)
+            yield chunk
+
+
+def _pages(large_mb):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read(), "text/html; charset=utf-8"))
+    forum = next((html for name, html, _ in pages if name.startswith("forum")), None)
+    if forum is not None and large_mb:
+        head, _, rest = forum.partition("<div id=\"thread\">")
+        thread = rest.rsplit("</div></body>", 1)[0]
+        copies = max(1, int(large_mb * 1024 * 1024 / len(thread)))
+        pages.append((f"forum_thread x{copies}", head + "<div id=\"thread\">" + thread * copies + "</div></body></html>",
+                      "text/html; charset=utf-8"))
+    pages.append(("report.pdf", "%PDF-1.7 " + "0" * (2 * 1024 * 1024), "application/pdf"))
+    return pages
+
+
+def _whole_page(scraper, url, html, content_type):
+    response = _CountingResponse(url, html, content_type)
+    # requests reads the full body for response.text whatever the content type
+    body = b"".join(response.iter_content(64 * 1024)).decode("utf-8")
+    return scraper.extract_text_bs4(body), response.bytes_read
+
+
+def _streamed(scraper, url, html, content_type):
+    response = _CountingResponse(url, html, content_type)
+    return scraper.read_page_text(response), response.bytes_read
+
+
+def _measure(fn, args, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text, read = fn(*args)
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return text, read, statistics.median(latencies), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamed lxml page extraction vs whole-page BeautifulSoup.")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--large-mb", type=float, default=5, help="Size of the repeated forum page (0 to skip)")
+    args = parser.parse_args()
+
+    from services import scraper
+    if scraper.etree is None:
+        print("lxml is not installed; the streamed path falls back to BeautifulSoup.\n")
+
+    header = (f"{'page':<22}{'size KB':>9}{'whole ms':>10}{'stream ms':>11}{'speedup':>9}"
+              f"{'read KB':>9}{'whole peak MB':>15}{'stream peak MB':>16}{'same text':>11}")
+    print(header)
+    print("-" * len(header))
+    for name, html, content_type in _pages(args.large_mb):
+        page_args = (scraper, f"https://example.com/{name}", html, content_type)
+        whole_text, whole_read, whole_s, whole_peak = _measure(_whole_page, page_args, args.repeat)
+        text, read, stream_s, stream_peak = _measure(_streamed, page_args, args.repeat)
+        same = "skipped" if content_type == "application/pdf" else "yes" if text == whole_text else "no"
+        print(f"{name:<22}{len(html) / 1024:>9.0f}{whole_s * 1000:>10.2f}{stream_s * 1000:>11.2f}"
+              f"{whole_s / stream_s:>8.1f}x{read / 1024:>9.0f}{whole_peak / 1e6:>15.1f}{stream_peak / 1e6:>16.1f}{same:>11}")
+
+
+if __name__ == "__main__":
+    main()
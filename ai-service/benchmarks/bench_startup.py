@@ -0,0 +1,134 @@
+"""
+Start-up time benchmark for the AI service.
+
+Measures, over several fresh processes:
+  * import     - time to `import main` (no credentials, no network)
+  * to_health  - time from process start until /health answers 200
+  * to_ready   - time from process start until /ready answers 200
+
+The served process uses the fakes from benchmarks/fakes.py with a simulated
+Chroma connect latency, so the numbers show how much start-up no longer
+waits on upstream connections.
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_startup --runs 5 --connect-latency-ms 1500
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+_IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _clean_env():
+    env = dict(os.environ)
+    for key in ("GEMINI_API_KEY", "MONGODB_URI", "CHROMA_API_KEY", "CHROMA_TENANT", "CHROMA_DATABASE"):
+        env.pop(key, None)
+    env["WARMUP_ON_STARTUP"] = "false"
+    return env
+
+
+def measure_import():
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET], cwd=SERVICE_DIR, env=_clean_env(),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def _wait_for(client, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get(path).status_code == 200:
+                return time.time()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} did not become available within {timeout}s")
+
+
+def measure_serve(connect_latency_ms, warm_up, timeout=60.0):
+    port = _free_port()
+    env = _clean_env()
+    env["WARMUP_ON_STARTUP"] = "true" if warm_up else "false"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--serve", str(port),
+         "--connect-latency-ms", str(connect_latency_ms)],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        # The child reports when the fakes are installed, so their import cost is excluded
+        line = process.stdout.readline()
+        started = float(line.split()[-1])
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            to_health = _wait_for(client, "/health", timeout) - started
+            to_ready = _wait_for(client, "/ready", timeout) - started
+        return to_health, to_ready
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def _serve(port, connect_latency_ms):
+    import uvicorn
+    from benchmarks import fakes
+
+    fakes.install(fakes.FakeConfig(connect_latency_ms=connect_latency_ms))
+    print(f"FAKES_INSTALLED {time.time()}", flush=True)
+    import main
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _summary(values):
+    return f"median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start-up time benchmark for the MODX AI service.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--connect-latency-ms", type=float, default=1500.0,
+                        help="Simulated Chroma Cloud connect time")
+    parser.add_argument("--no-warm-up", action="store_true", help="Serve with WARMUP_ON_STARTUP=false")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.connect_latency_ms)
+        return
+
+    imports, to_health, to_ready = [], [], []
+    for _ in range(args.runs):
+        imports.append(measure_import())
+        health, ready = measure_serve(args.connect_latency_ms, warm_up=not args.no_warm_up)
+        to_health.append(health)
+        to_ready.append(ready)
+
+    print(f"runs: {args.runs}, simulated Chroma connect: {args.connect_latency_ms:.0f} ms")
+    print(f"import main  {_summary(imports)}")
+    print(f"to /health   {_summary(to_health)}")
+    print(f"to /ready    {_summary(to_ready)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Multi-worker scaling benchmark for /recommendations.
+
+Builds a synthetic index snapshot, then for each worker count starts
+`gunicorn -c gunicorn.conf.py benchmarks.fake_app:app` with the snapshot
+shared through INDEX_SNAPSHOT_DIR, drives /recommendations at high
+concurrency and reports throughput, speed-up and per-worker memory
+(RSS vs. PSS, which splits shared pages between the processes mapping them).
+
+Usage (from ai-service/):
+    python -m benchmarks.bench_workers --workers 1,2,4 --docs 50000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import numpy as np
+
+from benchmarks import fakes, load_test
+from services import index_snapshot
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def build_synthetic_snapshot(directory, n_docs, dim=fakes.EMBEDDING_DIM, seed=0):
+    rng = np.random.default_rng(seed)
+    n_projects = n_docs // 2
+    embeddings = rng.standard_normal((n_docs, dim), dtype=np.float32)
+    ids = [f"project_{i:024x}" for i in range(n_projects)] + [f"user_{i:024x}" for i in range(n_docs - n_projects)]
+    metadatas = [{"doc_type": "project"}] * n_projects + [{"doc_type": "user"}] * (n_docs - n_projects)
+    return index_snapshot.write_snapshot(ids, embeddings, metadatas, directory)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url + "/ready", timeout=5).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("server did not become ready")
+
+
+def _memory_kb(pid):
+    """Returns (rss_kb, pss_kb) for one process from /proc/<pid>/smaps_rollup."""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get("Rss", 0), values.get("Pss", 0)
+
+
+def _worker_pids(master_pid):
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def run_one(workers, snapshot_dir, requests, concurrency):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "AI_WORKERS": str(workers),
+        # Each worker builds its own fakes; the snapshot is the shared state.
+        "AI_PRELOAD_APP": "false",
+        "INDEX_SNAPSHOT_DIR": snapshot_dir,
+        "WARMUP_ON_STARTUP": "false",
+        "FAKE_PROJECTS": "0",
+        "FAKE_USERS": "0",
+        "FAKE_EMBED_LATENCY_MS": "0",
+        # One BLAS thread per worker so scaling comes from processes, not threads
+        "OMP_NUM_THREADS": "1",
+        "OPENBLAS_NUM_THREADS": "1",
+        "MKL_NUM_THREADS": "1",
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "benchmarks.fake_app:app"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_ready(url)
+        # Warm every worker's snapshot mapping before measuring
+        asyncio.run(load_test.run(["recommendations"], concurrency * 2, concurrency, url=url))
+        result = asyncio.run(load_test.run(["recommendations"], requests, concurrency, url=url))["recommendations"]
+        memory = [_memory_kb(pid) for pid in _worker_pids(process.pid)]
+        result["rss_mb_per_worker"] = sum(m[0] for m in memory) / max(len(memory), 1) / 1024
+        result["pss_mb_total"] = sum(m[1] for m in memory) / 1024
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker scaling benchmark for /recommendations.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--docs", type=int, default=50000, help="Vectors in the synthetic snapshot")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    worker_counts = [int(w) for w in args.workers.split(",")]
+    with tempfile.TemporaryDirectory(prefix="modx-snapshot-") as snapshot_dir:
+        build_synthetic_snapshot(snapshot_dir, args.docs)
+        matrix_mb = args.docs * fakes.EMBEDDING_DIM * 4 / 1024 / 1024
+        print(f"snapshot: {args.docs} vectors x {fakes.EMBEDDING_DIM} dims ({matrix_mb:.0f} MB), "
+              f"{os.cpu_count()} CPUs\n")
+        header = f"{'workers':>8}{'rps':>10}{'speedup':>9}{'efficiency':>12}{'p95 ms':>9}{'RSS/worker MB':>15}{'PSS total MB':>14}"
+        print(header)
+        print("-" * len(header))
+        baseline_rps = None
+        for workers in worker_counts:
+            r = run_one(workers, snapshot_dir, args.requests, args.concurrency)
+            baseline_rps = baseline_rps or r["throughput_rps"] / workers
+            speedup = r["throughput_rps"] / baseline_rps
+            print(f"{workers:>8}{r['throughput_rps']:>10.1f}{speedup:>9.2f}{speedup / workers:>12.0%}"
+                  f"{r['p95_ms']:>9.1f}{r['rss_mb_per_worker']:>15.1f}{r['pss_mb_total']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Synthetic MoDX corpus for scaling benchmarks.
+
+Generates projects, users and memberships with the fields the indexer reads
+(`build_project_document` / `build_user_document`) plus the backend's own
+fields, shaped like real data rather than `fakes.seed_database`'s toy rows:
+
+- a skill vocabulary of ~150 entries whose popularity follows a Zipf-like
+  curve, so a few skills (Python, React) are everywhere and most are rare;
+- multi-sentence descriptions and bios built from domain and skill words,
+  so fake embeddings of related documents land close together;
+- creation and update times spread over two years;
+- leaders drawn from the users and 1-6 members per project.
+
+Everything but the timestamps (which end at generation time) is derived from
+`seed`, including the ObjectIds, so two runs with the same arguments produce
+the same corpus. Records are generated and
+inserted in chunks, so a million-document corpus never sits in one list.
+"""
+
+import itertools
+import random
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+DOMAINS = [
+    "healthcare", "fintech", "education", "climate", "agriculture", "logistics", "gaming", "music",
+    "mobility", "energy", "retail", "travel", "security", "social impact", "open source", "robotics",
+    "biotech", "media", "sports", "real estate", "government", "legal", "accessibility", "space",
+    "food", "fitness", "mental health", "e-commerce", "smart cities", "developer tools",
+]
+SKILL_AREAS = {
+    "languages": ["Python", "JavaScript", "TypeScript", "Java", "Go", "Rust", "C++", "C#", "Kotlin", "Swift",
+                  "Ruby", "PHP", "Scala", "Dart", "R", "Julia", "Elixir", "Haskell", "Lua", "SQL"],
+    "web": ["React", "Node.js", "Express", "Next.js", "Vue", "Angular", "Svelte", "Django", "Flask", "FastAPI",
+            "Spring Boot", "Rails", "Laravel", "GraphQL", "REST APIs", "Tailwind CSS", "HTML", "CSS", "Redux",
+            "WebSockets"],
+    "data": ["MongoDB", "PostgreSQL", "MySQL", "Redis", "Elasticsearch", "Kafka", "Spark", "Airflow", "dbt",
+             "Snowflake", "BigQuery", "Pandas", "NumPy", "Data Visualization", "Tableau", "Power BI", "ETL",
+             "Cassandra", "DynamoDB", "SQLite"],
+    "ml": ["Machine Learning", "Deep Learning", "TensorFlow", "PyTorch", "scikit-learn", "NLP", "Computer Vision",
+           "LLMs", "Prompt Engineering", "Recommender Systems", "Reinforcement Learning", "MLOps",
+           "Time Series", "Statistics", "Hugging Face", "LangChain", "Vector Databases", "OpenCV", "XGBoost",
+           "Generative AI"],
+    "infra": ["Docker", "Kubernetes", "AWS", "GCP", "Azure", "Terraform", "CI/CD", "GitHub Actions", "Linux",
+              "Nginx", "Serverless", "Prometheus", "Grafana", "Ansible", "Networking", "Microservices",
+              "Observability", "Cloudflare", "Helm", "Bash"],
+    "mobile": ["React Native", "Flutter", "Android", "iOS", "SwiftUI", "Jetpack Compose", "Expo", "Ionic",
+               "Mobile UX", "Push Notifications"],
+    "design": ["Figma", "UI Design", "UX Research", "Prototyping", "Design Systems", "Illustration",
+               "Motion Design", "Accessibility Design", "User Testing", "Branding"],
+    "product": ["Product Management", "Agile", "Scrum", "Technical Writing", "Community Management",
+                "Marketing", "Growth", "Fundraising", "Public Speaking", "Project Management"],
+    "other": ["Blockchain", "Solidity", "Embedded Systems", "Arduino", "Raspberry Pi", "IoT", "Unity",
+              "Unreal Engine", "3D Modeling", "Cybersecurity", "Penetration Testing", "Cryptography",
+              "GIS", "Bioinformatics", "Quantum Computing"],
+}
+SKILLS = [skill for area in SKILL_AREAS.values() for skill in area]
+ROLES = ["member", "leader", "mentor"]
+PROJECT_NOUNS = ["platform", "tracker", "assistant", "marketplace", "dashboard", "network", "toolkit", "app",
+                 "hub", "engine", "portal", "bot", "simulator", "library", "community"]
+ADJECTIVES = ["Open", "Smart", "Community", "Real-time", "Lightweight", "Collaborative", "Privacy-first",
+              "Offline-ready", "AI-powered", "Accessible", "Peer-to-peer", "Low-cost"]
+FIRST_NAMES = ["Aarav", "Aditi", "Alex", "Amara", "Ana", "Ben", "Chen", "Chloe", "Daniel", "Diya", "Elena",
+               "Emeka", "Fatima", "Gabriel", "Hana", "Ines", "Ishaan", "Jamal", "Julia", "Kai", "Kavya", "Leo",
+               "Lina", "Mateo", "Maya", "Mei", "Nadia", "Noah", "Omar", "Priya", "Rahul", "Rosa", "Sam",
+               "Sara", "Tariq", "Thandi", "Uma", "Victor", "Wei", "Yara", "Yusuf", "Zoe"]
+LAST_NAMES = ["Abebe", "Ahmed", "Alvarez", "Banerjee", "Costa", "Dubois", "Eze", "Fischer", "Garcia", "Gupta",
+              "Haddad", "Ito", "Johnson", "Kim", "Kowalski", "Li", "Mensah", "Moreau", "Nakamura", "Novak",
+              "Okafor", "Patel", "Rossi", "Santos", "Schmidt", "Sharma", "Silva", "Singh", "Tanaka", "Wang"]
+GOALS = [
+    "helps {domain} teams share data without spreadsheets",
+    "makes {domain} services easier to reach for underserved communities",
+    "automates the slowest parts of {domain} workflows",
+    "gives {domain} volunteers a single place to coordinate",
+    "turns open {domain} data into actionable insights",
+    "connects {domain} experts with students who want to learn",
+]
+DETAILS = [
+    "The backend is built with {a} and {b}.",
+    "We are looking for contributors comfortable with {a}.",
+    "The first milestone is a working prototype using {a}.",
+    "It already has a small user base and needs help scaling {a} and {b}.",
+    "Experience with {a} is a plus but not required.",
+]
+BIOS = [
+    "Passionate about {domain} and building things with {a}.",
+    "{years} years of experience with {a} and {b}.",
+    "Currently learning {a}; happy to mentor others in {b}.",
+    "Loves hackathons, open source and {domain}.",
+    "Looking for a {domain} project where I can use {a}.",
+]
+
+# Corpus timestamps are spread over this window, ending at generation time
+HISTORY_DAYS = 730
+
+
+class CorpusGenerator:
+    """Deterministic stream of projects, users and memberships."""
+
+    def __init__(self, seed=42, now=None):
+        self.rng = random.Random(seed)
+        self.now = now or datetime.utcnow()
+        # Zipf-like popularity: the k-th skill is drawn with weight 1 / k^0.9
+        order = SKILLS[:]
+        self.rng.shuffle(order)
+        self.skills = order
+        self.skill_weights = list(itertools.accumulate(1.0 / (rank + 1) ** 0.9 for rank in range(len(order))))
+
+    def object_id(self):
+        return ObjectId(self.rng.getrandbits(96).to_bytes(12, "big"))
+
+    def pick_skills(self, low, high):
+        k = self.rng.randint(low, high)
+        picked = []
+        while len(picked) < k:
+            skill = self.rng.choices(self.skills, cum_weights=self.skill_weights)[0]
+            if skill not in picked:
+                picked.append(skill)
+        return picked
+
+    def _timestamps(self):
+        created = self.now - timedelta(seconds=self.rng.uniform(0, HISTORY_DAYS * 86400))
+        updated = created + timedelta(seconds=self.rng.uniform(0, (self.now - created).total_seconds()))
+        return created, updated
+
+    def user(self):
+        first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+        skills = self.pick_skills(3, 8)
+        interests = self.rng.sample(DOMAINS, self.rng.randint(1, 3))
+        roles = self.rng.choices([["member"], ["member", "mentor"], ["leader"], ["leader", "mentor"], ["mentor"]],
+                                 [60, 10, 20, 5, 5])[0]
+        bio = " ".join(
+            template.format(domain=interests[0], a=skills[0], b=skills[-1], years=self.rng.randint(1, 15))
+            for template in self.rng.sample(BIOS, self.rng.randint(1, 3))
+        )
+        created, updated = self._timestamps()
+        user_id = self.object_id()
+        return {
+            "_id": user_id,
+            "fullName": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}.{user_id}@example.com",
+            "role": roles[0],
+            "roles": roles,
+            "interests": interests,
+            # The AI service reads a single interest string
+            "interest": ", ".join(interests),
+            "skills": skills,
+            "bio": bio,
+            "isVerified": True,
+            "createdAt": created,
+            "updatedAt": updated,
+        }
+
+    def project(self, leader_id):
+        domain = self.rng.choice(DOMAINS)
+        required = self.pick_skills(2, 6)
+        tech = self.pick_skills(1, 5)
+        sentences = [f"A {domain} {self.rng.choice(PROJECT_NOUNS)} that {self.rng.choice(GOALS).format(domain=domain)}."]
+        for template in self.rng.sample(DETAILS, self.rng.randint(1, 3)):
+            sentences.append(template.format(a=self.rng.choice(required), b=self.rng.choice(tech)))
+        created, updated = self._timestamps()
+        return {
+            "_id": self.object_id(),
+            "title": f"{self.rng.choice(ADJECTIVES)} {domain.title()} {self.rng.choice(PROJECT_NOUNS).title()}",
+            "description": " ".join(sentences),
+            "requiredSkills": required,
+            "techStack": tech,
+            "maxMembers": self.rng.choice([4, 6, 8, 10]),
+            "leaderId": leader_id,
+            "rating": round(self.rng.uniform(0, 5), 1),
+            "ratingCount": self.rng.randint(0, 40),
+            "createdAt": created,
+            "updatedAt": updated,
+        }
+
+    def memberships(self, project, user_ids):
+        members = self.rng.sample(user_ids, min(len(user_ids), self.rng.randint(1, 6)))
+        return [
+            {
+                "_id": self.object_id(),
+                "projectId": project["_id"],
+                "memberId": member_id,
+                "role": "member",
+                "status": self.rng.choices(["accepted", "pending", "rejected"], [80, 15, 5])[0],
+                "createdAt": project["createdAt"],
+                "updatedAt": project["updatedAt"],
+            }
+            for member_id in members
+        ]
+
+
+def insert_corpus(db, n_projects, n_users, seed=42, chunk_size=5000):
+    """
+    Inserts `n_users` users, `n_projects` projects and their memberships into
+    `db` in chunks. Returns the user ids and project ids.
+    """
+    generator = CorpusGenerator(seed)
+    user_ids, project_ids = [], []
+    for start in range(0, n_users, chunk_size):
+        users = [generator.user() for _ in range(min(chunk_size, n_users - start))]
+        db["users"].insert_many(users)
+        user_ids.extend(u["_id"] for u in users)
+    leaders = user_ids or [None]
+    for start in range(0, n_projects, chunk_size):
+        projects = [generator.project(generator.rng.choice(leaders)) for _ in range(min(chunk_size, n_projects - start))]
+        db["projects"].insert_many(projects)
+        project_ids.extend(p["_id"] for p in projects)
+        memberships = [m for p in projects for m in generator.memberships(p, user_ids)] if user_ids else []
+        if memberships:
+            db["projectmembers"].insert_many(memberships)
+    return user_ids, project_ids
+
+
+def touch(db, collection_name, ids, seed=0):
+    """Edits the given records (new description or bio) and bumps their updatedAt, like a user edit."""
+    rng = random.Random(seed)
+    field = "description" if collection_name == "projects" else "bio"
+    now = datetime.utcnow()
+    for record_id in ids:
+        db[collection_name].update_one(
+            {"_id": record_id},
+            {"$set": {field: f"Updated: now focused on {rng.choice(DOMAINS)} with {rng.choice(SKILLS)}.", "updatedAt": now}},
+        )
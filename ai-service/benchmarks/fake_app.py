@@ -0,0 +1,61 @@
+"""
+The AI service wired to the local fakes, seeded and indexed.
+
+In-process use:
+    from benchmarks import fake_app
+    app = fake_app.create_app(FakeConfig(llm_latency_ms=200))
+
+As a server (e.g. to benchmark a real uvicorn process):
+    FAKE_LLM_LATENCY_MS=200 uvicorn benchmarks.fake_app:app --port 50051
+
+The module-level `app` is built on first access from FAKE_* environment variables.
+"""
+
+import os
+
+# The fakes have no quota to protect; set GEMINI_RATE_LIMIT_ENABLED=true to
+# include the client-side scheduler in a measurement.
+os.environ.setdefault("GEMINI_RATE_LIMIT_ENABLED", "false")
+
+from benchmarks import fakes
+
+
+def config_from_env():
+    return fakes.FakeConfig(
+        llm_latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "400")),
+        embed_latency_ms=float(os.getenv("FAKE_EMBED_LATENCY_MS", "60")),
+        http_latency_ms=float(os.getenv("FAKE_HTTP_LATENCY_MS", "150")),
+        error_rate=float(os.getenv("FAKE_ERROR_RATE", "0")),
+        seed=int(os.getenv("FAKE_SEED", "1234")),
+    )
+
+
+def create_app(config=None, n_projects=None, n_users=None):
+    """Installs the fakes, seeds Mongo, indexes it and returns `main.app`."""
+    config = config or config_from_env()
+    db = fakes.install(config)
+    if n_projects is None:
+        n_projects = int(os.getenv("FAKE_PROJECTS", "200"))
+    if n_users is None:
+        n_users = int(os.getenv("FAKE_USERS", "300"))
+
+    # Seeding and indexing should not be slowed down by simulated latency.
+    latencies = (config.llm_latency_ms, config.embed_latency_ms, config.error_rate)
+    config.llm_latency_ms = config.embed_latency_ms = config.error_rate = 0
+    try:
+        if db["projects"].count_documents({}) == 0:
+            fakes.seed_database(db, n_projects=n_projects, n_users=n_users)
+        import main
+        from services import vector_indexer
+        vector_indexer.index_new_data()
+    finally:
+        config.llm_latency_ms, config.embed_latency_ms, config.error_rate = latencies
+    return main.app
+
+
+def __getattr__(name):
+    if name == "app":
+        application = create_app()
+        globals()["app"] = application
+        return application
+    raise AttributeError(name)
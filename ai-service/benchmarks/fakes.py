@@ -0,0 +1,384 @@
+"""
+Deterministic local stand-ins for Gemini, Chroma Cloud, MongoDB Atlas and the
+web, so the AI service can be benchmarked on a machine with no network.
+
+`install()` patches the client constructors, so it must run before the
+service creates its (lazily initialized) clients and before `database` is
+imported, since that module binds `pymongo.MongoClient` at import time.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+EMBEDDING_DIM = 768
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#.]+")
+
+
+@dataclass
+class FakeConfig:
+    """Latency and failure behaviour of the fake upstreams."""
+    llm_latency_ms: float = 400.0
+    embed_latency_ms: float = 60.0
+    http_latency_ms: float = 150.0
+    connect_latency_ms: float = 0.0  # delay when a Chroma client connects
+    jitter: float = 0.2          # +/- fraction applied to every latency
+    error_rate: float = 0.0      # probability that a Gemini call raises a 429
+    seed: int = 1234
+
+
+CONFIG = FakeConfig()
+_rng = random.Random(CONFIG.seed)
+_rng_lock = threading.Lock()
+
+
+def _sleep(base_ms, timeout_seconds=None):
+    """
+    Sleeps for the jittered latency. If that exceeds `timeout_seconds`, sleeps
+    only until the timeout and raises TimeoutError, like a client-side timeout.
+    """
+    if base_ms <= 0:
+        return
+    with _rng_lock:
+        factor = 1.0 + _rng.uniform(-CONFIG.jitter, CONFIG.jitter)
+    seconds = base_ms * factor / 1000.0
+    if timeout_seconds is not None and timeout_seconds < seconds:
+        time.sleep(max(0.0, timeout_seconds))
+        raise TimeoutError(f"fake call timed out after {timeout_seconds:.2f}s")
+    time.sleep(seconds)
+
+
+def _http_timeout(config):
+    """The per-call Gemini HTTP timeout in seconds, if the config sets one."""
+    timeout_ms = getattr(getattr(config, "http_options", None), "timeout", None)
+    return timeout_ms / 1000.0 if timeout_ms else None
+
+
+def _maybe_fail():
+    if CONFIG.error_rate <= 0:
+        return
+    with _rng_lock:
+        failed = _rng.random() < CONFIG.error_rate
+    if failed:
+        from google.genai import errors
+        raise errors.ClientError(429, {"error": {
+            "code": 429, "message": "Resource exhausted (fake)", "status": "RESOURCE_EXHAUSTED",
+        }})
+
+
+def fake_embedding(text, dim=EMBEDDING_DIM):
+    """
+    Hashing bag-of-words embedding: deterministic, unit length, and texts that
+    share words end up close together, so similarity search behaves sensibly.
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in _TOKEN_RE.findall(text.lower()):
+        digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dim
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        vector[0] = 1.0
+        return vector
+    return vector / norm
+
+
+# --- Gemini ---
+
+def _text_of(contents):
+    from google.genai import types
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, types.Content):
+        return " ".join(
+            p.text or (json.dumps(p.function_response.response, default=str) if p.function_response else "")
+            for p in contents.parts or []
+        )
+    if isinstance(contents, list):
+        return " ".join(_text_of(c) for c in contents)
+    return str(contents)
+
+
+def _response(parts, prompt_text=""):
+    from google.genai import types
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=max(1, len(prompt_text) // 4),
+        ),
+    )
+
+
+def _choose_tool(text, config):
+    """Mimics the model's tool choice with a few keyword rules."""
+    from google.genai import types
+    if not config or not getattr(config, "tools", None):
+        return None
+    # Like the real model, key on the question rather than on retrieved context
+    lowered = text.rpartition("User Query:")[2].lower()
+    if "project" in lowered and (" with " in lowered or "using" in lowered or "skill" in lowered):
+        words = _TOKEN_RE.findall(lowered)
+        return types.FunctionCall(name="find_projects", args={"skill": words[-1] if words else ""})
+    if "mentor" in lowered or "users" in lowered or "members" in lowered:
+        return types.FunctionCall(name="find_users", args={"role": "mentor"})
+    if "latest" in lowered or "news" in lowered or "trend" in lowered:
+        return types.FunctionCall(name="scrape_for_info", args={"query": text[:80]})
+    return None
+
+
+def _generate(model, contents, config=None):
+    from google.genai import types
+    _maybe_fail()
+    _sleep(CONFIG.llm_latency_ms, _http_timeout(config))
+    text = _text_of(contents)
+    if isinstance(contents, types.Content) and contents.parts and contents.parts[0].function_response:
+        name = contents.parts[0].function_response.name
+        return _response([types.Part(text=f"Here is what I found using {name}.")], text)
+    function_call = _choose_tool(text, config)
+    if function_call is not None:
+        return _response([types.Part(function_call=function_call)], text)
+    if text.startswith("Please summarize"):
+        return _response([types.Part(text="- Key point one\n- Key point two")], text)
+    return _response([types.Part(text=f"[{model}] Answer to: {text.strip()[:120]}")], text)
+
+
+class _FakeModels:
+    def generate_content(self, model, contents, config=None):
+        return _generate(model, contents, config)
+
+    def embed_content(self, model, contents, config=None):
+        from google.genai import types
+        _maybe_fail()
+        texts = [contents] if isinstance(contents, str) else list(contents)
+        _sleep(CONFIG.embed_latency_ms)
+        return types.EmbedContentResponse(embeddings=[
+            types.ContentEmbedding(values=fake_embedding(t).tolist()) for t in texts
+        ])
+
+
+class _FakeChat:
+    def __init__(self, model, history=None, config=None):
+        self.model = model
+        self.history = list(history or [])
+        self.config = config
+
+    def send_message(self, message, config=None):
+        response = _generate(self.model, message, config or self.config)
+        self.history.append(message)
+        self.history.append(response.candidates[0].content)
+        return response
+
+
+class _FakeChats:
+    def create(self, model, history=None, config=None):
+        return _FakeChat(model, history, config)
+
+
+class FakeGenaiClient:
+    """Drop-in for `google.genai.Client` covering the calls the service makes."""
+
+    def __init__(self, *args, **kwargs):
+        self.models = _FakeModels()
+        self.chats = _FakeChats()
+
+
+# --- Web (scraper) ---
+
+class FakeHTTPResponse:
+    def __init__(self, url, body, content_type="text/html; charset=utf-8", status_code=200):
+        self.url = url
+        self.status_code = status_code
+        self.headers = {"Content-Type": content_type, "Content-Length": str(len(body))}
+        self.content = body.encode()
+        self.text = body
+        self.encoding = "utf-8"
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} for {self.url}")
+
+    def iter_content(self, chunk_size=8192, decode_unicode=False):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _fake_search_page(query):
+    links = "".join(
+        f'<div class="result"><a class="result__a" href="https://example.com/{i}?q={i}">Result {i}</a></div>'
+        for i in range(8)
+    )
+    return f"<html><body>{links}</body></html>"
+
+
+def _fake_article(url, paragraphs=60):
+    body = "".join(
+        f"<p>Paragraph {i} about {url}: modern collaborative software teams ship faster with good tooling.</p>"
+        for i in range(paragraphs)
+    )
+    return f"<html><head><title>{url}</title></head><body><nav>menu</nav><main>{body}</main></body></html>"
+
+
+def fake_requests_get(url, *args, timeout=None, **kwargs):
+    import requests
+    try:
+        _sleep(CONFIG.http_latency_ms, timeout[-1] if isinstance(timeout, tuple) else timeout)
+    except TimeoutError as e:
+        raise requests.Timeout(str(e))
+    if "duckduckgo" in url:
+        return FakeHTTPResponse(url, _fake_search_page(url))
+    return FakeHTTPResponse(url, _fake_article(url))
+
+
+# --- MongoDB ---
+
+_SKILLS = ["Python", "React", "Node.js", "MongoDB", "TensorFlow", "Figma", "Docker",
+           "Kubernetes", "Go", "Rust", "Flutter", "PostgreSQL", "GraphQL", "AWS"]
+_DOMAINS = ["healthcare", "education", "fintech", "climate", "gaming", "social impact",
+            "agriculture", "e-commerce", "music", "open source tooling"]
+_ROLES = ["member", "leader", "mentor"]
+
+
+def seed_database(db, n_projects=200, n_users=300, seed=7):
+    """Fills a mongomock database with deterministic projects and users."""
+    from bson import ObjectId
+    from datetime import datetime
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    users = []
+    for i in range(n_users):
+        users.append({
+            "_id": ObjectId(),
+            "fullName": f"User {i}",
+            "email": f"user{i}@example.com",
+            "roles": rng.sample(_ROLES, rng.randint(1, 2)),
+            "interest": rng.choice(_DOMAINS),
+            "skills": rng.sample(_SKILLS, 3),
+            "bio": f"Enjoys {rng.choice(_DOMAINS)} projects.",
+            "createdAt": now,
+            "updatedAt": now,
+        })
+    if users:
+        db["users"].insert_many(users)
+    projects = []
+    for i in range(n_projects):
+        domain = rng.choice(_DOMAINS)
+        projects.append({
+            "_id": ObjectId(),
+            "title": f"{domain.title()} platform #{i}",
+            "description": f"A {domain} project that helps communities collaborate.",
+            "requiredSkills": rng.sample(_SKILLS, 3),
+            "techStack": rng.sample(_SKILLS, 2),
+            "leaderId": rng.choice(users)["_id"] if users else None,
+            "maxMembers": 8,
+            "createdAt": now,
+            "updatedAt": now,
+        })
+    if projects:
+        db["projects"].insert_many(projects)
+    memberships = [
+        {"projectId": p["_id"], "memberId": member["_id"], "role": "member", "status": "accepted"}
+        for p in projects for member in rng.sample(users, min(2, len(users)))
+    ]
+    if memberships:
+        db["projectmembers"].insert_many(memberships)
+    return db
+
+
+# --- Installation ---
+
+_installed = {}
+
+
+def _patch_mongomock_bulk_write():
+    """pymongo >= 4.9 passes `sort` to bulk updates, which mongomock 4.x does not accept."""
+    from mongomock.collection import BulkOperationBuilder
+    add_update = BulkOperationBuilder.add_update
+    if getattr(add_update, "_accepts_sort", False):
+        return
+
+    def add_update_without_sort(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    add_update_without_sort._accepts_sort = True
+    BulkOperationBuilder.add_update = add_update_without_sort
+
+
+def _patch_mongomock_id_lookups():
+    """
+    mongomock scans the whole collection for every query, including `_id`
+    lookups that MongoDB serves from its `_id` index, which makes bulk
+    updates quadratic. Serve `{_id: x}` and `{_id: {$in: [...]}}` from the
+    store (a dict keyed by `_id`) instead.
+    """
+    from mongomock.collection import Collection
+    iter_documents = Collection._iter_documents
+    if getattr(iter_documents, "_by_id", False):
+        return
+
+    def iter_documents_by_id(self, filter):
+        if isinstance(filter, dict) and len(filter) == 1 and "_id" in filter:
+            wanted = filter["_id"]
+            if isinstance(wanted, dict) and set(wanted) == {"$in"}:
+                ids = wanted["$in"]
+            elif not isinstance(wanted, (dict, list)):
+                ids = [wanted]
+            else:
+                return iter_documents(self, filter)
+            return (self._store[i] for i in dict.fromkeys(ids) if i in self._store)
+        return iter_documents(self, filter)
+
+    iter_documents_by_id._by_id = True
+    Collection._iter_documents = iter_documents_by_id
+
+
+def install(config=None):
+    """
+    Replaces the upstream client constructors with the fakes above. Returns the
+    shared in-memory Mongo database so callers can seed it.
+    """
+    global CONFIG, _rng
+    if config is not None:
+        CONFIG = config
+        _rng = random.Random(config.seed)
+    if _installed:
+        return _installed["db"]
+
+    import chromadb
+    import mongomock
+    import pymongo
+    import requests
+    from google import genai
+
+    chroma_client = chromadb.EphemeralClient()
+    mongo_client = mongomock.MongoClient("mongodb://localhost/modx")
+    _patch_mongomock_bulk_write()
+    _patch_mongomock_id_lookups()
+
+    genai.Client = FakeGenaiClient
+    def connect_chroma(*args, **kwargs):
+        _sleep(CONFIG.connect_latency_ms)
+        return chroma_client
+
+    chromadb.CloudClient = connect_chroma
+    pymongo.MongoClient = lambda *args, **kwargs: mongo_client
+    requests.get = fake_requests_get
+
+    _installed.update(db=mongo_client.get_database(), chroma=chroma_client)
+    return _installed["db"]
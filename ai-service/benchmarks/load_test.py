@@ -0,0 +1,202 @@
+"""
+Offline load test for the AI service.
+
+Runs `main.app` in-process against the fakes in benchmarks/fakes.py (or
+against a running server with --url), drives concurrent load at each
+endpoint and reports throughput and p50/p95/p99 latency.
+
+Usage (from ai-service/):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --endpoints chat,recommendations --concurrency 32 --requests 500
+    python -m benchmarks.load_test --save-baseline benchmarks/results/baseline.json
+    python -m benchmarks.load_test --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+from benchmarks import fakes
+
+CHAT_QUERIES = [
+    "Is MoDX free to use?",
+    "Find projects with Python",
+    "How do I build a good team?",
+    "List mentors on the platform",
+    "What are the latest trends in generative AI?",
+    "Find projects using React",
+]
+PROFILE_TEXTS = [
+    "User with interests in healthcare and skills in Python, TensorFlow.",
+    "User with interests in fintech and skills in React, Node.js.",
+    "User with interests in climate and skills in Go, Docker.",
+    "User with interests in gaming and skills in Rust, Flutter.",
+]
+
+# name -> (method, path, payload factory)
+ENDPOINTS = {
+    "health": ("GET", "/health", None),
+    "recommendations": ("POST", "/recommendations", lambda i: {"query_text": PROFILE_TEXTS[i % len(PROFILE_TEXTS)]}),
+    "related-projects": ("POST", "/related-projects", lambda i: {"query_text": PROFILE_TEXTS[(i + 1) % len(PROFILE_TEXTS)]}),
+    "search-projects": ("POST", "/search-projects", lambda i: {"search_query": CHAT_QUERIES[i % len(CHAT_QUERIES)]}),
+    "chat": ("POST", "/chat", lambda i: {"query": CHAT_QUERIES[i % len(CHAT_QUERIES)]}),
+    "match-members": ("POST", "/match-members", lambda i: {"skill_text": PROFILE_TEXTS[i % len(PROFILE_TEXTS)], "top_k": 10}),
+}
+DEFAULT_ENDPOINTS = "health,recommendations,related-projects,search-projects,chat"
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _run_endpoint(client, name, total_requests, concurrency):
+    method, path, payload = ENDPOINTS[name]
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                if method == "GET":
+                    response = await client.get(path)
+                else:
+                    response = await client.request(method, path, json=payload(i))
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total_requests,
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput_rps": total_requests / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def run(endpoints, total_requests, concurrency, url=None, app=None, timeout=120.0):
+    if url:
+        client = httpx.AsyncClient(base_url=url, timeout=timeout)
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=timeout)
+    results = {}
+    async with client:
+        for name in endpoints:
+            results[name] = await _run_endpoint(client, name, total_requests, concurrency)
+    return results
+
+
+def format_table(results):
+    header = f"{'endpoint':<18}{'reqs':>7}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    lines = [header, "-" * len(header)]
+    for name, r in results.items():
+        lines.append(
+            f"{name:<18}{r['requests']:>7}{r['errors']:>8}{r['throughput_rps']:>10.1f}"
+            f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+        )
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change against a saved baseline and returns the endpoints that
+    regressed by more than `tolerance` (p95 up or throughput down).
+    """
+    regressions = []
+    print(f"\nComparison with baseline (tolerance {tolerance:.0%}):")
+    print(f"{'endpoint':<18}{'rps':>18}{'p95 ms':>20}")
+    for name, current in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"{name:<18}{'(no baseline)':>18}")
+            continue
+        rps_delta = (current["throughput_rps"] - base["throughput_rps"]) / base["throughput_rps"] if base["throughput_rps"] else 0.0
+        p95_delta = (current["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        regressed = rps_delta < -tolerance or p95_delta > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<18}{rps_delta:>+17.1%} {p95_delta:>+19.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test for the MODX AI service.")
+    parser.add_argument("--endpoints", default=DEFAULT_ENDPOINTS,
+                        help=f"Comma-separated subset of: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=60.0)
+    parser.add_argument("--http-latency-ms", type=float, default=150.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability a fake Gemini call returns 429")
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare results against a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in endpoints if e not in ENDPOINTS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    config = fakes.FakeConfig(
+        llm_latency_ms=args.llm_latency_ms,
+        embed_latency_ms=args.embed_latency_ms,
+        http_latency_ms=args.http_latency_ms,
+        error_rate=args.error_rate,
+    )
+    app = None
+    if not args.url:
+        from benchmarks import fake_app
+        app = fake_app.create_app(config, n_projects=args.projects, n_users=args.users)
+
+    results = asyncio.run(run(endpoints, args.requests, args.concurrency, url=args.url, app=app))
+    print(format_table(results))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("save_baseline", "compare")},
+        "results": results,
+    }
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Admission control for the HTTP endpoints.
+
+Every endpoint belongs to a class with its own concurrency limit and a
+bounded wait queue (a bulkhead):
+
+- "chat": /chat, which can run several LLM rounds and a multi-page scrape;
+- "index": the indexing endpoints;
+- "search": the cheap vector lookups (/recommendations, /related-projects,
+  /search-projects, /match-members).
+
+A request that finds its class at the limit waits in the queue for at most
+the class's queue timeout. When the queue is full, or the wait times out,
+the request is shed with 503 and a Retry-After estimate instead of piling up
+threads and memory. Since each class has its own slots, and the worker
+thread pool is sized to their sum (see `configure_thread_pool`), a burst of
+/chat cannot take the capacity reserved for search. /health, /ready and
+/metrics are not admission-controlled.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from core import metrics
+from core.config import (
+    ADMISSION_ENABLED,
+    ADMISSION_CONCURRENCY,
+    ADMISSION_QUEUE,
+    ADMISSION_QUEUE_TIMEOUTS,
+)
+from core.rate_limiter import parse_mapping
+
+DEFAULT_CONCURRENCY = {"chat": 8, "index": 2, "search": 32}
+DEFAULT_QUEUE = {"chat": 16, "index": 4, "search": 64}
+DEFAULT_QUEUE_TIMEOUTS = {"chat": 10.0, "index": 30.0, "search": 2.0}
+# Threads kept for endpoints outside every class (e.g. DELETE /chat/{id})
+UNCLASSIFIED_THREADS = 4
+
+IN_FLIGHT = metrics.gauge(
+    "modx_ai_admission_in_flight",
+    "Requests currently admitted, by endpoint class.",
+    ["endpoint_class"],
+)
+QUEUE_DEPTH = metrics.gauge(
+    "modx_ai_admission_queue_depth",
+    "Requests waiting for admission, by endpoint class.",
+    ["endpoint_class"],
+)
+SHED = metrics.counter(
+    "modx_ai_admission_shed_total",
+    "Requests rejected with 503 by endpoint class and reason (queue_full, timeout).",
+    ["endpoint_class", "reason"],
+)
+QUEUE_WAIT = metrics.histogram(
+    "modx_ai_admission_queue_wait_seconds",
+    "Time admitted requests waited for a slot.",
+    ["endpoint_class"],
+)
+
+
+class Overloaded(Exception):
+    """The endpoint class is saturated; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, endpoint_class, reason, retry_after):
+        super().__init__(f"{endpoint_class} is overloaded ({reason})")
+        self.endpoint_class = endpoint_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """
+    Concurrency limit plus a bounded FIFO wait queue. Used only from the
+    event loop, so plain counters need no locking.
+    """
+
+    def __init__(self, name, limit, max_queue, queue_timeout):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = deque()
+        # Moving average of how long admitted requests hold a slot
+        self._service_seconds = 1.0
+
+    def retry_after(self):
+        """Seconds until a slot is likely free for a new request (at least 1)."""
+        backlog = (len(self._waiters) + 1) / max(1, self.limit)
+        return max(1, min(60, math.ceil(self._service_seconds * backlog)))
+
+    def _shed(self, reason):
+        SHED.inc(endpoint_class=self.name, reason=reason)
+        raise Overloaded(self.name, reason, self.retry_after())
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            IN_FLIGHT.set(self.active, endpoint_class=self.name)
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._shed("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        QUEUE_DEPTH.set(len(self._waiters), endpoint_class=self.name)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait timed out; give it back
+                self._release_slot()
+            self._shed("timeout")
+        except asyncio.CancelledError:
+            # Client went away while queued
+            if waiter.done() and not waiter.cancelled():
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if not waiter.done():
+                waiter.cancel()
+            QUEUE_DEPTH.set(len(self._waiters), endpoint_class=self.name)
+        QUEUE_WAIT.observe(time.monotonic() - start, endpoint_class=self.name)
+
+    def _release_slot(self):
+        # Hand the slot straight to the oldest live waiter, if any
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                QUEUE_DEPTH.set(len(self._waiters), endpoint_class=self.name)
+                return
+        self.active -= 1
+        IN_FLIGHT.set(self.active, endpoint_class=self.name)
+
+    def release(self, held_seconds=None):
+        if held_seconds is not None:
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held_seconds
+        self._release_slot()
+
+
+def _build_bulkheads():
+    concurrency = dict(DEFAULT_CONCURRENCY, **parse_mapping(ADMISSION_CONCURRENCY, int))
+    queue = dict(DEFAULT_QUEUE, **parse_mapping(ADMISSION_QUEUE, int))
+    timeouts = dict(DEFAULT_QUEUE_TIMEOUTS, **parse_mapping(ADMISSION_QUEUE_TIMEOUTS))
+    return {name: Bulkhead(name, concurrency[name], queue[name], timeouts[name]) for name in concurrency}
+
+
+bulkheads = _build_bulkheads()
+
+
+def admit(endpoint_class):
+    """FastAPI dependency that holds a slot of `endpoint_class` for the duration of the request."""
+    bulkhead = bulkheads[endpoint_class]
+
+    async def dependency():
+        if not ADMISSION_ENABLED:
+            yield
+            return
+        await bulkhead.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            bulkhead.release(time.monotonic() - start)
+
+    return dependency
+
+
+def configure_thread_pool():
+    """
+    Sizes the worker thread pool used by run_in_threadpool to the sum of the
+    class limits, so every class can always run as many requests as it admits.
+    """
+    if not ADMISSION_ENABLED:
+        return
+    import anyio.to_thread
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = max(limiter.total_tokens, sum(b.limit for b in bulkheads.values()) + UNCLASSIFIED_THREADS)
+
+
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"The AI service is busy ({exc.endpoint_class}); retry later."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
@@ -0,0 +1,142 @@
+"""
+Semantic answer cache for /chat.
+
+Chat questions are often near-paraphrases of each other ("is modx free?" /
+"does MoDX cost anything?"), and answering one costs two or more LLM calls.
+Recent questions are kept as normalized embeddings in a small in-process
+matrix; a new question whose best match is above ANSWER_CACHE_SIMILARITY and
+younger than ANSWER_CACHE_TTL_SECONDS is answered from the cache.
+
+Answers built from live data (the database or web tools) are never stored,
+since they go stale as soon as a project or user changes.
+Canned replies (an unknown tool, a spelling suggestion for an empty search)
+are not stored either: they say nothing about the question's paraphrases.
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from core import metrics
+from core.config import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_SIMILARITY,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+
+# Tools whose results reflect live data; answers that used them are not cached
+LIVE_DATA_TOOLS = frozenset({"find_projects", "find_users", "scrape_for_info"})
+
+ANSWER_CACHE_LOOKUPS = metrics.counter(
+    "modx_ai_answer_cache_lookups_total",
+    "Answer cache lookups by result (hit, miss).",
+    ["result"],
+)
+ANSWER_CACHE_STORES = metrics.counter(
+    "modx_ai_answer_cache_stores_total",
+    "Answers offered to the cache by outcome (stored, live_data, canned, evicted).",
+    ["outcome"],
+)
+ANSWER_CACHE_ENTRIES = metrics.gauge(
+    "modx_ai_answer_cache_entries",
+    "Answers currently held in the semantic cache.",
+)
+
+
+class AnswerCache:
+    """
+    Fixed-capacity cache of (query embedding, answer) pairs.
+
+    Entries live in preallocated slots; a full cache first reuses expired
+    slots, then the least recently used one.
+    """
+
+    def __init__(self, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                 threshold=ANSWER_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._answers = [None] * max_entries
+        self._queries = [None] * max_entries
+        self._created = np.full(max_entries, -np.inf)
+        self._last_used = np.full(max_entries, -np.inf)
+
+    def __len__(self):
+        with self._lock:
+            return sum(answer is not None for answer in self._answers)
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, embedding, now=None):
+        """Returns (answer, similarity) of the best fresh match above the threshold, else None."""
+        query = self._normalize(embedding)
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if query is None or self._vectors is None or self._vectors.shape[1] != len(query):
+                ANSWER_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            scores = self._vectors @ query
+            scores[now - self._created > self.ttl_seconds] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                ANSWER_CACHE_LOOKUPS.inc(result="miss")
+                return None
+            self._last_used[best] = now
+            ANSWER_CACHE_LOOKUPS.inc(result="hit")
+            return self._answers[best], float(scores[best])
+
+    def store(self, embedding, query, answer, tools_used=(), now=None, cacheable=True):
+        """
+        Caches `answer` unless it was built from live data or is a canned
+        reply (`cacheable` False). Returns True if stored.
+        """
+        if LIVE_DATA_TOOLS.intersection(tools_used):
+            ANSWER_CACHE_STORES.inc(outcome="live_data")
+            return False
+        if not cacheable:
+            ANSWER_CACHE_STORES.inc(outcome="canned")
+            return False
+        vector = self._normalize(embedding)
+        if vector is None or not answer or self.max_entries <= 0:
+            return False
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.max_entries, len(vector)), dtype=np.float32)
+                self._answers = [None] * self.max_entries
+                self._queries = [None] * self.max_entries
+                self._created[:] = -np.inf
+                self._last_used[:] = -np.inf
+            # Empty and expired slots have the oldest timestamps, so they go first
+            expired = now - self._created > self.ttl_seconds
+            slot = int(np.argmin(np.where(expired, -np.inf, self._last_used)))
+            if self._answers[slot] is not None and not expired[slot]:
+                ANSWER_CACHE_STORES.inc(outcome="evicted")
+            self._vectors[slot] = vector
+            self._answers[slot] = answer
+            self._queries[slot] = query
+            self._created[slot] = now
+            self._last_used[slot] = now
+            ANSWER_CACHE_ENTRIES.set(sum(a is not None for a in self._answers))
+        ANSWER_CACHE_STORES.inc(outcome="stored")
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._answers = [None] * self.max_entries
+            self._queries = [None] * self.max_entries
+            self._created[:] = -np.inf
+            self._last_used[:] = -np.inf
+        ANSWER_CACHE_ENTRIES.set(0)
+
+
+# Per-process cache used by the orchestrator
+answer_cache = AnswerCache()
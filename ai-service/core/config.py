@@ -7,8 +7,152 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 MONGODB_URI = os.getenv("MONGODB_URI")
 EMBEDDING_MODEL = "models/text-embedding-004"
+# Embedding backend: gemini (EMBEDDING_MODEL), onnx (local CPU model) or hashing (tests)
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "gemini").lower()
+# Path to the exported model.onnx; tokenizer.json is looked up next to it unless set
+ONNX_EMBEDDING_MODEL_PATH = os.getenv("ONNX_EMBEDDING_MODEL_PATH", "")
+ONNX_EMBEDDING_TOKENIZER_PATH = os.getenv("ONNX_EMBEDDING_TOKENIZER_PATH", "")
+# Vector size of the hashing provider
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "768"))
+# Texts per embedding call, and embedding calls run in parallel
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "100"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "1"))
 
 # --- ADD THESE NEW VARIABLES ---
 CHROMA_API_KEY = os.getenv("CHROMA_API_KEY")
 CHROMA_TENANT = os.getenv("CHROMA_TENANT")
-CHROMA_DATABASE = os.getenv("CHROMA_DATABASE")
\ No newline at end of file
+CHROMA_DATABASE = os.getenv("CHROMA_DATABASE")
+
+# --- Observability ---
+# Attach a Server-Timing header with the per-stage breakdown to every response
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+# Token required by admin-only debug endpoints (e.g. /debug/profile). Unset disables them.
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+# --- Logging (see core/structured_logging.py) ---
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# json (one object per line) or text
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records buffered for the writer thread; further records are dropped, not waited for
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Share of records kept per event, e.g. "chat.query=0.01,llm.tool_call=1"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# --- Web scraper (scrape_for_info) ---
+# Bytes downloaded per page at most; the download also stops once enough text is extracted
+SCRAPER_MAX_PAGE_BYTES = int(os.getenv("SCRAPER_MAX_PAGE_BYTES", "1048576"))
+# Paragraph text kept per page for summarization
+SCRAPER_MAX_PAGE_CHARS = int(os.getenv("SCRAPER_MAX_PAGE_CHARS", "4000"))
+
+# --- Startup ---
+# Create clients and open connection pools on a background thread at startup
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+# --- Shared index snapshot ---
+# Directory holding the memory-mapped index snapshot shared by all worker
+# processes. Unset keeps querying Chroma Cloud directly.
+INDEX_SNAPSHOT_DIR = os.getenv("INDEX_SNAPSHOT_DIR", "")
+# How often each worker checks whether a newer snapshot was published
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "30"))
+# Quantized copy used to scan the snapshot: none, float16 or int8. Top
+# candidates are always re-scored exactly in float32.
+SNAPSHOT_QUANTIZATION = os.getenv("SNAPSHOT_QUANTIZATION", "none").lower()
+SNAPSHOT_RESCORE_MULTIPLIER = int(os.getenv("SNAPSHOT_RESCORE_MULTIPLIER", "5"))
+
+# --- Gemini rate limiting ---
+# Client-side token buckets matching the Gemini quota. Limits are requests per
+# minute and apply per process (divide by the number of workers). 0 = unlimited.
+GEMINI_RATE_LIMIT_ENABLED = os.getenv("GEMINI_RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Per-model quotas, e.g. "gemini-2.5-flash=10,gemini-2.5-flash-lite=15". Unlisted
+# generation models get the default; unlisted embedding models only GEMINI_EMBED_RPM.
+GEMINI_MODEL_RPM = os.getenv("GEMINI_MODEL_RPM", "")
+GEMINI_DEFAULT_MODEL_RPM = float(os.getenv("GEMINI_DEFAULT_MODEL_RPM", "60"))
+GEMINI_GENERATE_RPM = float(os.getenv("GEMINI_GENERATE_RPM", "0"))
+GEMINI_EMBED_RPM = float(os.getenv("GEMINI_EMBED_RPM", "1500"))
+# Bucket size, in seconds' worth of quota that may be spent at once
+GEMINI_BURST_SECONDS = float(os.getenv("GEMINI_BURST_SECONDS", "10"))
+# How long each priority class may queue for a token, e.g. "interactive=15,bulk=300"
+GEMINI_QUEUE_TIMEOUTS = os.getenv("GEMINI_QUEUE_TIMEOUTS", "")
+
+# --- Request coalescing ---
+# Identical concurrent embedding/LLM/chat calls share one upstream call;
+# callers joining an in-flight call give up after this many seconds
+SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.getenv("SINGLE_FLIGHT_TIMEOUT_SECONDS", "90"))
+
+# --- Semantic answer cache (/chat) ---
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+# Minimum cosine similarity between a new question and a cached one
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+
+# --- Related projects ---
+# Serve /related-projects by project id from a precomputed k-NN graph
+RELATED_GRAPH_ENABLED = os.getenv("RELATED_GRAPH_ENABLED", "true").lower() == "true"
+# Neighbours kept per project (the endpoint returns 6; the rest absorb deletes)
+RELATED_GRAPH_K = int(os.getenv("RELATED_GRAPH_K", "10"))
+
+# --- Tool results sent back to the model ---
+# Records per tool response, token limit for long text fields, and a hard
+# token budget for the whole serialized response
+TOOL_RESULT_MAX_ITEMS = int(os.getenv("TOOL_RESULT_MAX_ITEMS", "10"))
+TOOL_RESULT_FIELD_TOKENS = int(os.getenv("TOOL_RESULT_FIELD_TOKENS", "60"))
+TOOL_RESULT_TOKEN_BUDGET = int(os.getenv("TOOL_RESULT_TOKEN_BUDGET", "1500"))
+
+# --- Conversation sessions (/chat with a conversation_id) ---
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "86400"))
+# Optional SQLite file that keeps sessions across restarts (empty = memory only)
+CHAT_SESSION_DB = os.getenv("CHAT_SESSION_DB", "")
+# Once a session's history exceeds this many tokens, older turns are summarized
+CHAT_HISTORY_TOKEN_LIMIT = int(os.getenv("CHAT_HISTORY_TOKEN_LIMIT", "1500"))
+CHAT_HISTORY_KEEP_TURNS = int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "4"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "300"))
+
+# --- Blue/green reindexing ---
+# How often each worker re-reads which Chroma collection the alias serves
+COLLECTION_ALIAS_REFRESH_SECONDS = float(os.getenv("COLLECTION_ALIAS_REFRESH_SECONDS", "10"))
+# Sampled documents whose own vector must retrieve them before a switch
+REINDEX_VALIDATION_SAMPLES = int(os.getenv("REINDEX_VALIDATION_SAMPLES", "50"))
+REINDEX_MIN_SELF_RECALL = float(os.getenv("REINDEX_MIN_SELF_RECALL", "0.95"))
+
+# --- Knowledge base (RAG) ---
+KB_PATH = os.getenv("KB_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "modx_knowledge_base.json"))
+# Chunk size and overlap between consecutive chunks, in estimated tokens
+KB_CHUNK_TOKENS = int(os.getenv("KB_CHUNK_TOKENS", "200"))
+KB_CHUNK_OVERLAP_TOKENS = int(os.getenv("KB_CHUNK_OVERLAP_TOKENS", "40"))
+# Token budget for passages placed in the RAG fallback prompt
+KB_CONTEXT_TOKENS = int(os.getenv("KB_CONTEXT_TOKENS", "800"))
+
+# --- Admission control ---
+# Per endpoint class (chat, index, search): concurrent requests, queued
+# requests and seconds a request may queue before it is shed with 503.
+# Unlisted classes keep the defaults in core/admission.py, e.g. "chat=8,index=2,search=32"
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+ADMISSION_CONCURRENCY = os.getenv("ADMISSION_CONCURRENCY", "")
+ADMISSION_QUEUE = os.getenv("ADMISSION_QUEUE", "")
+ADMISSION_QUEUE_TIMEOUTS = os.getenv("ADMISSION_QUEUE_TIMEOUTS", "")
+
+# --- Request deadlines (/chat) ---
+# Time budget of a chat turn when the caller sends no X-Request-Timeout-Ms
+# header (the backend gives up after 60 s); header values are capped at the max
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "55"))
+CHAT_DEADLINE_MAX_SECONDS = float(os.getenv("CHAT_DEADLINE_MAX_SECONDS", "120"))
+
+# --- Recommend by user id (/recommendations with user_id) ---
+# Share of the query vector taken from the user's recently engaged projects
+USER_RECOMMENDATION_ACTIVITY_WEIGHT = float(os.getenv("USER_RECOMMENDATION_ACTIVITY_WEIGHT", "0.3"))
+USER_RECOMMENDATION_CACHE_MAX = int(os.getenv("USER_RECOMMENDATION_CACHE_MAX", "10000"))
+USER_RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("USER_RECOMMENDATION_CACHE_TTL_SECONDS", "900"))
+
+# --- Incremental sync (/index-new-data) ---
+# How far below the stored watermark each run re-reads, for late commits and clock skew
+SYNC_WATERMARK_OVERLAP_SECONDS = float(os.getenv("SYNC_WATERMARK_OVERLAP_SECONDS", "60"))
+
+# --- In-memory project/user catalog (find_projects/find_users, search filters) ---
+CATALOG_ENABLED = os.getenv("CATALOG_ENABLED", "true").lower() == "true"
+CATALOG_REFRESH_SECONDS = float(os.getenv("CATALOG_REFRESH_SECONDS", "30"))
+# Full reloads drop records deleted without going through the index endpoints
+CATALOG_FULL_RELOAD_SECONDS = float(os.getenv("CATALOG_FULL_RELOAD_SECONDS", "3600"))
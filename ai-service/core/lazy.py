@@ -0,0 +1,49 @@
+"""
+Thread-safe lazy initialization for expensive clients.
+
+Service modules used to build their Gemini, Chroma and model-manager objects
+at import time, so a slow or unavailable upstream delayed (or crashed) server
+start-up. Wrapping the constructor in `Lazy` defers that work to first use.
+"""
+
+import threading
+
+
+class Lazy:
+    """
+    Holds a value built by `factory` on the first call to `get()`.
+
+    Concurrent first callers block on a lock and share one construction. A
+    factory that raises leaves the value unset, so the next call retries
+    instead of caching the failure (e.g. Chroma comes back after an outage).
+    """
+
+    def __init__(self, factory, name=None):
+        self._factory = factory
+        self.name = name or getattr(factory, "__name__", "lazy")
+        self._lock = threading.Lock()
+        self._value = None
+        self._initialized = False
+
+    def get(self):
+        if self._initialized:
+            return self._value
+        with self._lock:
+            if not self._initialized:
+                self._value = self._factory()
+                self._initialized = True
+        return self._value
+
+    def is_initialized(self):
+        return self._initialized
+
+    def set(self, value):
+        """Replaces the value, e.g. to inject a stand-in for benchmarks."""
+        with self._lock:
+            self._value = value
+            self._initialized = True
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._initialized = False
@@ -0,0 +1,104 @@
+"""
+Readiness checks and optional background warm-up for the AI service.
+
+Nothing here runs at import time. `/health` only reports that the process is
+alive; `/ready` uses `check_readiness()` to report whether the upstream
+clients can actually be used, so orchestrators stop routing traffic to a pod
+whose Chroma or Mongo connection is down without restarting it.
+"""
+
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_warmup_state = {"status": "not_started", "seconds": None, "error": None}
+
+
+def _components():
+    # Imported lazily so that importing this module stays cheap
+    import database
+    from core import llm_service, model_manager
+    from services import vector_store
+
+    return {
+        "gemini_client": model_manager.get_client,
+        "chroma_collection": vector_store.get_collection,
+        "mongodb": lambda: database.get_mongodb_connection().client.admin.command("ping"),
+        "chat_model_manager": llm_service.get_model_manager,
+    }
+
+
+def check_readiness():
+    """
+    Initializes (if needed) and probes each upstream client.
+
+    Returns (ready, details) where details maps component name to "ok" or the
+    error message.
+    """
+    details = {}
+    for name, probe in _components().items():
+        try:
+            probe()
+            details[name] = "ok"
+        except Exception as e:
+            details[name] = f"error: {str(e)[:200]}"
+    ready = all(value == "ok" for value in details.values())
+    return ready, details
+
+
+def warm_up():
+    """Creates every client, opens the Chroma/Mongo connection pools, builds the related-projects graph and loads the catalog."""
+    _warmup_state["status"] = "running"
+    start = time.perf_counter()
+    ready, details = check_readiness()
+    if ready:
+        ready, details = _build_related_graph(details)
+    if ready:
+        ready, details = _load_catalog(details)
+    _warmup_state["seconds"] = round(time.perf_counter() - start, 3)
+    if ready:
+        _warmup_state["status"] = "done"
+        logger.info(f"Warm-up finished in {_warmup_state['seconds']}s")
+    else:
+        _warmup_state["status"] = "failed"
+        _warmup_state["error"] = details
+        logger.warning(f"Warm-up incomplete: {details}")
+
+
+def _load_catalog(details):
+    from core.config import CATALOG_ENABLED
+    from services import catalog
+
+    if not CATALOG_ENABLED:
+        return True, details
+    try:
+        catalog.get_catalog()
+    except Exception as e:
+        return False, dict(details, catalog=f"error: {str(e)[:200]}")
+    return True, details
+
+
+def _build_related_graph(details):
+    from core.config import RELATED_GRAPH_ENABLED
+    from services import related_graph
+
+    if not RELATED_GRAPH_ENABLED:
+        return True, details
+    try:
+        related_graph.get_graph()
+    except Exception as e:
+        return False, dict(details, related_graph=f"error: {str(e)[:200]}")
+    return True, details
+
+
+def start_background_warm_up():
+    """Runs `warm_up` on a daemon thread so the server accepts connections immediately."""
+    thread = threading.Thread(target=warm_up, name="ai-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def warm_up_status():
+    return dict(_warmup_state)
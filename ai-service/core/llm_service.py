@@ -1,9 +1,15 @@
-from google import genai
-from google.genai import types
 from core.config import GEMINI_API_KEY
 from core.model_manager import ModelManager
-from services import scraper, db_query_service, vector_store
+from core import metrics, rate_limiter, request_deadline, tool_results
+from core.lazy import Lazy
+from services import scraper, db_query_service, vector_store, knowledge_base
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 # --- 1. DEFINE THE SYSTEM PROMPT ---
 system_prompt = """
@@ -69,46 +75,149 @@ def find_projects_by_concept(concept: str) -> str:
     Use this tool for broad, conceptual, or semantic searches about projects.
     Excellent for questions like "find projects related to healthcare" or "what's a good project for a beginner?".
     """
-    print(f"LLM Service: Using RAG to find projects related to '{concept}'")
+    logger.debug("LLM Service: using RAG to find projects related to %r", concept, extra={"event": "tool.call"})
     # This now calls the corrected function name in your vector_store
     return vector_store.find_similar_document_ids(concept)
 
+# Names of the tools called while answering the current query (see track_tool_calls)
+_tools_used = ContextVar("tools_used", default=None)
+
+def _record_tool_use(tool):
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        used = _tools_used.get()
+        if used is not None:
+            used.add(tool.__name__)
+        return tool(*args, **kwargs)
+    return wrapper
+
+@contextmanager
+def track_tool_calls():
+    """Collects the names of the tools called inside the block into the yielded set."""
+    used = set()
+    token = _tools_used.set(used)
+    try:
+        yield used
+    finally:
+        _tools_used.reset(token)
+
+# Cleared when the current answer is a canned reply rather than model output (see track_cacheability)
+_answer_state = ContextVar("answer_state", default=None)
+
+def _mark_not_cacheable():
+    state = _answer_state.get()
+    if state is not None:
+        state["cacheable"] = False
+
+@contextmanager
+def track_cacheability():
+    """
+    Yields a dict whose "cacheable" entry turns False if the answer produced
+    inside the block should not be reused for other queries: a canned reply,
+    or one that only reflects the database's current (empty) results.
+    """
+    state = {"cacheable": True}
+    token = _answer_state.set(state)
+    try:
+        yield state
+    finally:
+        _answer_state.reset(token)
+
+# Every tool is wrapped so its latency and use are recorded, and its result
+# shaped, whether it is invoked by generate_answer below or automatically by
+# the Gemini SDK.
 tools = [
-    find_projects_by_concept,
-    db_query_service.find_projects,
-    db_query_service.find_users,
-    scraper.scrape_for_info,
+    _record_tool_use(tool_results.shaped(metrics.timed("tool")(tool))) for tool in (
+        find_projects_by_concept,
+        db_query_service.find_projects,
+        db_query_service.find_users,
+        scraper.scrape_for_info,
+    )
 ]
 
-# --- 4. INITIALIZE THE MODEL MANAGER WITH AUTOMATIC FALLBACK ---
-model_manager = ModelManager(
-    tools=tools,
-    system_instruction=system_prompt
+# --- 4. THE MODEL MANAGER WITH AUTOMATIC FALLBACK (built on first use) ---
+_model_manager = Lazy(
+    lambda: ModelManager(tools=tools, system_instruction=system_prompt),
+    name="chat_model_manager",
 )
 
+def get_model_manager():
+    return _model_manager.get()
+
+PROMPT_TOKENS = metrics.histogram(
+    "modx_ai_llm_prompt_tokens",
+    "Input tokens reported by Gemini per generate_answer round.",
+    ["round"],
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+
+def _log_prompt_tokens(response, round_name):
+    usage = getattr(response, "usage_metadata", None)
+    count = getattr(usage, "prompt_token_count", None)
+    if count:
+        PROMPT_TOKENS.observe(count, round=round_name)
+        logger.debug("LLM input tokens (%s): %d", round_name, count, extra={"event": "llm.prompt_tokens"})
+
+# Tool-less model used to fold old conversation turns into a summary
+_summary_model_manager = Lazy(ModelManager, name="conversation_summary_model")
+
+def summarize_conversation(prompt):
+    with rate_limiter.priority("background"), metrics.track("chat", "summarize"):
+        return _summary_model_manager.get().generate_content(prompt).text
+
+def _partial_from_tool(tool_response_str):
+    """A readable stand-in answer built from a tool result, used if the deadline passes."""
+    try:
+        records = json.loads(tool_response_str)
+    except (json.JSONDecodeError, TypeError):
+        return f"Here is what I found so far:\n\n{tool_response_str}"
+    if isinstance(records, dict):
+        # Shaped results wrap the records in {"data": [...], "more": ...}
+        records = records.get("data")
+    if not isinstance(records, list):
+        return None
+    lines = []
+    for record in records:
+        if isinstance(record, dict):
+            fields = [str(v) for k, v in record.items() if k != "_id" and isinstance(v, str) and v]
+            lines.append("- " + " — ".join(fields[:2]))
+    return "Here is what I found so far:\n" + "\n".join(lines) if lines else None
+
 # --- 5. THE MAIN FUNCTION TO GENERATE AN ANSWER (Corrected Version) ---
-def generate_answer(query):
+def generate_answer(query, history=None, query_embedding=None):
     """
     Orchestrates the process of getting an intelligent answer. It first tries to
     use a specific tool for factual data. If no tool is chosen, it falls back
     to the RAG system for conceptual questions.
+
+    `history` holds earlier turns of the conversation (see core.session_store).
+    `query_embedding`, when the caller already embedded the query, is reused
+    for the knowledge-base lookup.
+    Inside a request deadline (core.request_deadline) each step checks the
+    time left, and the best intermediate result is offered as a partial answer.
     """
-    chat = model_manager.start_chat(history=few_shot_examples)
+    from google.genai import types
+    model_manager = get_model_manager()
+    chat = model_manager.start_chat(history=few_shot_examples + list(history or []))
     
     # --- Step 1: Try to use a tool first ---
     response = chat.send_message(query)
+    _log_prompt_tokens(response, "tool_choice")
     
     try:
         function_call = response.candidates[0].content.parts[0].function_call
         tool_name = function_call.name
         tool_args = {key: value for key, value in function_call.args.items()}
 
-        print(f"LLM decided to call tool: {tool_name} with arguments: {tool_args}")
+        logger.debug("LLM decided to call tool: %s with arguments: %s", tool_name, tool_args,
+                     extra={"event": "llm.tool_call", "tool": tool_name})
         
         tool_to_call = next((t for t in tools if t.__name__ == tool_name), None)
         
         if tool_to_call:
+            request_deadline.check("tool")
             tool_response_str = tool_to_call(**tool_args)
+            request_deadline.offer_partial(_partial_from_tool(tool_response_str))
             
             # Spell-check and suggestion logic
             try:
@@ -116,6 +225,7 @@ def generate_answer(query):
                 if isinstance(tool_response_data, list) and not tool_response_data:
                     suggestion_prompt = f"The user searched for '{query}', but the database returned no results. Is there a likely spelling mistake in the query? If so, suggest the correct spelling. If not, just say you couldn't find anything."
                     suggestion_response = model_manager.generate_content(suggestion_prompt)
+                    _mark_not_cacheable()
                     return suggestion_response.text
             except (json.JSONDecodeError, TypeError):
                 pass # The response was not a JSON list, so proceed normally.
@@ -132,24 +242,42 @@ def generate_answer(query):
                     role="tool"
                 )
             )
+            _log_prompt_tokens(final_response, "tool_answer")
             return final_response.candidates[0].content.parts[0].text
         else:
+             _mark_not_cacheable()
              return "Sorry, I'm not sure how to handle that request."
 
     except (ValueError, IndexError, AttributeError):
         # --- Step 2: Fallback to RAG for conceptual questions ---
-        print("LLM did not choose a tool, falling back to RAG for a conceptual answer.")
+        logger.debug("LLM did not choose a tool, falling back to RAG for a conceptual answer.",
+                     extra={"event": "llm.tool_call", "tool": None})
         
-        conceptual_context = vector_store.find_similar_document_ids(query)
+        passages = knowledge_base.retrieve_context(query, query_embedding=query_embedding)
+        if passages:
+            request_deadline.offer_partial(
+                f"I ran out of time to write a full answer; here is what the knowledge base says:\n\n{passages}"
+            )
+        conceptual_context = passages or "No matching knowledge-base passages were found."
         
+        # The RAG answer is a one-shot call, so earlier turns go into the prompt
+        conversation = "\n".join(
+            f"{'User' if entry['role'] == 'user' else 'MentorBot'}: {entry['parts'][0]['text']}"
+            for entry in history or []
+        )
+
         final_prompt = f"""
         Answer the user's query based on the following context from the platform's knowledge base.
 
         Context:
         {conceptual_context}
 
+        Conversation so far:
+        {conversation or "(none)"}
+
         User Query:
         {query}
         """
         final_response = model_manager.generate_content(final_prompt)
+        _log_prompt_tokens(final_response, "rag_answer")
         return final_response.text
\ No newline at end of file
@@ -0,0 +1,250 @@
+"""
+In-process metrics for the AI service.
+
+Counters, gauges and histograms are kept in plain Python structures guarded by a lock
+per metric, so recording a sample costs a dict lookup and a few additions.
+The registry is rendered in the Prometheus text exposition format by the
+`/metrics` endpoint in main.py.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from core import request_timing
+
+# Latency buckets (seconds) covering sub-millisecond cache hits up to slow
+# multi-round LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{k}="{_escape(v)}"' for k, v in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, optionally split by labels."""
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value that can go up and down (queue depth, cache size), optionally split by labels."""
+
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    render = Counter.render
+
+
+class Histogram(_Metric):
+    """Cumulative bucket histogram of observed values (usually seconds)."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self, **labels):
+        """Returns (count, sum) for one label set."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return (state[2], state[1]) if state else (0, 0.0)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def _register(metric):
+    with _registry_lock:
+        for existing in _registry:
+            if existing.name == metric.name:
+                return existing
+        _registry.append(metric)
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    """Creates (or returns the already registered) counter called `name`."""
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    """Creates (or returns the already registered) gauge called `name`."""
+    return _register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """Creates (or returns the already registered) histogram called `name`."""
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render():
+    """Renders every registered metric in Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Stage metrics shared by the whole service ---
+
+STAGE_LATENCY = histogram(
+    "modx_ai_stage_duration_seconds",
+    "Latency of individual pipeline stages (embedding, chroma, tool, model, scraper, mongo).",
+    ["stage", "name"],
+)
+STAGE_TOTAL = counter(
+    "modx_ai_stage_total",
+    "Number of pipeline stage executions by outcome.",
+    ["stage", "name", "outcome"],
+)
+REQUEST_LATENCY = histogram(
+    "modx_ai_http_request_duration_seconds",
+    "End-to-end latency of HTTP requests handled by the AI service.",
+    ["method", "path", "status"],
+)
+
+
+def record_stage(stage, name, seconds, outcome="ok"):
+    """Records one already-measured stage execution."""
+    STAGE_LATENCY.observe(seconds, stage=stage, name=name)
+    STAGE_TOTAL.inc(stage=stage, name=name, outcome=outcome)
+    request_timing.record(stage, name, seconds)
+
+
+@contextmanager
+def track(stage, name=""):
+    """
+    Context manager that times the wrapped block as one execution of `stage`.
+    An exception escaping the block is counted with outcome="error" and re-raised.
+    """
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        record_stage(stage, name, time.perf_counter() - start, outcome)
+
+
+def timed(stage, name=None):
+    """
+    Decorator form of `track`. The wrapped function keeps its name, docstring
+    and signature, so it can still be handed to Gemini as a tool.
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with track(stage, stage_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -6,17 +6,30 @@ switches between different Gemini models when one fails due to quota limits
 or availability issues.
 """
 
-from google import genai
-from google.genai import types
-from core.config import GEMINI_API_KEY
+from core.config import GEMINI_API_KEY, SINGLE_FLIGHT_ENABLED
+from core import metrics
+from core import rate_limiter
+from core import request_deadline
+from core.lazy import Lazy
+from core.single_flight import SingleFlight, normalize_text
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create Gemini client
-_client = genai.Client(api_key=GEMINI_API_KEY)
+
+def _create_client():
+    # Imported here: google.genai takes most of a second to import
+    from google import genai
+    return genai.Client(api_key=GEMINI_API_KEY)
+
+
+# Shared Gemini client, created on first use
+_client = Lazy(_create_client, name="gemini_client")
+
+
+def get_client():
+    """Returns the process-wide Gemini client, creating it on first use."""
+    return _client.get()
 
 # Model priority list (ordered by preference and quota availability)
 MODEL_FALLBACK_ORDER = [
@@ -28,6 +41,16 @@ MODEL_FALLBACK_ORDER = [
     'gemini-2.0-flash',            # Fallback 5: May have quota issues
 ]
 
+MODEL_FALLBACKS = metrics.counter(
+    "modx_ai_model_fallbacks_total",
+    "Number of times a request moved on to a fallback model.",
+    ["model"],
+)
+
+
+# Shared by every ModelManager so that identically configured managers coalesce too
+_generate_flight = SingleFlight("generate_content")
+
 
 class ModelManager:
     """Manages Gemini model instances with automatic fallback."""
@@ -69,9 +92,27 @@ class ModelManager:
     def _create_model(self, model_name):
         """Build a config dict for use with the new client API."""
         # In google.genai the model name + config are passed at call time,
-        # so we just store the name; _client is used in generate_content.
-        return model_name  # model name string used with _client
+        # so we just store the name; the shared client is used in generate_content.
+        return model_name  # model name string used with get_client()
     
+    def generate_config(self):
+        """
+        GenerateContentConfig with the system instruction and tools. Inside a
+        request deadline the HTTP timeout is capped by the time left, so a
+        slow model cannot hold the request past it.
+        """
+        from google.genai import types
+        config_kwargs = {}
+        if self.system_instruction:
+            config_kwargs['system_instruction'] = self.system_instruction
+        if self.tools:
+            config_kwargs['tools'] = self.tools
+        remaining = request_deadline.remaining()
+        if remaining is not None:
+            # In milliseconds; a call is never started with less than 100 ms
+            config_kwargs['http_options'] = types.HttpOptions(timeout=max(100, int(remaining * 1000)))
+        return types.GenerateContentConfig(**config_kwargs) if config_kwargs else None
+
     def get_model(self):
         """
         Get the current working model.
@@ -84,41 +125,61 @@ class ModelManager:
     def generate_content(self, prompt, **kwargs):
         """
         Generate content with automatic fallback on failure.
+
+        Concurrent calls with the same (normalized) text prompt, model, system
+        instruction and tools share a single upstream call.
         """
+        if not SINGLE_FLIGHT_ENABLED or not isinstance(prompt, str):
+            return self._generate_content(prompt)
+        key = (
+            self.current_model_name,
+            self.system_instruction,
+            tuple(getattr(t, "__name__", repr(t)) for t in self.tools or ()),
+            normalize_text(prompt),
+        )
+        return _generate_flight.do(key, self._generate_content, prompt)
+
+    def _generate_content(self, prompt):
+        client = get_client()
         last_exception = None
-        config_kwargs = {}
-        if self.system_instruction:
-            config_kwargs['system_instruction'] = self.system_instruction
-        if self.tools:
-            config_kwargs['tools'] = self.tools
 
         # Try current model first
+        request_deadline.check("model")
         try:
-            return _client.models.generate_content(
-                model=self.current_model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(**config_kwargs) if config_kwargs else None
-            )
+            rate_limiter.acquire(self.current_model_name, "generate")
+            with metrics.track("model", self.current_model_name):
+                return client.models.generate_content(
+                    model=self.current_model_name,
+                    contents=prompt,
+                    config=self.generate_config()
+                )
         except Exception as e:
             logger.warning(f"Model {self.current_model_name} failed: {str(e)[:100]}")
+            rate_limiter.report_rate_limited(self.current_model_name, e)
             last_exception = e
 
         # Try remaining models in fallback order
         current_index = MODEL_FALLBACK_ORDER.index(self.current_model_name)
         for model_name in MODEL_FALLBACK_ORDER[current_index + 1:]:
+            # Out of time: stop walking the fallback list
+            request_deadline.check("model_fallback")
             try:
                 logger.info(f"Switching to fallback model: {model_name}")
+                MODEL_FALLBACKS.inc(model=model_name)
                 self.current_model_name = model_name
                 self.current_model = model_name
-                result = _client.models.generate_content(
-                    model=model_name,
-                    contents=prompt,
-                    config=types.GenerateContentConfig(**config_kwargs) if config_kwargs else None
-                )
+                rate_limiter.acquire(model_name, "generate")
+                with metrics.track("model", model_name):
+                    result = client.models.generate_content(
+                        model=model_name,
+                        contents=prompt,
+                        config=self.generate_config()
+                    )
                 logger.info(f"✅ Successfully switched to model: {model_name}")
                 return result
             except Exception as e:
                 logger.warning(f"Fallback model {model_name} failed: {str(e)[:100]}")
+                rate_limiter.report_rate_limited(model_name, e)
                 last_exception = e
                 continue
 
@@ -148,42 +209,52 @@ class ChatSessionWrapper:
 
     def _create_chat_session(self):
         """Create a new chat session with the current model."""
-        config_kwargs = {}
-        if self.model_manager.system_instruction:
-            config_kwargs['system_instruction'] = self.model_manager.system_instruction
-        if self.model_manager.tools:
-            config_kwargs['tools'] = self.model_manager.tools
-        self.chat = _client.chats.create(
+        self.chat = get_client().chats.create(
             model=self.model_manager.current_model_name,
             history=self.history,
-            config=types.GenerateContentConfig(**config_kwargs) if config_kwargs else None
+            config=self.model_manager.generate_config()
         )
 
+    def _send(self, message):
+        # A per-message config carries the deadline-capped HTTP timeout
+        if request_deadline.current() is None:
+            return self.chat.send_message(message)
+        return self.chat.send_message(message, config=self.model_manager.generate_config())
+
     def send_message(self, message, **kwargs):
         """
         Send a message with automatic fallback on failure.
         """
         last_exception = None
 
+        request_deadline.check("model")
         try:
-            return self.chat.send_message(message)
+            rate_limiter.acquire(self.model_manager.current_model_name, "generate")
+            with metrics.track("model", self.model_manager.current_model_name):
+                return self._send(message)
         except Exception as e:
             logger.warning(f"Chat session failed: {str(e)[:100]}")
+            rate_limiter.report_rate_limited(self.model_manager.current_model_name, e)
             last_exception = e
 
         # Try to recreate chat with fallback models
         current_index = MODEL_FALLBACK_ORDER.index(self.model_manager.current_model_name)
         for model_name in MODEL_FALLBACK_ORDER[current_index + 1:]:
+            request_deadline.check("model_fallback")
             try:
                 logger.info(f"Recreating chat session with fallback model: {model_name}")
+                MODEL_FALLBACKS.inc(model=model_name)
                 self.model_manager.current_model_name = model_name
                 self.model_manager.current_model = model_name
                 self._create_chat_session()
-                result = self.chat.send_message(message)
+                rate_limiter.acquire(model_name, "generate")
+                with metrics.track("model", model_name):
+                    result = self._send(message)
                 logger.info(f"✅ Successfully switched chat to model: {model_name}")
                 return result
             except Exception as e:
                 logger.warning(f"Fallback chat with {model_name} failed: {str(e)[:100]}")
+                rate_limiter.report_rate_limited(model_name, e)
                 last_exception = e
                 continue
 
@@ -1,10 +1,84 @@
 # File: core/orchestrator.py
+import logging
+
 from core import llm_service
+from core import metrics
+from core import request_deadline
+from core.answer_cache import answer_cache
+from core.session_store import session_store
+from core.config import SINGLE_FLIGHT_ENABLED, ANSWER_CACHE_ENABLED
+from core.single_flight import SingleFlight, normalize_text
+from services import vector_store
+
+logger = logging.getLogger(__name__)
+
+# Cached answers came from the collection that was served until a blue/green switch
+vector_store.on_collection_switch(answer_cache.clear)
+
+# Identical questions asked at the same moment get one answer
+_query_flight = SingleFlight("chat")
+
+OUT_OF_TIME_ANSWER = (
+    "Sorry, I couldn't finish answering in time. Please try again, or ask a narrower question."
+)
+
+def partial_answer(deadline):
+    """The best answer gathered before `deadline` ran out (see core.request_deadline)."""
+    return (deadline.partial if deadline is not None else None) or OUT_OF_TIME_ANSWER
+
+def _answer(query, query_embedding=None):
+    with llm_service.track_tool_calls() as tools_used, llm_service.track_cacheability() as answer_state:
+        answer = llm_service.generate_answer(query, query_embedding=query_embedding)
+    if query_embedding:
+        answer_cache.store(query_embedding, query, answer, tools_used, cacheable=answer_state["cacheable"])
+    return answer
 
-def process_query(query):
+def _answer_in_conversation(query, conversation_id):
+    with session_store.session(conversation_id) as session:
+        answer = llm_service.generate_answer(query, session.history())
+        session.add_turn(query, answer)
+        if session.needs_compaction():
+            session.compact(llm_service.summarize_conversation)
+    return answer
+
+def process_query(query, conversation_id=None):
+    """
+    Answers `query`, or returns the best partial answer if the request's
+    deadline passes or its client disconnects first.
+    """
+    try:
+        return _process_query(query, conversation_id)
+    except request_deadline.DeadlineExceeded as e:
+        logger.info(f"Orchestrator: {e}; returning a partial answer.")
+        return partial_answer(request_deadline.current())
+
+def _process_query(query, conversation_id=None):
     """
     The orchestrator's only job is to start the process.
     The LLM service will handle the decision-making.
+
+    Near-paraphrases of a recently answered question are served from the
+    semantic answer cache without calling the LLM. Turns of a conversation
+    (`conversation_id`) depend on its history, so they skip the cache and
+    are answered with the session's history.
     """
-    print(f"Orchestrator: Passing query '{query}' to the LLM service.")
-    return llm_service.generate_answer(query)
\ No newline at end of file
+    if conversation_id:
+        logger.debug("Orchestrator: passing query %r in conversation %s to the LLM service.", query, conversation_id,
+                     extra={"event": "chat.routed", "route": "conversation"})
+        return _answer_in_conversation(query, conversation_id)
+
+    query_embedding = None
+    if ANSWER_CACHE_ENABLED:
+        query_embedding = vector_store.get_embeddings(query)
+        if query_embedding:
+            with metrics.track("answer_cache", "lookup"):
+                cached = answer_cache.lookup(query_embedding)
+            if cached is not None:
+                logger.debug("Orchestrator: answering %r from the cache (similarity %.3f).", query, cached[1],
+                             extra={"event": "chat.routed", "route": "answer_cache"})
+                return cached[0]
+
+    logger.debug("Orchestrator: passing query %r to the LLM service.", query, extra={"event": "chat.routed", "route": "llm"})
+    if not SINGLE_FLIGHT_ENABLED:
+        return _answer(query, query_embedding)
+    return _query_flight.do(normalize_text(query), _answer, query, query_embedding)
\ No newline at end of file
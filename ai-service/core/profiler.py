@@ -0,0 +1,66 @@
+"""
+On-demand sampling profiler for the live process.
+
+Nothing is installed while the profiler is idle: no trace hooks, no signal
+handlers and no background thread. A capture starts a short-lived thread that
+walks `sys._current_frames()` at a fixed interval and aggregates the stacks in
+the folded format understood by flamegraph.pl, speedscope and inferno.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+_capture_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a capture is requested while another one is running."""
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _folded_stack(thread_name, frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    labels.reverse()
+    return ";".join(labels)
+
+
+def capture(seconds, interval=0.005):
+    """
+    Samples every thread's stack for `seconds` and returns the folded stacks
+    (one "frame;frame;frame count" line per distinct stack).
+
+    Only one capture can run at a time; a concurrent request raises
+    ProfilerBusyError instead of doubling the sampling overhead.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile capture is already running.")
+    try:
+        samples = Counter()
+        sampler_ident = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == sampler_ident:
+                    continue
+                samples[_folded_stack(names.get(ident, f"thread-{ident}"), frame)] += 1
+            time.sleep(interval)
+        return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+    finally:
+        _capture_lock.release()
+
+
+def is_running():
+    return _capture_lock.locked()
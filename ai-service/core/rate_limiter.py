@@ -0,0 +1,233 @@
+"""
+Client-side quota scheduler for Gemini calls.
+
+Every Gemini request takes a token from two buckets: one per model (the
+per-model RPM quota) and one per endpoint kind ("generate", "embed"). When a
+bucket is empty the caller queues instead of failing with a 429, for at most
+the timeout of its priority class. Embedding calls are only held to a model
+bucket when their model is listed in GEMINI_MODEL_RPM; otherwise
+GEMINI_EMBED_RPM alone applies (GEMINI_DEFAULT_MODEL_RPM is sized for
+generation models).
+
+Priority comes from a context variable set by the caller (`priority(...)`):
+interactive chat turns first, then background work such as scraper
+summaries, then bulk indexing. A waiter is only served once no waiter of a
+higher priority (or the same priority, queued earlier) is waiting on one of
+its buckets, so a reindex cannot starve /chat.
+
+Buckets are per process. With several workers, divide the quotas by the
+number of workers.
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core import metrics, request_deadline, request_timing
+from core.config import (
+    GEMINI_RATE_LIMIT_ENABLED,
+    GEMINI_MODEL_RPM,
+    GEMINI_DEFAULT_MODEL_RPM,
+    GEMINI_GENERATE_RPM,
+    GEMINI_EMBED_RPM,
+    GEMINI_BURST_SECONDS,
+    GEMINI_QUEUE_TIMEOUTS,
+)
+
+PRIORITIES = {"interactive": 0, "background": 1, "bulk": 2}
+DEFAULT_TIMEOUTS = {"interactive": 15.0, "background": 60.0, "bulk": 300.0}
+
+QUEUE_WAIT = metrics.histogram(
+    "modx_ai_gemini_queue_wait_seconds",
+    "Time Gemini calls spent queued for rate-limit tokens.",
+    ["endpoint", "priority"],
+)
+QUEUE_TIMEOUTS = metrics.counter(
+    "modx_ai_gemini_queue_timeouts_total",
+    "Gemini calls that gave up waiting for rate-limit tokens.",
+    ["endpoint", "priority"],
+)
+QUEUE_DEPTH = metrics.gauge(
+    "modx_ai_gemini_queue_depth",
+    "Gemini calls currently waiting for rate-limit tokens.",
+    ["priority"],
+)
+
+_priority = ContextVar("gemini_priority", default="interactive")
+
+
+class RateLimitTimeoutError(TimeoutError):
+    """No rate-limit token became available before the caller's deadline."""
+
+
+def parse_mapping(value, cast=float):
+    """Parses "a=1,b=2" into {"a": 1.0, "b": 2.0}."""
+    mapping = {}
+    for item in (value or "").split(","):
+        key, sep, raw = item.partition("=")
+        if sep and key.strip():
+            mapping[key.strip()] = cast(raw)
+    return mapping
+
+
+@contextmanager
+def priority(level):
+    """Runs the block's Gemini calls at `level` (interactive, background or bulk)."""
+    if level not in PRIORITIES:
+        raise ValueError(f"Unknown priority {level!r}; expected one of {tuple(PRIORITIES)}")
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+class TokenBucket:
+    """Refills at `rate_per_minute`, holding at most `capacity` tokens. A rate of 0 never limits."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate * GEMINI_BURST_SECONDS)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now, cost=1.0):
+        """Seconds until `cost` tokens are available (0 if they are now)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    def take(self, cost=1.0):
+        if self.rate > 0:
+            self.tokens -= cost
+
+    def drain(self, now):
+        """Empties the bucket, e.g. after the server answered 429 anyway."""
+        if self.rate > 0:
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class _Waiter:
+    __slots__ = ("rank", "keys")
+
+    def __init__(self, rank, keys):
+        self.rank = rank
+        self.keys = keys
+
+
+class GeminiScheduler:
+    """Shared token buckets plus a priority wait queue."""
+
+    def __init__(self, model_rpm=None, default_model_rpm=GEMINI_DEFAULT_MODEL_RPM,
+                 endpoint_rpm=None, timeouts=None):
+        self.model_rpm = dict(model_rpm or {})
+        self.default_model_rpm = default_model_rpm
+        self.endpoint_rpm = dict(endpoint_rpm or {})
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self._cond = threading.Condition()
+        self._buckets = {}
+        self._waiters = []
+        self._sequence = itertools.count()
+
+    def _bucket(self, key):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            kind, name = key
+            rpm = self.model_rpm.get(name, self.default_model_rpm) if kind == "model" else self.endpoint_rpm.get(name, 0)
+            bucket = self._buckets[key] = TokenBucket(rpm)
+        return bucket
+
+    def _blocked(self, waiter):
+        """True while an earlier or higher-priority waiter wants one of the same buckets."""
+        return any(
+            other.rank < waiter.rank and not other.keys.isdisjoint(waiter.keys)
+            for other in self._waiters
+        )
+
+    def acquire(self, model, endpoint, cost=1.0, timeout=None):
+        """
+        Takes `cost` tokens from the model and endpoint buckets, waiting in
+        priority order. Returns the seconds spent waiting; raises
+        RateLimitTimeoutError once the priority's timeout has passed.
+        """
+        level = current_priority()
+        timeout = self.timeouts.get(level, DEFAULT_TIMEOUTS["interactive"]) if timeout is None else timeout
+        keys = {("endpoint", endpoint)}
+        if endpoint != "embed" or model in self.model_rpm:
+            keys.add(("model", model))
+        keys = frozenset(keys)
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._cond:
+            waiter = _Waiter((PRIORITIES[level], next(self._sequence)), keys)
+            self._waiters.append(waiter)
+            QUEUE_DEPTH.inc(priority=level)
+            try:
+                while True:
+                    now = time.monotonic()
+                    sleep = None
+                    if not self._blocked(waiter):
+                        buckets = [self._bucket(key) for key in keys]
+                        sleep = max(bucket.wait_time(now, cost) for bucket in buckets)
+                        if sleep <= 0:
+                            for bucket in buckets:
+                                bucket.take(cost)
+                            break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        QUEUE_TIMEOUTS.inc(endpoint=endpoint, priority=level)
+                        raise RateLimitTimeoutError(
+                            f"No Gemini quota for {model} ({endpoint}) within {timeout:g}s"
+                        )
+                    self._cond.wait(remaining if sleep is None else min(sleep, remaining))
+            finally:
+                self._waiters.remove(waiter)
+                QUEUE_DEPTH.dec(priority=level)
+                self._cond.notify_all()
+        waited = time.monotonic() - start
+        QUEUE_WAIT.observe(waited, endpoint=endpoint, priority=level)
+        if waited > 0.001:
+            request_timing.record("queue", endpoint, waited)
+        return waited
+
+    def report_rate_limited(self, model):
+        """Drains `model`'s bucket after an upstream 429 so queued calls back off."""
+        with self._cond:
+            self._bucket(("model", model)).drain(time.monotonic())
+
+
+def is_rate_limit_error(error):
+    text = str(error)
+    return "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+scheduler = GeminiScheduler(
+    model_rpm=parse_mapping(GEMINI_MODEL_RPM),
+    endpoint_rpm={"generate": GEMINI_GENERATE_RPM, "embed": GEMINI_EMBED_RPM},
+    timeouts=parse_mapping(GEMINI_QUEUE_TIMEOUTS),
+)
+
+
+def acquire(model, endpoint, cost=1.0):
+    """Waits for quota for one Gemini call (no-op when rate limiting is disabled)."""
+    if GEMINI_RATE_LIMIT_ENABLED:
+        # Never queue past the request's deadline
+        timeout = scheduler.timeouts.get(current_priority(), DEFAULT_TIMEOUTS["interactive"])
+        scheduler.acquire(model, endpoint, cost, timeout=request_deadline.bound(timeout))
+
+
+def report_rate_limited(model, error):
+    if GEMINI_RATE_LIMIT_ENABLED and is_rate_limit_error(error):
+        scheduler.report_rate_limited(model)
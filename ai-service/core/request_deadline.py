@@ -0,0 +1,143 @@
+"""
+Per-request deadlines for /chat.
+
+A chat turn can take several LLM rounds, a tool call, a multi-page scrape
+and a walk down MODEL_FALLBACK_ORDER. The caller (the backend's
+aiHttpClient) gives up after a fixed time, so the endpoint opens a
+`scope(seconds)` with the budget from the `X-Request-Timeout-Ms` header (or
+CHAT_DEADLINE_SECONDS). The deadline lives in a context variable, like
+core.request_timing, and is therefore visible to everything running for
+the request:
+
+- `check(stage)` raises DeadlineExceeded once the budget is spent or the
+  client has disconnected; it is called between expensive steps.
+- `bound(seconds)` caps a timeout (HTTP calls, queue waits) by what is left.
+- `offer_partial(text)` records the best answer available so far, which is
+  returned instead of nothing when the deadline passes.
+
+Outside a scope (scripts, indexing) every function is a no-op. Work handed
+to another thread pool must be submitted with `submit()` so the deadline
+goes with it.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core import metrics
+
+# How often the endpoint checks whether the client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+# Time the worker gets past the deadline to return its own partial answer
+GRACE_SECONDS = 1.0
+
+DEADLINE_EXCEEDED = metrics.counter(
+    "modx_ai_deadline_exceeded_total",
+    "Requests stopped by their deadline, by the stage that noticed and the reason (timeout, disconnected).",
+    ["stage", "reason"],
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out or its client went away."""
+
+
+class Deadline:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.reason = None
+        self.partial = None
+        self._cancelled = threading.Event()
+
+    def cancel(self, reason="disconnected"):
+        """Stops the request's remaining work at its next checkpoint."""
+        self.reason = self.reason or reason
+        self._cancelled.set()
+
+    def remaining(self):
+        if self._cancelled.is_set():
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def check(self, stage):
+        if self.expired():
+            reason = self.reason or "timeout"
+            DEADLINE_EXCEEDED.inc(stage=stage, reason=reason)
+            raise DeadlineExceeded(f"Deadline of {self.seconds:g}s reached before {stage} ({reason})")
+
+
+_current = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def scope(seconds):
+    """Runs the block under a deadline `seconds` from now and yields the Deadline."""
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def remaining():
+    """Seconds left for the current request, or None outside a deadline scope."""
+    deadline = _current.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def bound(seconds):
+    """`seconds` capped by the time left for the current request."""
+    left = remaining()
+    return seconds if left is None else min(seconds, left)
+
+
+def check(stage):
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+def offer_partial(text):
+    """Records `text` as the answer to return if the deadline passes from here on."""
+    deadline = _current.get()
+    if deadline is not None and text:
+        deadline.partial = text
+
+
+def submit(executor, fn, *args, **kwargs):
+    """`executor.submit` that runs `fn` under the caller's deadline (and other context)."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+async def run_in_threadpool(request, fn, *args):
+    """
+    Runs `fn(*args)` in the worker thread pool under the current deadline.
+    Cancels the deadline when the client disconnects, and raises
+    DeadlineExceeded when the worker has not returned shortly after the
+    deadline, leaving it to stop at its next checkpoint.
+    """
+    from starlette.concurrency import run_in_threadpool as _run_in_threadpool
+    deadline = _current.get()
+    task = asyncio.ensure_future(_run_in_threadpool(fn, *args))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            deadline.cancel("disconnected")
+        if deadline.expires_at + GRACE_SECONDS <= time.monotonic() or deadline.reason == "disconnected":
+            # The worker's eventual result or error is no longer wanted
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            deadline.check("response")
@@ -0,0 +1,71 @@
+"""
+Per-request stage timing, rendered as a Server-Timing header.
+
+The HTTP middleware calls `start()` before handing the request to the app;
+every stage recorded through core.metrics while that request is running is
+appended to its list. Outside a request (scripts, background indexing) the
+context variable is unset and recording is a no-op.
+"""
+
+from contextvars import ContextVar
+
+_stages = ContextVar("request_stages", default=None)
+
+# Short Server-Timing metric names for the metrics stage labels
+_STAGE_ALIASES = {
+    "embedding": "embed",
+    "chroma": "vector",
+    "snapshot": "local_vector",
+    "model": "llm",
+    "tool": "tool",
+    "scraper": "scrape",
+    "mongo": "mongo",
+}
+
+
+def start():
+    """Begins collecting stages for the current request and returns the token."""
+    return _stages.set([])
+
+
+def stop(token):
+    """Stops collecting and returns the stages recorded for the request."""
+    stages = _stages.get()
+    _stages.reset(token)
+    return stages or []
+
+
+def record(stage, name, seconds):
+    stages = _stages.get()
+    if stages is not None:
+        stages.append((stage, name, seconds))
+
+
+def _quote(value):
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def format_server_timing(stages, total_seconds=None):
+    """
+    Formats recorded stages as a Server-Timing header value, e.g.
+    `embed;dur=84.1;desc="models/text-embedding-004", vector_query;dur=12.0, llm_1;dur=900.2, ...`
+
+    LLM calls are numbered in the order they happened (llm_1, llm_2, ...) so the
+    two rounds of a tool-using chat turn can be told apart.
+    """
+    entries = []
+    llm_round = 0
+    for stage, name, seconds in stages:
+        alias = _STAGE_ALIASES.get(stage, stage)
+        if stage == "model":
+            llm_round += 1
+            alias = f"llm_{llm_round}"
+        elif stage in ("chroma", "snapshot"):
+            alias = f"{alias}_{name}"
+        entry = f"{alias};dur={seconds * 1000:.1f}"
+        if name and stage not in ("chroma", "snapshot"):
+            entry += f";desc={_quote(name)}"
+        entries.append(entry)
+    if total_seconds is not None:
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
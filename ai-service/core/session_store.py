@@ -0,0 +1,255 @@
+"""
+Server-side conversation sessions for /chat.
+
+A session keeps the turns of one conversation (the user's message and the
+final answer; tool round-trips are not kept) plus a rolling summary. Once
+the recent turns exceed CHAT_HISTORY_TOKEN_LIMIT estimated tokens, all but the
+last CHAT_HISTORY_KEEP_TURNS are folded into the summary by the LLM. The
+history sent with each turn therefore stays roughly the same size however
+long the conversation runs.
+
+Sessions live in an in-process LRU bounded by CHAT_SESSION_MAX and expire
+after CHAT_SESSION_TTL_SECONDS of inactivity. With CHAT_SESSION_DB set they
+are also written through to a local SQLite file, so they survive restarts
+and are shared by workers on the same host.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from core import metrics
+from core.config import (
+    CHAT_SESSION_MAX,
+    CHAT_SESSION_TTL_SECONDS,
+    CHAT_SESSION_DB,
+    CHAT_HISTORY_TOKEN_LIMIT,
+    CHAT_HISTORY_KEEP_TURNS,
+    CHAT_SUMMARY_TOKENS,
+)
+from core.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SESSIONS = metrics.gauge(
+    "modx_ai_chat_sessions",
+    "Conversation sessions held in memory.",
+)
+SESSION_EVENTS = metrics.counter(
+    "modx_ai_chat_session_events_total",
+    "Conversation session events (created, loaded, evicted, expired, compacted).",
+    ["event"],
+)
+
+SUMMARY_PROMPT = """Summarize the conversation below between a MoDX platform user and MentorBot so it can replace the original turns as context.
+Keep facts the user shared about themselves, projects, skills or people that were mentioned, and any open questions. Be concise; at most {max_words} words.
+
+Summary so far:
+{summary}
+
+New turns:
+{turns}
+"""
+
+
+class Session:
+    """The state of one conversation."""
+
+    def __init__(self, conversation_id, summary="", turns=None, updated_at=None):
+        self.conversation_id = conversation_id
+        self.summary = summary
+        self.turns = list(turns or [])
+        self.updated_at = time.time() if updated_at is None else updated_at
+        self.lock = threading.Lock()
+
+    def history(self):
+        """The session as chat history entries (role/parts dicts), oldest first."""
+        entries = []
+        if self.summary:
+            entries.append({"role": "user", "parts": [{"text": f"Summary of our conversation so far: {self.summary}"}]})
+            entries.append({"role": "model", "parts": [{"text": "Thanks, I'll keep that in mind."}]})
+        for user_text, model_text in self.turns:
+            entries.append({"role": "user", "parts": [{"text": user_text}]})
+            entries.append({"role": "model", "parts": [{"text": model_text}]})
+        return entries
+
+    def add_turn(self, user_text, model_text):
+        self.turns.append((user_text, model_text))
+        self.updated_at = time.time()
+
+    def history_tokens(self):
+        return estimate_tokens(self.summary) + sum(estimate_tokens(u) + estimate_tokens(m) for u, m in self.turns)
+
+    def needs_compaction(self, token_limit=CHAT_HISTORY_TOKEN_LIMIT, keep_turns=CHAT_HISTORY_KEEP_TURNS):
+        return len(self.turns) > keep_turns and self.history_tokens() > token_limit
+
+    def compact(self, summarize, keep_turns=CHAT_HISTORY_KEEP_TURNS, summary_tokens=CHAT_SUMMARY_TOKENS):
+        """
+        Folds all but the last `keep_turns` turns into the summary using
+        `summarize(prompt) -> str`. On failure the turns are kept as they are.
+        """
+        if keep_turns:
+            old, recent = self.turns[:-keep_turns], self.turns[-keep_turns:]
+        else:
+            old, recent = self.turns, []
+        if not old:
+            return False
+        transcript = "\n".join(f"User: {u}\nMentorBot: {m}" for u, m in old)
+        prompt = SUMMARY_PROMPT.format(
+            max_words=max(20, summary_tokens * 3 // 4),
+            summary=self.summary or "(none)",
+            turns=transcript,
+        )
+        try:
+            summary = summarize(prompt)
+        except Exception as e:
+            logger.warning(f"Session {self.conversation_id}: could not compact history: {e}")
+            return False
+        if not summary:
+            return False
+        self.summary = truncate_to_tokens(summary.strip(), summary_tokens)
+        self.turns = recent
+        SESSION_EVENTS.inc(event="compacted")
+        return True
+
+    def to_json(self):
+        return json.dumps({"summary": self.summary, "turns": self.turns})
+
+    @classmethod
+    def from_json(cls, conversation_id, data, updated_at):
+        state = json.loads(data)
+        return cls(conversation_id, state.get("summary", ""), [tuple(t) for t in state.get("turns", [])], updated_at)
+
+
+class SqliteBackend:
+    """Sessions persisted in a local SQLite file, one row per conversation."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                "conversation_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def load(self, conversation_id):
+        row = self._connect().execute(
+            "SELECT data, updated_at FROM chat_sessions WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return Session.from_json(conversation_id, row[0], row[1]) if row else None
+
+    def save(self, session):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_sessions (conversation_id, data, updated_at) VALUES (?, ?, ?)",
+                (session.conversation_id, session.to_json(), session.updated_at),
+            )
+
+    def delete(self, conversation_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chat_sessions WHERE conversation_id = ?", (conversation_id,))
+
+    def delete_expired(self, before):
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (before,)).rowcount
+
+
+class SessionStore:
+    """LRU + TTL map of conversation id to Session, optionally backed by SQLite."""
+
+    def __init__(self, max_sessions=CHAT_SESSION_MAX, ttl_seconds=CHAT_SESSION_TTL_SECONDS, backend=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._last_prune = time.time()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _expired(self, session, now):
+        return now - session.updated_at > self.ttl_seconds
+
+    def get(self, conversation_id, create=True):
+        """The live session for `conversation_id` (a new one if `create`), else None."""
+        now = time.time()
+        # Expired sessions are otherwise only noticed when they are looked up
+        if now - self._last_prune > self.ttl_seconds / 10:
+            self.prune()
+        with self._lock:
+            session = self._sessions.get(conversation_id)
+            if session is not None and self._expired(session, now):
+                del self._sessions[conversation_id]
+                SESSION_EVENTS.inc(event="expired")
+                session = None
+            if self.backend is not None:
+                # Another worker may have continued the conversation since
+                stored = self.backend.load(conversation_id)
+                if stored is not None and not self._expired(stored, now) and (
+                        session is None or stored.updated_at > session.updated_at):
+                    session = stored
+                    SESSION_EVENTS.inc(event="loaded")
+            if session is None:
+                if not create:
+                    return None
+                session = Session(conversation_id)
+                SESSION_EVENTS.inc(event="created")
+            self._sessions[conversation_id] = session
+            self._sessions.move_to_end(conversation_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                SESSION_EVENTS.inc(event="evicted")
+            SESSIONS.set(len(self._sessions))
+            return session
+
+    @contextmanager
+    def session(self, conversation_id):
+        """Holds the session's lock for one turn and saves it afterwards."""
+        session = self.get(conversation_id)
+        with session.lock:
+            yield session
+            self.save(session)
+
+    def save(self, session):
+        if self.backend is not None:
+            self.backend.save(session)
+
+    def delete(self, conversation_id):
+        """Ends a conversation. Returns True if it existed."""
+        with self._lock:
+            existed = self._sessions.pop(conversation_id, None) is not None
+            SESSIONS.set(len(self._sessions))
+        if self.backend is not None:
+            existed = self.backend.load(conversation_id) is not None or existed
+            self.backend.delete(conversation_id)
+        return existed
+
+    def prune(self):
+        """Drops expired sessions from memory and the backend."""
+        self._last_prune = time.time()
+        cutoff = self._last_prune - self.ttl_seconds
+        with self._lock:
+            for conversation_id in [c for c, s in self._sessions.items() if s.updated_at < cutoff]:
+                del self._sessions[conversation_id]
+                SESSION_EVENTS.inc(event="expired")
+            SESSIONS.set(len(self._sessions))
+        if self.backend is not None:
+            self.backend.delete_expired(cutoff)
+
+
+# Per-process store used by the orchestrator
+session_store = SessionStore(backend=SqliteBackend(CHAT_SESSION_DB) if CHAT_SESSION_DB else None)
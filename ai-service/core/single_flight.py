@@ -0,0 +1,101 @@
+"""
+In-flight deduplication ("single flight") for upstream calls.
+
+When many identical requests arrive together (a trending search term, the
+same chat question from several clients), only the first caller for a key
+makes the Gemini call; callers that arrive while it is running wait for it
+and receive the same result, or the same exception. Nothing is cached once
+the call finishes — that is the answer cache's job — so results are never
+stale.
+
+Followers wait at most `timeout` seconds (or until their own request
+deadline) and then raise SingleFlightTimeoutError instead of blocking
+behind a hung call. If the leader's request ran out of time, a follower
+with time left makes the call itself.
+"""
+
+import threading
+
+from core import metrics
+from core import request_deadline
+from core.config import SINGLE_FLIGHT_TIMEOUT_SECONDS
+
+SINGLE_FLIGHT_CALLS = metrics.counter(
+    "modx_ai_single_flight_calls_total",
+    "Calls through a single-flight group, by role (leader made the call, follower shared it).",
+    ["group", "role"],
+)
+
+
+class SingleFlightTimeoutError(TimeoutError):
+    """A follower gave up waiting for the in-flight call it joined."""
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+def normalize_text(text):
+    """Key form of a text input: case-folded with whitespace collapsed."""
+    return " ".join(str(text).split()).casefold()
+
+
+class SingleFlight:
+    """A named group of calls deduplicated by key."""
+
+    def __init__(self, name, timeout=SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs `fn(*args, **kwargs)` unless a call with the same `key` is already
+        in flight, in which case waits for and returns that call's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, role="follower")
+            if not call.done.wait(request_deadline.bound(self.timeout)):
+                request_deadline.check(f"single_flight:{self.name}")
+                SINGLE_FLIGHT_CALLS.inc(group=self.name, role="timeout")
+                raise SingleFlightTimeoutError(
+                    f"Timed out after {self.timeout}s waiting for an identical {self.name} call"
+                )
+            if isinstance(call.error, request_deadline.DeadlineExceeded) and request_deadline.remaining() != 0.0:
+                # The leader's deadline, not ours: try again
+                return self.do(key, fn, *args, **kwargs)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        SINGLE_FLIGHT_CALLS.inc(group=self.name, role="leader")
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking followers so later arrivals start a fresh call
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
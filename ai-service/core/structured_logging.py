@@ -0,0 +1,202 @@
+"""
+Non-blocking, structured logging for the AI service.
+
+`configure_logging()` puts a bounded in-memory queue behind the root logger.
+Request threads only render the message and enqueue the record; a listener
+thread formats it and writes it to stderr. If the queue is full, the record
+is dropped and counted (modx_ai_log_records_dropped_total), so a slow log
+pipe never blocks a request.
+
+With LOG_FORMAT=json every record is one JSON line with the timestamp,
+level, logger, message, the id of the request being served and any `extra`
+fields. The HTTP middleware binds the request id from X-Request-ID, or
+generates one. High-volume lines pass an `event` name in `extra`, and each
+event is kept at its sample rate: DEFAULT_SAMPLE_RATES, overridden by
+LOG_SAMPLE_RATES. Kept records carry `sample_rate` so counts can be scaled
+back up. Warnings and errors are never sampled.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from core import metrics
+from core.config import LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES
+from core.rate_limiter import parse_mapping
+
+# Per-request debug lines; at LOG_LEVEL=DEBUG these would otherwise dominate the volume
+DEFAULT_SAMPLE_RATES = {
+    "chat.query": 0.1,
+    "chat.routed": 0.1,
+    "llm.prompt_tokens": 0.1,
+    "llm.tool_call": 0.1,
+    "tool.call": 0.1,
+    "scraper.start": 0.1,
+}
+# uvicorn's own loggers, re-routed through the queue instead of their synchronous handlers
+_UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_request_id = ContextVar("request_id", default=None)
+
+# Attributes of every LogRecord; anything else on a record came from `extra`
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "event", "sample_rate"}
+
+RECORDS_DROPPED = metrics.counter(
+    "modx_ai_log_records_dropped_total",
+    "Log records dropped because the log queue was full.",
+)
+RECORDS_SAMPLED_OUT = metrics.counter(
+    "modx_ai_log_records_sampled_out_total",
+    "Log records skipped by per-event sampling.",
+    ["event"],
+)
+
+
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def bind_request_id(request_id):
+    """Tags log records from the current context with `request_id`; returns the token for `unbind_request_id`."""
+    return _request_id.set(request_id)
+
+
+def unbind_request_id(token):
+    _request_id.reset(token)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class Sampler(logging.Filter):
+    """Keeps records with an `event` at that event's rate; records without one always pass."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        if random.random() < rate:
+            record.sample_rate = rate
+            return True
+        RECORDS_SAMPLED_OUT.inc(event=event)
+        return False
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("request_id", "event", "sample_rate"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain lines for local development, with the request id when there is one."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [request {request_id}]" if request_id else line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Runs on the calling thread: capture what depends on its context and
+        # render the message, leave JSON encoding and I/O to the listener
+        record = copy.copy(record)
+        record.request_id = _request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            RECORDS_DROPPED.inc()
+
+
+_state = {"handler": None, "listener": None, "output": None}
+
+
+def _start_listener():
+    """Starts a listener thread on a fresh queue (also in each forked worker)."""
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    _state["handler"].queue = log_queue
+    _state["listener"] = logging.handlers.QueueListener(log_queue, _state["output"], respect_handler_level=True)
+    _state["listener"].start()
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """
+    Routes the root logger (and uvicorn's loggers) through the queue. Safe
+    to call more than once; only the first call takes effect.
+    """
+    if _state["handler"] is not None:
+        return
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if (fmt or LOG_FORMAT) == "json" else TextFormatter())
+    handler = _QueueHandler(None)
+    handler.addFilter(Sampler({**DEFAULT_SAMPLE_RATES, **parse_mapping(LOG_SAMPLE_RATES)}))
+    _state.update(handler=handler, output=output)
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel((level or LOG_LEVEL).upper())
+    for name in _UVICORN_LOGGERS:
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+
+    _start_listener()
+    # gunicorn imports the app in the master (preload_app) and forks; the
+    # listener thread does not survive the fork, so each worker starts its own
+    os.register_at_fork(after_in_child=_start_listener)
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Writes out the queued records and stops the listener thread."""
+    listener = _state["listener"]
+    if listener is not None and listener._thread is not None:
+        listener.stop()
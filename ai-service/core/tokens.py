@@ -0,0 +1,34 @@
+"""
+Cheap token estimates for budgeting prompt text.
+
+Gemini's tokenizer is only reachable through an API call, so chunk sizes and
+prompt budgets use a local estimate instead: one token per word or
+punctuation mark, and at least one token per four characters (long words
+and identifiers split into several tokens). It errs on the high side, which
+is the safe direction for a budget.
+"""
+
+import math
+import re
+
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Estimated number of Gemini tokens in `text`."""
+    if not text:
+        return 0
+    return max(len(_PIECES.findall(text)), math.ceil(len(text) / 4))
+
+
+def truncate_to_tokens(text, budget, suffix="…"):
+    """Cuts `text` at a word boundary so that it fits in `budget` tokens."""
+    if budget <= 0:
+        return ""
+    if estimate_tokens(text) <= budget:
+        return text
+    cut = text[:budget * 4]
+    while cut and estimate_tokens(cut + suffix) > budget:
+        cut = cut[:int(len(cut) * 0.9)]
+    cut = cut.rsplit(" ", 1)[0] if " " in cut else cut
+    return cut.rstrip(" ,;:") + suffix if cut else ""
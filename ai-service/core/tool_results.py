@@ -0,0 +1,113 @@
+"""
+Shapes tool results before they are sent back to the model.
+
+Database tools return whole documents, and a broad query can match hundreds
+of them; sending all of that as the function response multiplies the input
+tokens (and latency) of the follow-up LLM round. Each result is cut down to
+what the model needs to answer:
+
+- only the fields listed for the tool are kept, in that order;
+- long text fields are truncated and long lists are capped;
+- at most TOOL_RESULT_MAX_ITEMS records are kept, with a note saying how
+  many more matched;
+- the serialized result must fit in TOOL_RESULT_TOKEN_BUDGET estimated
+  tokens; trailing records are dropped until it does.
+"""
+
+import functools
+import json
+
+from core import metrics
+from core.config import TOOL_RESULT_MAX_ITEMS, TOOL_RESULT_TOKEN_BUDGET, TOOL_RESULT_FIELD_TOKENS
+from core.tokens import estimate_tokens, truncate_to_tokens
+
+# Fields kept per tool: name -> None (as is), a token limit for text, or an item limit for lists
+FIELD_SPECS = {
+    "find_projects": {
+        "_id": None,
+        "title": None,
+        "description": TOOL_RESULT_FIELD_TOKENS,
+        "requiredSkills": 8,
+        "techStack": 8,
+    },
+    "find_users": {
+        "fullName": None,
+        "roles": None,
+        "interest": TOOL_RESULT_FIELD_TOKENS,
+    },
+}
+
+TOOL_RESULT_TOKENS = metrics.histogram(
+    "modx_ai_tool_result_tokens",
+    "Estimated tokens of tool results sent to the model, before and after shaping.",
+    ["tool", "stage"],
+    buckets=(50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000),
+)
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _shape_value(value, limit):
+    if limit is None:
+        return value
+    if isinstance(value, str):
+        return truncate_to_tokens(value, limit)
+    if isinstance(value, list) and len(value) > limit:
+        return value[:limit] + [f"+{len(value) - limit} more"]
+    return value
+
+
+def shape_record(record, spec):
+    if not isinstance(record, dict) or spec is None:
+        return record
+    return {field: _shape_value(record[field], limit) for field, limit in spec.items() if field in record}
+
+
+def _fit(records, total, envelope, token_budget):
+    """Drops trailing records until the serialized envelope fits the budget."""
+    kept = list(records)
+    while True:
+        shaped = dict(envelope, data=kept)
+        if len(kept) < total:
+            shaped["more"] = f"{total - len(kept)} more results not shown; ask the user to narrow the search."
+        text = _dumps(shaped)
+        if not kept or estimate_tokens(text) <= token_budget:
+            return text
+        kept.pop()
+
+
+def shape_tool_result(tool_name, result, max_items=TOOL_RESULT_MAX_ITEMS, token_budget=TOOL_RESULT_TOKEN_BUDGET):
+    """Returns the compact, budgeted form of `result` (a tool's return value)."""
+    if not isinstance(result, str):
+        result = _dumps(result)
+    try:
+        parsed = json.loads(result)
+    except (json.JSONDecodeError, TypeError):
+        # Free text, e.g. the scraper's report
+        return truncate_to_tokens(result, token_budget)
+
+    spec = FIELD_SPECS.get(tool_name)
+    if isinstance(parsed, dict) and isinstance(parsed.get("data"), list):
+        records, envelope = parsed["data"], {k: v for k, v in parsed.items() if k != "data"}
+    elif isinstance(parsed, list):
+        records, envelope = parsed, {}
+    else:
+        return truncate_to_tokens(_dumps(parsed), token_budget)
+
+    shaped = [shape_record(record, spec) for record in records[:max_items]]
+    return _fit(shaped, len(records), envelope, token_budget)
+
+
+def shaped(tool):
+    """Wraps a tool so that whoever calls it (us or the SDK) gets the shaped result."""
+    @functools.wraps(tool)
+    def wrapper(*args, **kwargs):
+        result = tool(*args, **kwargs)
+        compact = shape_tool_result(tool.__name__, result)
+        raw = result if isinstance(result, str) else _dumps(result)
+        TOOL_RESULT_TOKENS.observe(estimate_tokens(raw), tool=tool.__name__, stage="raw")
+        TOOL_RESULT_TOKENS.observe(estimate_tokens(compact), tool=tool.__name__, stage="shaped")
+        return compact
+    return wrapper
@@ -1,88 +1,215 @@
-from pymongo import MongoClient
+from datetime import datetime, timedelta
+from pymongo import MongoClient, UpdateOne
 from bson import ObjectId
-from core.config import MONGODB_URI
+from core.config import MONGODB_URI, SYNC_WATERMARK_OVERLAP_SECONDS
+from core import metrics
+from core.lazy import Lazy
+
+# Holds one high-water mark per synced collection (see read_changes)
+SYNC_STATE_COLLECTION = "sync_state"
+SYNCED_COLLECTIONS = ("projects", "users")
+# Documents per bulk write
+BULK_WRITE_SIZE = 1000
+
+# One client (and connection pool) per process, opened on first use
+_mongo_client = Lazy(lambda: MongoClient(MONGODB_URI), name="mongo_client")
 
 def get_mongodb_connection():
     """Get MongoDB connection"""
-    client = MongoClient(MONGODB_URI)
+    client = _mongo_client.get()
     db = client.get_database()  # Uses database from connection string
     return db
 
-def get_new_or_updated_documents():
-    """Fetch new or updated documents from MongoDB for indexing"""
-    db = get_mongodb_connection()
-    documents = []
-
-    # Projects - fetch projects that need indexing
-    projects_collection = db['projects']
-    users_collection = db['users']
+def build_project_document(project, leader_name):
+    """(doc_id, text, metadata) for a project document"""
+    doc_id = f"project_{project['_id']}"
     
-    # Find projects where indexed_at is null or updated_at > indexed_at
-    projects_query = {
-        '$or': [
-            {'indexedAt': {'$exists': False}},
-            {'indexedAt': None},
-            {'$expr': {'$gt': ['$updatedAt', '$indexedAt']}}
-        ]
-    }
+    # Build document text
+    title = project.get('title', '')
+    description = project.get('description', '')
+    required_skills = project.get('requiredSkills', [])
+    tech_stack = project.get('techStack', [])
     
-    projects = projects_collection.find(projects_query)
+    skills_str = ', '.join(required_skills) if required_skills else ''
+    tech_str = ', '.join(tech_stack) if tech_stack else ''
     
-    for project in projects:
-        # Get leader info
-        leader = users_collection.find_one({'_id': project.get('leaderId')})
-        leader_name = leader.get('fullName', 'Unknown') if leader else 'Unknown'
-        
-        project_id = str(project['_id'])
-        doc_id = f"project_{project_id}"
-        
-        # Build document text
-        title = project.get('title', '')
-        description = project.get('description', '')
-        required_skills = project.get('requiredSkills', [])
-        tech_stack = project.get('techStack', [])
-        
-        skills_str = ', '.join(required_skills) if required_skills else ''
-        tech_str = ', '.join(tech_stack) if tech_stack else ''
-        
-        doc_text = f"Project: {title}. Led by: {leader_name}. Description: {description}. Skills: {skills_str}. Tech Stack: {tech_str}."
-        metadata = {"doc_type": "project"}
-        documents.append((doc_id, doc_text, metadata))
-
-    # Users - fetch users that need indexing
-    users_query = {
-        '$or': [
-            {'indexedAt': {'$exists': False}},
-            {'indexedAt': None},
-            {'$expr': {'$gt': ['$updatedAt', '$indexedAt']}}
-        ]
-    }
+    doc_text = f"Project: {title}. Led by: {leader_name}. Description: {description}. Skills: {skills_str}. Tech Stack: {tech_str}."
+    metadata = {"doc_type": "project"}
+    return (doc_id, doc_text, metadata)
+
+def build_user_document(user):
+    """(doc_id, text, metadata) for a user document"""
+    doc_id = f"user_{user['_id']}"
     
-    users = users_collection.find(users_query)
+    full_name = user.get('fullName', '')
+    roles = user.get('roles', [])
+    interest = user.get('interest', '')
+    skills = user.get('skills', [])
+    bio = user.get('bio', '')
     
-    for user in users:
-        user_id = str(user['_id'])
-        doc_id = f"user_{user_id}"
-        
-        full_name = user.get('fullName', '')
-        roles = user.get('roles', [])
-        interest = user.get('interest', '')
-        skills = user.get('skills', [])
-        bio = user.get('bio', '')
-        
-        roles_str = ', '.join(roles) if roles else ''
-        skills_str = ', '.join(skills) if skills else ''
-        
-        doc_text = f"User: {full_name}. Roles: {roles_str}. Interests: {interest}. Skills: {skills_str}. Bio: {bio}."
-        metadata = {"doc_type": "user"}
-        documents.append((doc_id, doc_text, metadata))
+    roles_str = ', '.join(roles) if roles else ''
+    skills_str = ', '.join(skills) if skills else ''
+    
+    doc_text = f"User: {full_name}. Roles: {roles_str}. Interests: {interest}. Skills: {skills_str}. Bio: {bio}."
+    # Roles as a comma-separated string (Chroma metadata values must be scalars)
+    metadata = {"doc_type": "user", "roles": ",".join(roles)}
+    return (doc_id, doc_text, metadata)
 
+def _build_documents(db, projects, users):
+    """Documents for already fetched project and user records"""
+    documents = []
+    if projects:
+        # One lookup for all leaders instead of one per project
+        leader_ids = list({p.get('leaderId') for p in projects if p.get('leaderId')})
+        with metrics.track("mongo", "users.find"):
+            leaders = {u['_id']: u.get('fullName', 'Unknown') for u in db['users'].find({'_id': {'$in': leader_ids}}, {'fullName': 1})}
+        for project in projects:
+            documents.append(build_project_document(project, leaders.get(project.get('leaderId'), 'Unknown')))
+    for user in users:
+        documents.append(build_user_document(user))
     return documents
 
-def mark_as_indexed(ids, collection_name):
-    """Mark documents as indexed in MongoDB"""
-    from datetime import datetime
-    
+def _find_documents(project_filter, user_filter):
+    """Build documents for the projects and users matching the filters (None skips that collection)"""
+    db = get_mongodb_connection()
+    projects, users = [], []
+    if project_filter is not None:
+        with metrics.track("mongo", "projects.find"):
+            projects = list(db['projects'].find(project_filter))
+    if user_filter is not None:
+        with metrics.track("mongo", "users.find"):
+            users = list(db['users'].find(user_filter))
+    return _build_documents(db, projects, users)
+
+def get_documents_by_ids(project_ids, user_ids):
+    """Build documents for the given project and user ids (missing ones are skipped)"""
+    return _find_documents(
+        {'_id': {'$in': [ObjectId(i) for i in project_ids]}} if project_ids else None,
+        {'_id': {'$in': [ObjectId(i) for i in user_ids]}} if user_ids else None,
+    )
+
+def get_all_documents():
+    """Build documents for every project and user (used by full reindexes)"""
+    return _find_documents({}, {})
+
+def get_documents_changed_since(since):
+    """Build documents for projects and users updated or indexed at or after `since`"""
+    changed = {'$or': [{'updatedAt': {'$gte': since}}, {'indexedAt': {'$gte': since}}]}
+    return _find_documents(changed, changed)
+
+def get_records_changed_since(collection_name, since=None, projection=None):
+    """Raw records of `collection_name` updated after `since` (every record if None)"""
+    db = get_mongodb_connection()
+    query = {} if since is None else {'updatedAt': {'$gt': since}}
+    with metrics.track("mongo", f"{collection_name}.find"):
+        return list(db[collection_name].find(query, projection))
+
+def get_existing_ids(ids, collection_name):
+    """The subset of `ids` (strings) that still exist in `collection_name`"""
+    db = get_mongodb_connection()
+    with metrics.track("mongo", f"{collection_name}.find"):
+        found = db[collection_name].find({'_id': {'$in': [ObjectId(i) for i in ids]}}, {'_id': 1})
+        return {str(doc['_id']) for doc in found}
+
+def _create_sync_indexes():
+    """Indexes behind the watermark queries (create_index is a no-op when they exist)"""
+    db = get_mongodb_connection()
+    for name in SYNCED_COLLECTIONS:
+        db[name].create_index('updatedAt')
+        # get_documents_changed_since also matches on indexedAt
+        db[name].create_index('indexedAt')
+    return True
+
+_sync_indexes = Lazy(_create_sync_indexes, name="mongo_sync_indexes")
+
+def get_sync_state():
+    """{collection name: watermark} for the collections synced so far"""
+    db = get_mongodb_connection()
+    with metrics.track("mongo", f"{SYNC_STATE_COLLECTION}.find"):
+        return {doc['_id']: doc.get('watermark') for doc in db[SYNC_STATE_COLLECTION].find({'_id': {'$in': list(SYNCED_COLLECTIONS)}})}
+
+def _needs_indexing(doc):
+    indexed_at = doc.get('indexedAt')
+    return indexed_at is None or (doc.get('updatedAt') is not None and doc['updatedAt'] > indexed_at)
+
+class SyncBatch:
+    """
+    Documents changed since the last sync, plus what to record once they are
+    indexed: each document's updatedAt as read (its new indexedAt) and the
+    new watermark of each collection.
+    """
+
+    def __init__(self, documents, versions, watermarks, scanned):
+        self.documents = documents
+        self.versions = versions
+        self.watermarks = watermarks
+        self.scanned = scanned
+
+def read_changes():
+    """
+    Reads the projects and users that need (re)indexing.
+
+    Each collection has a watermark in `sync_state`: the newest updatedAt
+    seen by the last committed sync. Only documents with updatedAt above it
+    are read, through the updatedAt index, so a run costs time proportional
+    to what changed. The query reaches SYNC_WATERMARK_OVERLAP_SECONDS below
+    the watermark so that writes committed late (or stamped by a slightly
+    slow clock) are not skipped; documents in that window that are already
+    indexed are dropped here. A collection without a watermark is read once
+    in full, comparing updatedAt with indexedAt per document.
+    """
+    db = get_mongodb_connection()
+    _sync_indexes.get()
+    state = get_sync_state()
+    read_at = datetime.utcnow()
+    overlap = timedelta(seconds=SYNC_WATERMARK_OVERLAP_SECONDS)
+
+    fetched, versions, watermarks, scanned = {}, {}, {}, {}
+    for name in SYNCED_COLLECTIONS:
+        watermark = state.get(name)
+        query = {} if watermark is None else {'updatedAt': {'$gt': watermark - overlap}}
+        with metrics.track("mongo", f"{name}.find"):
+            records = list(db[name].find(query))
+        scanned[name] = len(records)
+        fetched[name] = [doc for doc in records if _needs_indexing(doc)]
+        prefix = name[:-1] + "_"
+        for doc in fetched[name]:
+            # Stamped with the version read, so an edit made while embedding is picked up next run
+            versions[prefix + str(doc['_id'])] = doc.get('updatedAt') or read_at
+        seen = [doc['updatedAt'] for doc in records if doc.get('updatedAt') is not None]
+        watermarks[name] = max(seen + ([watermark] if watermark else [])) if seen or watermark else read_at
+
+    documents = _build_documents(db, fetched['projects'], fetched['users'])
+    return SyncBatch(documents, versions, watermarks, scanned)
+
+def commit_sync(batch):
+    """Stamps the batch's documents as indexed and advances the watermarks (after indexing succeeded)"""
+    db = get_mongodb_connection()
+    by_collection = {}
+    for doc_id, version in batch.versions.items():
+        doc_type, _, entity_id = doc_id.partition("_")
+        by_collection.setdefault(doc_type + "s", []).append(UpdateOne({'_id': ObjectId(entity_id)}, {'$set': {'indexedAt': version}}))
+    for name, operations in by_collection.items():
+        for start in range(0, len(operations), BULK_WRITE_SIZE):
+            with metrics.track("mongo", f"{name}.bulk_write"):
+                db[name].bulk_write(operations[start:start + BULK_WRITE_SIZE], ordered=False)
+    now = datetime.utcnow()
+    with metrics.track("mongo", f"{SYNC_STATE_COLLECTION}.bulk_write"):
+        db[SYNC_STATE_COLLECTION].bulk_write([
+            UpdateOne({'_id': name}, {'$set': {'watermark': watermark, 'syncedAt': now}}, upsert=True)
+            for name, watermark in batch.watermarks.items()
+        ])
+
+def get_new_or_updated_documents():
+    """Fetch new or updated documents from MongoDB for indexing (see read_changes)"""
+    return read_changes().documents
+
+def mark_as_indexed(ids, collection_name, indexed_at=None):
+    """
+    Mark documents as indexed in MongoDB at `indexed_at`, which should be
+    taken before the documents were read so that edits made while they were
+    being embedded still count as pending (default now)
+    """
     db = get_mongodb_connection()
     collection = db[collection_name]
     
@@ -90,7 +217,8 @@ def mark_as_indexed(ids, collection_name):
     object_ids = [ObjectId(id_str) for id_str in ids]
     
     # Update indexed_at timestamp
-    collection.update_many(
-        {'_id': {'$in': object_ids}},
-        {'$set': {'indexedAt': datetime.utcnow()}}
-    )
\ No newline at end of file
+    with metrics.track("mongo", f"{collection_name}.update_many"):
+        collection.update_many(
+            {'_id': {'$in': object_ids}},
+            {'$set': {'indexedAt': indexed_at or datetime.utcnow()}}
+        )
@@ -0,0 +1,51 @@
+"""
+Gunicorn settings for serving the AI service with several worker processes.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Each worker is a separate Python process (and GIL) running the app under
+uvicorn. The index snapshot is memory-mapped from INDEX_SNAPSHOT_DIR, so the
+embedding matrix, id list and metadata are shared through the page cache
+instead of being copied into every worker.
+
+Graceful reload (new workers, running the current code, are started before
+the old ones finish their in-flight requests):
+
+    kill -HUP <master pid>
+
+With AI_PRELOAD_APP=true the master imports the app once before forking, so
+workers also share the imported modules copy-on-write. HUP then only
+re-forks workers from the code already loaded in the master; to deploy new
+code, start a new master with USR2 and retire the old one:
+
+    kill -USR2 <master pid>             # new master + workers on the new code
+    kill -WINCH <old master pid>        # old workers finish and exit
+    kill -QUIT <old master pid>
+
+`python main.py` still runs a single uvicorn process for local development.
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '50051')}"
+workers = int(os.getenv("AI_WORKERS", multiprocessing.cpu_count()))
+worker_class = "uvicorn_worker.UvicornWorker"
+
+# Import main in the master so workers share its pages copy-on-write. Clients
+# are created lazily, so no sockets are opened before the fork. Off by default
+# so HUP reloads code (see above); the snapshot is shared either way.
+preload_app = os.getenv("AI_PRELOAD_APP", "false").lower() == "true"
+
+graceful_timeout = int(os.getenv("AI_GRACEFUL_TIMEOUT", "30"))
+# /chat can legitimately take a while (several LLM rounds plus scraping)
+timeout = int(os.getenv("AI_WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+
+def when_ready(server):
+    # Map the current snapshot in the master; forked workers inherit the mapping.
+    from services import index_snapshot
+    snapshot = index_snapshot.get_snapshot()
+    if snapshot is not None:
+        server.log.info(f"Index snapshot {snapshot.version} mapped ({len(snapshot)} vectors)")
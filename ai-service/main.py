@@ -1,38 +1,115 @@
 import warnings
 warnings.filterwarnings("ignore", category=FutureWarning, module="google.generativeai")
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Header, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, JSONResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import uvicorn
 import logging
+import time
+import hmac
 
 from services import vector_store
 from services import vector_indexer
-from services.vector_store import delete_document_from_store
+from services import member_matcher
+from services import related_graph
+from services import index_batch
+from services import user_recommender
+from services import catalog
 from core import orchestrator
+from core import metrics
+from core import request_timing
+from core import profiler
+from core import lifecycle
+from core import admission
+from core import request_deadline
+from core import structured_logging
+from core.session_store import session_store
+from core.config import (
+    SERVER_TIMING_ENABLED, ADMIN_API_TOKEN, PROFILER_MAX_SECONDS, WARMUP_ON_STARTUP, RELATED_GRAPH_ENABLED,
+    CHAT_DEADLINE_SECONDS, CHAT_DEADLINE_MAX_SECONDS,
+)
 
-# Initialize Logger
-logging.basicConfig(level=logging.INFO)
+# JSON records written by a background thread (see core/structured_logging.py)
+structured_logging.configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="MODX AI Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created lazily; warming up in the background lets the server
+    # accept connections (and answer /health) before Chroma/Mongo are reachable.
+    if WARMUP_ON_STARTUP:
+        lifecycle.start_background_warm_up()
+    # Enough worker threads for every admitted request of every endpoint class
+    admission.configure_thread_pool()
+    yield
+
+app = FastAPI(title="MODX AI Service", lifespan=lifespan)
+# Saturated endpoint classes answer 503 with Retry-After (see core/admission.py)
+app.add_exception_handler(admission.Overloaded, admission.overloaded_handler)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    # Every log record of the request carries its id; callers may pass their own
+    request_id = request.headers.get("x-request-id") or structured_logging.new_request_id()
+    request_id_token = structured_logging.bind_request_id(request_id)
+    timing_token = request_timing.start() if SERVER_TIMING_ENABLED else None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        if timing_token is not None:
+            stages = request_timing.stop(timing_token)
+            timing_token = None
+            response.headers["Server-Timing"] = request_timing.format_server_timing(
+                stages, time.perf_counter() - start
+            )
+        return response
+    finally:
+        if timing_token is not None:
+            request_timing.stop(timing_token)
+        structured_logging.unbind_request_id(request_id_token)
+        # Use the route template (e.g. /project/{project_id}) to keep label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.REQUEST_LATENCY.observe(
+            time.perf_counter() - start, method=request.method, path=path, status=status
+        )
 
 # Request/Response Models
 class ChatRequest(BaseModel):
     query: str
+    # Continue a server-side conversation; omit for a stateless question
+    conversation_id: Optional[str] = Field(None, min_length=1, max_length=200, pattern=r"^[A-Za-z0-9_.:-]+$")
 
 class ChatResponse(BaseModel):
     answer: str
+    conversation_id: Optional[str] = None
 
 class RecommendationRequest(BaseModel):
-    query_text: str
+    # Recommend from the user's stored vector; query_text is the fallback for unindexed users
+    user_id: Optional[str] = Field(None, min_length=1, max_length=64)
+    # Projects the user recently joined or applied to, blended into the query
+    recent_project_ids: Optional[List[str]] = Field(None, max_length=20)
+    query_text: Optional[str] = None
 
 class RecommendationResponse(BaseModel):
     recommended_ids: List[str]
 
+class RelatedProjectsRequest(BaseModel):
+    query_text: Optional[str] = None
+    # Looked up in the precomputed graph; query_text is the fallback for unindexed projects
+    project_id: Optional[str] = None
+
 class SearchRequest(BaseModel):
     search_query: str
+    # Only projects requiring at least one of these skills (exact names, any case)
+    skills: Optional[List[str]] = None
 
 class IndexResponse(BaseModel):
     status: str
@@ -40,66 +117,221 @@ class IndexResponse(BaseModel):
 class DeleteRequest(BaseModel):
     project_id: str
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+class MemberMatchRequest(BaseModel):
+    project_id: Optional[str] = None
+    skill_text: Optional[str] = None
+    roles: Optional[List[str]] = None
+    exclude_user_ids: Optional[List[str]] = None
+    top_k: int = Field(10, ge=1, le=100)
+
+class MemberMatch(BaseModel):
+    user_id: str
+    score: float
+
+class MemberMatchResponse(BaseModel):
+    matches: List[MemberMatch]
+
+class MemberMatchBatchRequest(BaseModel):
+    requests: List[MemberMatchRequest] = Field(..., max_length=50)
+
+class MemberMatchBatchResponse(BaseModel):
+    results: List[MemberMatchResponse]
+
+class IndexMutation(BaseModel):
+    op: str  # upsert | delete
+    doc_type: str  # project | user
+    id: str
+
+class IndexMutationResult(BaseModel):
+    op: Optional[str] = None
+    doc_type: Optional[str] = None
+    id: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+
+class IndexBatchRequest(BaseModel):
+    mutations: List[IndexMutation] = Field(..., max_length=1000)
+
+class IndexBatchResponse(BaseModel):
+    results: List[IndexMutationResult]
+
+@app.post("/chat", response_model=ChatResponse, dependencies=[Depends(admission.admit("chat"))])
+async def chat(request: ChatRequest, http_request: Request, x_request_timeout_ms: Optional[int] = Header(None)):
+    """
+    Answers within the caller's time budget (X-Request-Timeout-Ms, or
+    CHAT_DEADLINE_SECONDS); past it, or once the client disconnects, the work
+    is stopped and the best partial answer is returned.
+    """
+    budget = CHAT_DEADLINE_SECONDS
+    if x_request_timeout_ms and x_request_timeout_ms > 0:
+        budget = min(x_request_timeout_ms / 1000, CHAT_DEADLINE_MAX_SECONDS)
     try:
-        logger.info(f"Received query: '{request.query}'")
-        answer_text = orchestrator.process_query(request.query)
-        return ChatResponse(answer=answer_text)
+        logger.debug("Received query: %r", request.query, extra={"event": "chat.query"})
+        with request_deadline.scope(budget) as deadline:
+            try:
+                answer_text = await request_deadline.run_in_threadpool(
+                    http_request, orchestrator.process_query, request.query, request.conversation_id
+                )
+            except request_deadline.DeadlineExceeded as e:
+                logger.warning(f"Chat request stopped: {e}")
+                answer_text = orchestrator.partial_answer(deadline)
+        return ChatResponse(answer=answer_text, conversation_id=request.conversation_id)
     except Exception as e:
         logger.error(f"Error in chat endpoint: {e}")
-        return ChatResponse(answer="An error occurred in the AI service.")
+        return ChatResponse(answer="An error occurred in the AI service.", conversation_id=request.conversation_id)
 
-@app.post("/recommendations", response_model=RecommendationResponse)
+@app.delete("/chat/{conversation_id}")
+async def end_conversation(conversation_id: str):
+    """Forgets a conversation's history."""
+    if not await run_in_threadpool(session_store.delete, conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found.")
+    return {"message": f"Conversation {conversation_id} ended."}
+
+@app.post("/recommendations", response_model=RecommendationResponse, dependencies=[Depends(admission.admit("search"))])
 async def get_recommendations(request: RecommendationRequest):
     try:
-        doc_ids = vector_store.find_similar_document_ids(request.query_text, n_results=10)
+        if request.user_id:
+            try:
+                doc_ids = await run_in_threadpool(
+                    user_recommender.recommend_for_user, request.user_id, 10, request.recent_project_ids or ()
+                )
+                return RecommendationResponse(recommended_ids=doc_ids)
+            except user_recommender.UserNotIndexedError:
+                pass
+        if not request.query_text:
+            return RecommendationResponse(recommended_ids=[])
+        doc_ids = await run_in_threadpool(vector_store.find_similar_document_ids, request.query_text, n_results=10)
         return RecommendationResponse(recommended_ids=doc_ids)
     except Exception as e:
         logger.error(f"Error in recommendations endpoint: {e}")
         return RecommendationResponse(recommended_ids=[])
 
-@app.post("/related-projects", response_model=RecommendationResponse)
-async def get_related_projects(request: RecommendationRequest):
+@app.post("/related-projects", response_model=RecommendationResponse, dependencies=[Depends(admission.admit("search"))])
+async def get_related_projects(request: RelatedProjectsRequest):
     try:
-        doc_ids = vector_store.find_similar_document_ids(request.query_text, n_results=6)
+        if request.project_id and RELATED_GRAPH_ENABLED:
+            doc_ids = await run_in_threadpool(related_graph.find_related_project_ids, request.project_id, n_results=6)
+            if doc_ids is not None:
+                return RecommendationResponse(recommended_ids=doc_ids)
+        if not request.query_text:
+            return RecommendationResponse(recommended_ids=[])
+        doc_ids = await run_in_threadpool(vector_store.find_similar_document_ids, request.query_text, n_results=6)
         return RecommendationResponse(recommended_ids=doc_ids)
     except Exception as e:
         logger.error(f"Error in related-projects endpoint: {e}")
         return RecommendationResponse(recommended_ids=[])
 
-@app.post("/search-projects", response_model=RecommendationResponse)
+@app.post("/search-projects", response_model=RecommendationResponse, dependencies=[Depends(admission.admit("search"))])
 async def search_projects(request: SearchRequest):
     try:
-        doc_ids = vector_store.find_similar_document_ids(request.search_query, n_results=6)
+        allowed = None
+        if request.skills:
+            allowed = await run_in_threadpool(catalog.project_doc_ids_with_skills, request.skills)
+        doc_ids = await run_in_threadpool(
+            vector_store.find_similar_document_ids, request.search_query, n_results=6, doc_ids=allowed
+        )
         return RecommendationResponse(recommended_ids=doc_ids)
     except Exception as e:
         logger.error(f"Error in search-projects endpoint: {e}")
         return RecommendationResponse(recommended_ids=[])
 
-@app.post("/index-new-data", response_model=IndexResponse)
+def _run_member_matching(requests):
+    try:
+        return member_matcher.match_members_batch([r.model_dump() for r in requests])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except member_matcher.ProjectNotIndexedError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except member_matcher.EmbeddingUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+def _match_response(matches):
+    return MemberMatchResponse(matches=[MemberMatch(user_id=u, score=s) for u, s in matches])
+
+@app.post("/match-members", response_model=MemberMatchResponse, dependencies=[Depends(admission.admit("search"))])
+async def match_members(request: MemberMatchRequest):
+    """Top-k users for a project and/or skill text, excluding current members."""
+    results = await run_in_threadpool(_run_member_matching, [request])
+    return _match_response(results[0])
+
+@app.post("/match-members/batch", response_model=MemberMatchBatchResponse, dependencies=[Depends(admission.admit("search"))])
+async def match_members_batch(request: MemberMatchBatchRequest):
+    """Several /match-members queries scored against the user vectors in one pass."""
+    results = await run_in_threadpool(_run_member_matching, request.requests)
+    return MemberMatchBatchResponse(results=[_match_response(m) for m in results])
+
+@app.post("/index-new-data", response_model=IndexResponse, dependencies=[Depends(admission.admit("index"))])
 async def index_new_data():
     try:
-        result = vector_indexer.index_new_data()
+        # Off the event loop so a long sync does not stall every other endpoint
+        result = await run_in_threadpool(vector_indexer.index_new_data)
         return IndexResponse(status=result)
     except Exception as e:
         logger.error(f"Error in index-new-data endpoint: {e}")
         return IndexResponse(status=f"Error: {str(e)}")
 
-@app.delete("/project/{project_id}")
+@app.post("/index/batch", response_model=IndexBatchResponse, dependencies=[Depends(admission.admit("index"))])
+async def apply_index_batch(request: IndexBatchRequest):
+    """
+    Mixed upserts and deletes of project/user documents, applied in batched
+    vector-store calls. Returns one outcome per mutation.
+    """
+    results = await run_in_threadpool(index_batch.apply_batch, [m.model_dump() for m in request.mutations])
+    return IndexBatchResponse(results=[IndexMutationResult(**r) for r in results])
+
+@app.delete("/project/{project_id}", dependencies=[Depends(admission.admit("index"))])
 async def delete_project_from_index(project_id: str):
-    try:
-        doc_id = f"project_{project_id}"
-        delete_document_from_store(doc_id)
-        return {"message": f"Deleted {doc_id} from index"}
-    except Exception as e:
-        logger.error(f"Error in delete endpoint: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    doc_id = f"project_{project_id}"
+    result = (await run_in_threadpool(
+        index_batch.apply_batch, [{"op": "delete", "doc_type": "project", "id": project_id}]
+    ))[0]
+    if result["status"] == "invalid":
+        raise HTTPException(status_code=400, detail=result["error"])
+    if result["status"] == "error":
+        logger.error(f"Error in delete endpoint: {result['error']}")
+        raise HTTPException(status_code=500, detail=result["error"])
+    if result["status"] == "not_found":
+        return {"message": f"{doc_id} was not in the index"}
+    return {"message": f"Deleted {doc_id} from index"}
 
 @app.get("/health")
 async def health_check():
+    """Liveness probe: the process is up and serving requests."""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: Gemini, Chroma and MongoDB clients are usable."""
+    ready, components = await run_in_threadpool(lifecycle.check_readiness)
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "components": components,
+        "warm_up": lifecycle.warm_up_status(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/debug/profile", response_class=PlainTextResponse)
+async def capture_profile(seconds: float = 10.0, x_admin_token: Optional[str] = Header(None)):
+    """
+    Samples the live process for `seconds` and returns folded stacks, ready for
+    flamegraph.pl or speedscope. Only available when ADMIN_API_TOKEN is set.
+    """
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_API_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILER_MAX_SECONDS}]")
+    try:
+        folded = await run_in_threadpool(profiler.capture, seconds)
+    except profiler.ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(folded)
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=50051, reload=False)
 
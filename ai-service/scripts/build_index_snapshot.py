@@ -0,0 +1,25 @@
+"""
+Export the Chroma collection into the memory-mapped index snapshot that
+multi-worker deployments serve from (see gunicorn.conf.py).
+
+Run after setting INDEX_SNAPSHOT_DIR; the indexer refreshes it afterwards.
+"""
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.config import INDEX_SNAPSHOT_DIR
+from services import index_snapshot
+from services.vector_store import get_collection
+
+def main():
+    if not INDEX_SNAPSHOT_DIR:
+        print("INDEX_SNAPSHOT_DIR is not set.")
+        return
+    print(f"Exporting collection into {INDEX_SNAPSHOT_DIR}...")
+    version = index_snapshot.build_snapshot(get_collection())
+    print(f"Snapshot {version} is now current.")
+
+if __name__ == "__main__":
+    main()
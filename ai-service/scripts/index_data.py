@@ -5,6 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from database import get_all_documents_with_metadata # <-- Use the new function name
 from services.vector_store import add_documents_to_store
+from core import structured_logging
 
 def main():
     print("Fetching documents with metadata...")
@@ -18,4 +19,5 @@ def main():
         print("No documents found in the database.")
 
 if __name__ == "__main__":
+    structured_logging.configure_logging(fmt="text")
     main()
@@ -1,128 +1,91 @@
 """
-Re-index all existing projects and users into ChromaDB.
+Re-index all existing projects, users and knowledge-base chunks into ChromaDB
+without touching the collection that is being served (blue/green).
+
 This script will:
-1. Connect to your MongoDB database
-2. Fetch ALL projects and users (ignoring indexedAt field)
-3. Add them to your new ChromaDB instance
-4. Mark them as indexed in MongoDB
+1. Build a new versioned collection from MongoDB and the knowledge base
+2. Validate it (document counts, self-retrieval of sampled documents)
+3. Switch the serving alias to it, keeping the old collection for rollback
+4. Replay changes made during the build and mark documents as indexed
 
-Run this script once after setting up your new ChromaDB credentials.
+Usage:
+    python scripts/reindex_chromadb.py                  # build, validate, switch
+    python scripts/reindex_chromadb.py --no-switch      # build and validate only
+    python scripts/reindex_chromadb.py --query "react"  # also compare results for sample queries
+    python scripts/reindex_chromadb.py --switch NAME    # serve an existing collection
+    python scripts/reindex_chromadb.py --rollback       # serve the previous collection again
+    python scripts/reindex_chromadb.py --prune          # delete old versions
+    python scripts/reindex_chromadb.py --status
 """
 
-from pymongo import MongoClient
-from bson import ObjectId
-from core.config import MONGODB_URI
-from services.vector_store import add_documents_to_store
-from datetime import datetime
+import argparse
+import os
+import sys
 
-def get_mongodb_connection():
-    """Get MongoDB connection"""
-    client = MongoClient(MONGODB_URI)
-    db = client.get_database()
-    return db
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-def reindex_all_projects():
-    """Re-index ALL projects from MongoDB into ChromaDB"""
-    db = get_mongodb_connection()
-    documents = []
+from services import reindex
+from services.vector_store import get_embeddings, read_alias
+from core import structured_logging
 
-    projects_collection = db['projects']
-    users_collection = db['users']
-    
-    print("🔍 Fetching all projects from MongoDB...")
-    
-    # Fetch ALL projects (no filter)
-    projects = projects_collection.find({})
-    project_count = 0
-    
-    for project in projects:
-        # Get leader info
-        leader = users_collection.find_one({'_id': project.get('leaderId')})
-        leader_name = leader.get('fullName', 'Unknown') if leader else 'Unknown'
-        
-        project_id = str(project['_id'])
-        doc_id = f"project_{project_id}"
-        
-        # Build document text
-        title = project.get('title', '')
-        description = project.get('description', '')
-        required_skills = project.get('requiredSkills', [])
-        tech_stack = project.get('techStack', [])
-        
-        skills_str = ', '.join(required_skills) if required_skills else ''
-        tech_str = ', '.join(tech_stack) if tech_stack else ''
-        
-        doc_text = f"Project: {title}. Led by: {leader_name}. Description: {description}. Skills: {skills_str}. Tech Stack: {tech_str}."
-        metadata = {"doc_type": "project"}
-        documents.append((doc_id, doc_text, metadata))
-        project_count += 1
 
-    print(f"✅ Found {project_count} projects")
-    
-    # Fetch ALL users (no filter)
-    print("🔍 Fetching all users from MongoDB...")
-    users = users_collection.find({})
-    user_count = 0
-    
-    for user in users:
-        user_id = str(user['_id'])
-        doc_id = f"user_{user_id}"
-        
-        full_name = user.get('fullName', '')
-        roles = user.get('roles', [])
-        interest = user.get('interest', '')
-        
-        roles_str = ', '.join(roles) if roles else ''
-        
-        doc_text = f"User: {full_name}. Roles: {roles_str}. Interests: {interest}."
-        metadata = {"doc_type": "user"}
-        documents.append((doc_id, doc_text, metadata))
-        user_count += 1
+def print_status():
+    current, previous, _ = read_alias()
+    print(f"Serving:  {current}")
+    print(f"Previous: {previous or '-'}")
+    print(f"Versions: {', '.join(reindex.list_versions()) or '-'}")
 
-    print(f"✅ Found {user_count} users")
-    
-    if not documents:
-        print("⚠️ No documents found to index!")
-        return
 
-    # Add all documents to ChromaDB
-    print(f"\n📤 Indexing {len(documents)} documents into ChromaDB...")
-    add_documents_to_store(documents)
-    
-    # Mark all as indexed in MongoDB
-    print("📝 Marking documents as indexed in MongoDB...")
-    
-    project_ids = [d[0].split("_")[1] for d in documents if d[0].startswith("project_")]
-    user_ids = [d[0].split("_")[1] for d in documents if d[0].startswith("user_")]
-    
-    if project_ids:
-        object_ids = [ObjectId(id_str) for id_str in project_ids]
-        projects_collection.update_many(
-            {'_id': {'$in': object_ids}},
-            {'$set': {'indexedAt': datetime.utcnow()}}
-        )
-        print(f"✅ Marked {len(project_ids)} projects as indexed")
-    
-    if user_ids:
-        object_ids = [ObjectId(id_str) for id_str in user_ids]
-        users_collection.update_many(
-            {'_id': {'$in': object_ids}},
-            {'$set': {'indexedAt': datetime.utcnow()}}
-        )
-        print(f"✅ Marked {len(user_ids)} users as indexed")
-    
-    print(f"\n🎉 Successfully re-indexed {project_count} projects and {user_count} users!")
-    print("Your ChromaDB is now ready to use!")
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--no-switch", action="store_true", help="build and validate without serving the new collection")
+    parser.add_argument("--query", action="append", default=[], help="sample query to compare between old and new collections")
+    parser.add_argument("--switch", metavar="NAME", help="point the alias at an existing collection")
+    parser.add_argument("--rollback", action="store_true", help="serve the previous collection again")
+    parser.add_argument("--prune", action="store_true", help="delete versions other than the served, previous and newest two")
+    parser.add_argument("--status", action="store_true", help="show which collection is served")
+    args = parser.parse_args()
+
+    if args.status:
+        print_status()
+        return
+    if args.rollback:
+        reindex.rollback()
+        print_status()
+        return
+    if args.switch:
+        reindex.switch_to(args.switch)
+        print_status()
+        return
+    if args.prune:
+        dropped = reindex.prune()
+        print(f"Deleted {len(dropped)} old collections.")
+        return
 
-if __name__ == '__main__':
     print("=" * 60)
-    print("🚀 Re-indexing All Projects and Users into ChromaDB")
+    print("🚀 Blue/green re-index of projects, users and the knowledge base")
     print("=" * 60)
-    print()
-    
-    try:
-        reindex_all_projects()
-    except Exception as e:
-        print(f"\n❌ Error during re-indexing: {e}")
-        import traceback
-        traceback.print_exc()
+    query_embeddings = [get_embeddings(q) for q in args.query]
+    report = reindex.blue_green_reindex(switch=not args.no_switch, query_embeddings=[e for e in query_embeddings if len(e)])
+
+    print(f"\nCollection:  {report['collection']}")
+    print(f"Counts:      {report['counts']}")
+    print(f"Self-recall: {report['self_recall']:.3f}")
+    if report.get("query_overlap") is not None:
+        print(f"Top-10 overlap with the served collection: {report['query_overlap']:.3f}")
+    if not report["ok"]:
+        print("\n❌ Validation failed; the alias was not switched:")
+        for problem in report["problems"]:
+            print(f"  - {problem}")
+        sys.exit(1)
+    if args.no_switch:
+        print(f"\n✅ Validated. Serve it with: python scripts/reindex_chromadb.py --switch {report['collection']}")
+    else:
+        upserted, deleted = report["caught_up"]
+        print(f"Caught up:   {upserted} changed, {deleted} deleted during the build")
+        print(f"\n🎉 Now serving {report['collection']}. Roll back with --rollback.")
+
+
+if __name__ == '__main__':
+    structured_logging.configure_logging(fmt="text")
+    main()
@@ -0,0 +1,442 @@
+"""
+Compact in-memory catalog of projects and users.
+
+The `find_projects` / `find_users` tools used to run a Mongo regex scan per
+LLM tool call, and the search endpoints had no project metadata to filter
+on. The catalog keeps just the fields those need, one `__slots__` record per
+document:
+
+- skills, tech-stack entries, roles and interests are interned into small
+  integer ids (one shared string per distinct value instead of one per
+  record);
+- inverted indexes map skill -> projects, role -> users and interest ->
+  users, so a lookup touches only the matching records;
+- regex arguments are matched against the (small) vocabularies, not against
+  every record; only a title regex scans the projects;
+- results of recent tool queries are kept until the catalog next changes.
+
+It is loaded in full on first use and then refreshed incrementally with the
+same change detection as the indexer: records whose `updatedAt` is past the
+catalog's watermark (less SYNC_WATERMARK_OVERLAP_SECONDS), read through the
+`updatedAt` index. A refresh runs at most every CATALOG_REFRESH_SECONDS and
+after each index run in this worker. Deletes reach it through the index
+path (`remove`), and a full reload every CATALOG_FULL_RELOAD_SECONDS drops
+anything deleted behind its back.
+"""
+
+import logging
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from itertools import islice
+
+from core import metrics
+from core.config import (
+    CATALOG_ENABLED,
+    CATALOG_FULL_RELOAD_SECONDS,
+    CATALOG_REFRESH_SECONDS,
+    SYNC_WATERMARK_OVERLAP_SECONDS,
+)
+from core.lazy import Lazy
+from database import get_mongodb_connection, get_records_changed_since
+
+logger = logging.getLogger(__name__)
+
+PROJECT_PREFIX = "project_"
+USER_PREFIX = "user_"
+PROJECT_FIELDS = {"title": 1, "description": 1, "requiredSkills": 1, "techStack": 1, "updatedAt": 1}
+USER_FIELDS = {"fullName": 1, "roles": 1, "interest": 1, "updatedAt": 1}
+# Records measured when estimating memory per record
+SIZE_SAMPLE = 1000
+# Distinct tool queries whose results are kept between changes
+RESULT_CACHE_SIZE = 256
+
+CATALOG_RECORDS = metrics.gauge(
+    "modx_ai_catalog_records",
+    "Records held in the in-memory catalog, by kind (project, user).",
+    ["kind"],
+)
+CATALOG_BYTES_PER_RECORD = metrics.gauge(
+    "modx_ai_catalog_bytes_per_record",
+    "Estimated memory per catalog record including its index entries, by kind (project, user).",
+    ["kind"],
+)
+
+
+def _pattern(text):
+    """Case-insensitive regex for a tool argument, like Mongo's $regex with $options 'i'."""
+    try:
+        return re.compile(text, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(text), re.IGNORECASE)
+
+
+class Interner:
+    """Maps each distinct string to a small integer id (and back)."""
+
+    __slots__ = ("ids", "names")
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        value_id = self.ids.get(name)
+        if value_id is None:
+            value_id = self.ids[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return value_id
+
+    def intern_all(self, names):
+        return tuple(self.intern(str(name)) for name in names or ())
+
+    def matching(self, pattern):
+        """Ids of the values `pattern` finds a match in."""
+        return [i for i, name in enumerate(self.names) if pattern.search(name)]
+
+    def named(self, names):
+        """Ids of the values equal to any of `names`, ignoring case."""
+        wanted = {name.lower() for name in names}
+        return [i for i, name in enumerate(self.names) if name.lower() in wanted]
+
+    def __len__(self):
+        return len(self.names)
+
+
+class ProjectRecord:
+    __slots__ = ("id", "seq", "title", "description", "skills", "tech")
+
+    def __init__(self, id, seq, title, description, skills, tech):
+        self.id = id
+        self.seq = seq
+        self.title = title
+        self.description = description
+        self.skills = skills
+        self.tech = tech
+
+
+class UserRecord:
+    __slots__ = ("id", "seq", "full_name", "roles", "interest")
+
+    def __init__(self, id, seq, full_name, roles, interest):
+        self.id = id
+        self.seq = seq
+        self.full_name = full_name
+        self.roles = roles
+        self.interest = interest
+
+
+def _record_nbytes(record, postings):
+    """
+    Approximate bytes owned by one record: the object, its strings and
+    tuples, its slot in the id dict and its `postings` index entries (dict
+    and set entries are about 3 and 2 words on 64-bit builds).
+    """
+    size = sys.getsizeof(record)
+    for name in record.__slots__:
+        value = getattr(record, name)
+        if isinstance(value, (str, tuple)):
+            size += sys.getsizeof(value)
+    return size + 24 + postings * 16
+
+
+def _reindex(postings, entity_id, old_values, new_values):
+    """Moves `entity_id` between the posting lists of its old and new values."""
+    for value in set(old_values) - set(new_values):
+        postings[value].pop(entity_id, None)
+    for value in new_values:
+        # Posting lists are insertion-ordered dicts; existing entries keep their place
+        postings.setdefault(value, {})[entity_id] = None
+
+
+class Catalog:
+    """
+    Projects and users keyed by MongoDB id. Results come back in load order:
+    a record keeps the sequence number of its first load, and posting lists
+    are filled in that order.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.skills = Interner()
+        self.roles = Interner()
+        self.interests = Interner()
+        self.projects = {}
+        self.users = {}
+        self.skill_projects = {}
+        self.role_users = {}
+        self.interest_users = {}
+        self.watermarks = {}
+        self._seq = 0
+        # Repeated tool arguments are answered from here until the next change
+        self._results = OrderedDict()
+        self.loaded_at = time.monotonic()
+        self.refreshed_at = self.loaded_at
+
+    # --- Loading ---
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def _put_project(self, doc):
+        project_id = str(doc["_id"])
+        old = self.projects.get(project_id)
+        record = ProjectRecord(
+            project_id,
+            old.seq if old is not None else self._next_seq(),
+            doc.get("title", ""),
+            doc.get("description", ""),
+            self.skills.intern_all(doc.get("requiredSkills")),
+            self.skills.intern_all(doc.get("techStack")),
+        )
+        self.projects[project_id] = record
+        _reindex(self.skill_projects, project_id, old.skills if old is not None else (), record.skills)
+
+    def _put_user(self, doc):
+        user_id = str(doc["_id"])
+        old = self.users.get(user_id)
+        record = UserRecord(
+            user_id,
+            old.seq if old is not None else self._next_seq(),
+            doc.get("fullName", ""),
+            self.roles.intern_all(doc.get("roles")),
+            self.interests.intern(str(doc.get("interest") or "")),
+        )
+        self.users[user_id] = record
+        _reindex(self.role_users, user_id, old.roles if old is not None else (), record.roles)
+        _reindex(self.interest_users, user_id, (old.interest,) if old is not None else (), (record.interest,))
+
+    def apply(self, collection_name, docs):
+        """Upserts raw Mongo records of `collection_name` (projects or users)."""
+        put = self._put_project if collection_name == "projects" else self._put_user
+        with self._lock:
+            for doc in docs:
+                put(doc)
+            if docs:
+                self._results.clear()
+
+    def remove(self, doc_ids):
+        """Drops `project_<id>` / `user_<id>` documents."""
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id.startswith(PROJECT_PREFIX):
+                    record = self.projects.pop(doc_id[len(PROJECT_PREFIX):], None)
+                    if record is not None:
+                        _reindex(self.skill_projects, record.id, record.skills, ())
+                elif doc_id.startswith(USER_PREFIX):
+                    record = self.users.pop(doc_id[len(USER_PREFIX):], None)
+                    if record is not None:
+                        _reindex(self.role_users, record.id, record.roles, ())
+                        _reindex(self.interest_users, record.id, (record.interest,), ())
+            self._results.clear()
+
+    def refresh(self):
+        """Applies the records updated since the last refresh (all of them on the first call)."""
+        read_at = datetime.utcnow()
+        overlap = timedelta(seconds=SYNC_WATERMARK_OVERLAP_SECONDS)
+        for name, fields in (("projects", PROJECT_FIELDS), ("users", USER_FIELDS)):
+            watermark = self.watermarks.get(name)
+            docs = get_records_changed_since(name, None if watermark is None else watermark - overlap, fields)
+            self.apply(name, docs)
+            seen = [doc["updatedAt"] for doc in docs if doc.get("updatedAt") is not None]
+            if seen:
+                self.watermarks[name] = max(seen + ([watermark] if watermark else []))
+            elif watermark is None:
+                self.watermarks[name] = read_at
+        self.refreshed_at = time.monotonic()
+        self.report()
+
+    # --- Queries ---
+
+    def _posted(self, postings, value_ids):
+        """Ids posted under any of `value_ids`: a load-ordered list for one value, a set for several."""
+        lists = [postings[v] for v in value_ids if postings.get(v)]
+        if len(lists) == 1:
+            return list(lists[0])
+        return set().union(*lists)
+
+    def _cached(self, key, compute):
+        with self._lock:
+            records = self._results.get(key)
+            if records is None:
+                records = self._results[key] = tuple(compute())
+                while len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+            return records
+
+    def find_projects(self, skill=None, title=None):
+        """Projects whose skills match `skill` and whose title matches `title` (regexes, any case)."""
+        def compute():
+            if skill:
+                ids = self._posted(self.skill_projects, self.skills.matching(_pattern(skill)))
+                records = [self.projects[p] for p in ids]
+                if isinstance(ids, set):
+                    records.sort(key=lambda r: r.seq)
+            else:
+                records = self.projects.values()
+            if title:
+                pattern = _pattern(title)
+                records = [r for r in records if pattern.search(r.title)]
+            return records
+        return self._cached(("projects", skill, title), compute)
+
+    def find_users(self, role=None, interest=None):
+        """Users holding `role` (exact) whose interest matches `interest` (regex, any case)."""
+        def compute():
+            by_role = by_interest = None
+            if role:
+                role_id = self.roles.ids.get(role)
+                by_role = self.role_users.get(role_id, {}) if role_id is not None else {}
+            if interest:
+                by_interest = self._posted(self.interest_users, self.interests.matching(_pattern(interest)))
+            if by_role is None and by_interest is None:
+                ids = self.users
+            elif by_interest is None:
+                ids = by_role
+            elif by_role is None:
+                ids = by_interest
+            else:
+                wanted = set(by_interest)
+                ids = [u for u in by_role if u in wanted]
+            records = [self.users[u] for u in ids]
+            if isinstance(ids, set):
+                records.sort(key=lambda r: r.seq)
+            return records
+        return self._cached(("users", role, interest), compute)
+
+    def project_ids_with_skills(self, skills):
+        """Ids of the projects requiring any of `skills` (exact names, any case)."""
+        with self._lock:
+            return set(self._posted(self.skill_projects, self.skills.named(skills)))
+
+    def user_ids_with_roles(self, roles):
+        with self._lock:
+            return set(self._posted(self.role_users, [self.roles.ids[r] for r in roles if r in self.roles.ids]))
+
+    def project_json(self, record):
+        """The fields the find_projects tool returns, as Mongo would."""
+        return {
+            "_id": record.id,
+            "title": record.title,
+            "description": record.description,
+            "requiredSkills": [self.skills.names[i] for i in record.skills],
+            "techStack": [self.skills.names[i] for i in record.tech],
+        }
+
+    def user_json(self, record):
+        return {
+            "fullName": record.full_name,
+            "roles": [self.roles.names[i] for i in record.roles],
+            "interest": self.interests.names[record.interest],
+        }
+
+    # --- Reporting ---
+
+    def stats(self):
+        """Record counts, vocabulary sizes and estimated bytes per record."""
+        with self._lock:
+            projects = list(islice(self.projects.values(), SIZE_SAMPLE))
+            users = list(islice(self.users.values(), SIZE_SAMPLE))
+            project_bytes = sum(_record_nbytes(r, len(r.skills)) for r in projects)
+            user_bytes = sum(_record_nbytes(r, len(r.roles)) for r in users)
+            return {
+                "projects": len(self.projects),
+                "users": len(self.users),
+                "skills": len(self.skills),
+                "roles": len(self.roles),
+                "bytes_per_project": round(project_bytes / len(projects)) if projects else 0,
+                "bytes_per_user": round(user_bytes / len(users)) if users else 0,
+            }
+
+    def report(self):
+        stats = self.stats()
+        CATALOG_RECORDS.set(stats["projects"], kind="project")
+        CATALOG_RECORDS.set(stats["users"], kind="user")
+        CATALOG_BYTES_PER_RECORD.set(stats["bytes_per_project"], kind="project")
+        CATALOG_BYTES_PER_RECORD.set(stats["bytes_per_user"], kind="user")
+        return stats
+
+
+def _load():
+    catalog = Catalog()
+    with metrics.track("catalog", "load"):
+        catalog.refresh()
+    catalog.loaded_at = catalog.refreshed_at
+    logger.info(f"Catalog loaded: {catalog.stats()}")
+    return catalog
+
+
+_catalog = Lazy(_load, name="catalog")
+_refresh_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    The catalog, loaded on first use. Refreshes it when it is older than
+    CATALOG_REFRESH_SECONDS (one caller refreshes, the others keep using the
+    current data) and reloads it in full every CATALOG_FULL_RELOAD_SECONDS.
+    """
+    catalog = _catalog.get()
+    now = time.monotonic()
+    if now - catalog.refreshed_at < CATALOG_REFRESH_SECONDS or not _refresh_lock.acquire(blocking=False):
+        return catalog
+    try:
+        # A failed refresh is retried after the next interval, not on every call
+        catalog.refreshed_at = now
+        if now - catalog.loaded_at >= CATALOG_FULL_RELOAD_SECONDS:
+            catalog = _load()
+            _catalog.set(catalog)
+        else:
+            with metrics.track("catalog", "refresh"):
+                catalog.refresh()
+    except Exception as e:
+        logger.warning(f"Catalog refresh failed, serving the previous data: {e}")
+    finally:
+        _refresh_lock.release()
+    return catalog
+
+
+def catalog_or_none():
+    """The catalog, or None when it is disabled or cannot be loaded (callers fall back to Mongo)."""
+    if not CATALOG_ENABLED:
+        return None
+    try:
+        return get_catalog()
+    except Exception as e:
+        logger.warning(f"Catalog unavailable: {e}")
+        return None
+
+
+def project_doc_ids_with_skills(skills):
+    """`project_<id>` ids of the projects requiring any of `skills` (exact names, any case)."""
+    catalog = catalog_or_none()
+    if catalog is not None:
+        ids = catalog.project_ids_with_skills(skills)
+    else:
+        patterns = [re.compile(f"^{re.escape(skill)}$", re.IGNORECASE) for skill in skills]
+        with metrics.track("mongo", "projects.find"):
+            found = get_mongodb_connection()["projects"].find({"requiredSkills": {"$in": patterns}}, {"_id": 1})
+            ids = {str(doc["_id"]) for doc in found}
+    return {PROJECT_PREFIX + project_id for project_id in ids}
+
+
+def after_index(upserted_ids=(), deleted_ids=()):
+    """Brings an already loaded catalog up to date after this worker indexed or deleted documents."""
+    if not _catalog.is_initialized():
+        return
+    catalog = _catalog.get()
+    if deleted_ids:
+        catalog.remove(deleted_ids)
+    if upserted_ids:
+        with _refresh_lock:
+            try:
+                with metrics.track("catalog", "refresh"):
+                    catalog.refresh()
+            except Exception as e:
+                logger.warning(f"Catalog refresh after indexing failed: {e}")
@@ -1,13 +1,19 @@
 # File: services/db_query_service.py
 import json
+import logging
 from database import get_mongodb_connection
+from core import metrics
+from services.catalog import catalog_or_none
+
+logger = logging.getLogger(__name__)
 
 def _execute_query_mongodb(collection_name, query_filter, projection=None):
     """Helper function to query MongoDB and return results"""
     try:
         db = get_mongodb_connection()
         collection = db[collection_name]
-        results = list(collection.find(query_filter, projection))
+        with metrics.track("mongo", f"{collection_name}.find"):
+            results = list(collection.find(query_filter, projection))
         
         # Convert ObjectId to string for JSON serialization
         for result in results:
@@ -16,19 +22,42 @@ def _execute_query_mongodb(collection_name, query_filter, projection=None):
         
         return results
     except Exception as e:
-        print(f"Database error: {e}")
+        logger.error(f"Database error: {e}")
+        return None
+
+def _catalog_projects(skill, title, limit=None):
+    """(total, results) from the in-memory catalog, or None when it is unavailable"""
+    catalog = catalog_or_none()
+    if catalog is None:
+        return None
+    with metrics.track("catalog", "find_projects"):
+        records = catalog.find_projects(skill, title)
+        return len(records), [catalog.project_json(r) for r in records[:limit]]
+
+def _catalog_users(role, interest):
+    catalog = catalog_or_none()
+    if catalog is None:
         return None
+    with metrics.track("catalog", "find_users"):
+        return [catalog.user_json(r) for r in catalog.find_users(role, interest)]
 
 # --- Define the "Tools" that query your database ---
 
 def find_projects(skill: str = None, title: str = None) -> str:
     """Finds projects in the MoDX database based on a skill or title. If no parameters are provided, returns all projects."""
-    print("find_projects called with:", skill, title)
+    logger.debug("find_projects called with skill=%r title=%r", skill, title, extra={"event": "tool.call"})
     
     query_filter = {}
     
     # If no parameters provided, return all projects (limited to avoid overwhelming response)
     if not skill and not title:
+        cached = _catalog_projects(None, None, limit=20)
+        if cached is not None:
+            total, limited_results = cached
+            if not total:
+                return json.dumps({"success": True, "message": "No projects found in the database.", "data": []})
+            return json.dumps({"success": True, "message": f"Found {total} total projects. Showing first {len(limited_results)}.", "data": limited_results})
+
         projection = {'title': 1, 'description': 1, 'requiredSkills': 1, 'techStack': 1, '_id': 1}
         results = _execute_query_mongodb('projects', {}, projection)
         
@@ -40,6 +69,13 @@ def find_projects(skill: str = None, title: str = None) -> str:
         # Limit to 20 projects to avoid overwhelming the response
         limited_results = results[:20]
         return json.dumps({"success": True, "message": f"Found {len(results)} total projects. Showing first {len(limited_results)}.", "data": limited_results})
+
+    cached = _catalog_projects(skill, title)
+    if cached is not None:
+        results = cached[1]
+        if not results:
+            return json.dumps({"success": True, "message": "No projects found matching your criteria.", "data": []})
+        return json.dumps({"success": True, "message": "Projects found.", "data": results})
     
     if title:
         # Case-insensitive regex search for title
@@ -70,6 +106,12 @@ def find_users(role: str = None, interest: str = None) -> str:
     if not role and not interest:
         return json.dumps({"success": False, "message": "Please specify a role or interest to search for.", "data": []})
 
+    results = _catalog_users(role, interest)
+    if results is not None:
+        if not results:
+            return json.dumps({"success": True, "message": "No users found matching your criteria.", "data": []})
+        return json.dumps({"success": True, "message": "Users found.", "data": results})
+
     query_filter = {}
     
     if role:
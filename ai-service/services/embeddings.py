@@ -0,0 +1,180 @@
+"""
+Embedding providers.
+
+Every vector in the collection, the snapshot and the caches must come from
+the same model, so the provider is chosen once per deployment with
+EMBEDDING_PROVIDER:
+
+- "gemini" (default): the Gemini embed_content API (EMBEDDING_MODEL).
+- "onnx": a local sentence-embedding model exported to ONNX (e.g.
+  all-MiniLM-L6-v2), run on CPU with onnxruntime; no network or quota.
+  Needs `pip install onnxruntime tokenizers`.
+- "hashing": a deterministic hashed bag-of-words vector (EMBEDDING_DIM
+  wide). No model at all; meant for tests, benchmarks and offline development.
+
+Providers embed lists of texts in batches of EMBEDDING_BATCH_SIZE and run up
+to EMBEDDING_THREADS batches in parallel. `name` identifies the model and is
+recorded in collection and snapshot metadata so vectors from different
+models are never compared.
+"""
+
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from core import metrics
+from core import rate_limiter
+from core.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_PROVIDER,
+    EMBEDDING_DIM,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_THREADS,
+    ONNX_EMBEDDING_MODEL_PATH,
+    ONNX_EMBEDDING_TOKENIZER_PATH,
+)
+from core.lazy import Lazy
+
+
+class EmbeddingModelMismatchError(RuntimeError):
+    """Stored vectors were produced by a different embedding model (or size) than the active one."""
+
+
+class EmbeddingProvider:
+    """Base class: subclasses implement `_embed_batch(texts) -> list of vectors`."""
+
+    name = None
+    # Vector size, when known before the first call
+    dim = None
+
+    def __init__(self, batch_size=EMBEDDING_BATCH_SIZE, threads=EMBEDDING_THREADS):
+        self.batch_size = max(1, batch_size)
+        self.threads = max(1, threads)
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="embed") if self.threads > 1 else None
+
+    def _embed_batch(self, texts):
+        raise NotImplementedError
+
+    def _timed_batch(self, texts):
+        with metrics.track("embedding", self.name):
+            return self._embed_batch(texts)
+
+    def embed(self, texts):
+        """Embeds `texts` (a list) and returns one vector (list of floats) per text."""
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if self._pool is None or len(batches) == 1:
+            results = [self._timed_batch(batch) for batch in batches]
+        else:
+            results = list(self._pool.map(self._timed_batch, batches))
+        vectors = [vector for batch in results for vector in batch]
+        if len(vectors) != len(texts):
+            raise RuntimeError(f"{self.name} returned {len(vectors)} embeddings for {len(texts)} texts")
+        if vectors and self.dim is None:
+            self.dim = len(vectors[0])
+        return vectors
+
+
+class GeminiEmbeddingProvider(EmbeddingProvider):
+    # embed_content accepts at most 100 texts per call
+    MAX_BATCH = 100
+
+    def __init__(self, model=EMBEDDING_MODEL, **kwargs):
+        super().__init__(**kwargs)
+        self.name = model
+        self.batch_size = min(self.batch_size, self.MAX_BATCH)
+
+    def _embed_batch(self, texts):
+        from core.model_manager import get_client
+        rate_limiter.acquire(self.name, "embed")
+        result = get_client().models.embed_content(model=self.name, contents=texts)
+        return [e.values for e in result.embeddings or []]
+
+
+_WORDS = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """Signed feature hashing of lowercase words into `dim` buckets, L2-normalized."""
+
+    def __init__(self, dim=EMBEDDING_DIM, **kwargs):
+        super().__init__(**kwargs)
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _embed_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORDS.findall(text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def _embed_batch(self, texts):
+        return [self._embed_one(text) for text in texts]
+
+
+class OnnxEmbeddingProvider(EmbeddingProvider):
+    """
+    Mean-pooled, L2-normalized token embeddings from a sentence-transformer
+    exported to ONNX. onnxruntime releases the GIL, so parallel batches use
+    several cores; each session run gets its share of the CPU threads.
+    """
+
+    def __init__(self, model_path=ONNX_EMBEDDING_MODEL_PATH, tokenizer_path=ONNX_EMBEDDING_TOKENIZER_PATH,
+                 max_length=256, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_PROVIDER=onnx needs `pip install onnxruntime tokenizers`") from e
+        if not model_path:
+            raise RuntimeError("EMBEDDING_PROVIDER=onnx needs ONNX_EMBEDDING_MODEL_PATH")
+        tokenizer_path = tokenizer_path or os.path.join(os.path.dirname(model_path), "tokenizer.json")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.threads)
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+        # e.g. "onnx/all-MiniLM-L6-v2" for .../all-MiniLM-L6-v2/model.onnx
+        self.name = "onnx/" + os.path.basename(os.path.dirname(os.path.abspath(model_path)))
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.tolist()
+
+
+PROVIDERS = {
+    "gemini": GeminiEmbeddingProvider,
+    "onnx": OnnxEmbeddingProvider,
+    "hashing": HashingEmbeddingProvider,
+}
+
+
+def create_provider(kind=EMBEDDING_PROVIDER):
+    if kind not in PROVIDERS:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER {kind!r}; expected one of {tuple(PROVIDERS)}")
+    return PROVIDERS[kind]()
+
+
+_provider = Lazy(create_provider, name="embedding_provider")
+
+
+def get_provider():
+    """Returns the configured embedding provider, creating it on first use."""
+    return _provider.get()
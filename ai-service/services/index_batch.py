@@ -0,0 +1,140 @@
+"""
+Batched index mutations: mixed upserts and deletes of project and user documents.
+
+Each mutation names an entity (`doc_type` project or user, plus its MongoDB
+id). Upserted documents are rebuilt from MongoDB, embedded and written to
+Chroma in batches of INDEX_BATCH_SIZE; all deletes go out in one Chroma
+call. After the vector store has been updated, every local structure derived
+from it is updated in the same step: the related-projects graph, the answer
+cache, the re-indexed users' cached recommendations, the in-memory catalog
+and the shared index snapshot (patched, not re-exported).
+
+Every mutation gets an outcome: upserted, deleted, not_found, superseded (a
+later mutation in the batch targets the same document), invalid or error.
+"""
+
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from core import rate_limiter
+from core.answer_cache import answer_cache
+from core.config import INDEX_SNAPSHOT_DIR
+from database import get_documents_by_ids, mark_as_indexed
+from services import catalog, index_snapshot, related_graph, user_recommender
+from services.vector_store import INDEX_BATCH_SIZE, add_documents_to_store, delete_documents_from_store
+
+DOC_TYPES = ("project", "user")
+OPS = ("upsert", "delete")
+
+
+def _result(mutation, status, error=None):
+    return {
+        "op": mutation.get("op"),
+        "doc_type": mutation.get("doc_type"),
+        "id": mutation.get("id"),
+        "status": status,
+        "error": error,
+    }
+
+
+def _validate(mutation):
+    if mutation.get("op") not in OPS:
+        return f"op must be one of {OPS}"
+    if mutation.get("doc_type") not in DOC_TYPES:
+        return f"doc_type must be one of {DOC_TYPES}"
+    try:
+        ObjectId(mutation.get("id"))
+    except (InvalidId, TypeError):
+        return "id is not a valid ObjectId"
+    return None
+
+
+def _apply_upserts(doc_ids, results_by_doc):
+    """Embeds and writes the documents; returns (ids, embeddings, metadatas) that were stored."""
+    project_ids = [d[len("project_"):] for d in doc_ids if d.startswith("project_")]
+    user_ids = [d[len("user_"):] for d in doc_ids if d.startswith("user_")]
+    # Taken before the read: an edit landing while we embed stays pending
+    read_at = datetime.utcnow()
+    documents = get_documents_by_ids(project_ids, user_ids)
+    found = {doc[0] for doc in documents}
+    for doc_id in doc_ids:
+        if doc_id not in found:
+            results_by_doc[doc_id]["status"] = "not_found"
+
+    stored_ids, stored_embeddings, stored_metadatas = [], [], []
+    for start in range(0, len(documents), INDEX_BATCH_SIZE):
+        batch = documents[start:start + INDEX_BATCH_SIZE]
+        try:
+            with rate_limiter.priority("background"):
+                embeddings = add_documents_to_store(batch)
+        except Exception as e:
+            for doc in batch:
+                results_by_doc[doc[0]].update(status="error", error=str(e)[:200])
+            continue
+        for doc, embedding in zip(batch, embeddings):
+            results_by_doc[doc[0]]["status"] = "upserted"
+            stored_ids.append(doc[0])
+            stored_embeddings.append(embedding)
+            stored_metadatas.append(doc[2])
+
+    for doc_type, collection in (("project", "projects"), ("user", "users")):
+        ids = [d[len(doc_type) + 1:] for d in stored_ids if d.startswith(doc_type + "_")]
+        if ids:
+            mark_as_indexed(ids, collection, indexed_at=read_at)
+    return stored_ids, stored_embeddings, stored_metadatas
+
+
+def _apply_deletes(doc_ids, results_by_doc):
+    """Deletes the documents in one call; returns the ids that were removed."""
+    try:
+        deleted = set(delete_documents_from_store(doc_ids))
+    except Exception as e:
+        for doc_id in doc_ids:
+            results_by_doc[doc_id].update(status="error", error=str(e)[:200])
+        return []
+    for doc_id in doc_ids:
+        results_by_doc[doc_id]["status"] = "deleted" if doc_id in deleted else "not_found"
+    return [doc_id for doc_id in doc_ids if doc_id in deleted]
+
+
+def _update_local_indexes(upserted_ids, embeddings, metadatas, deleted_ids):
+    project_rows = [i for i, doc_id in enumerate(upserted_ids) if doc_id.startswith("project_")]
+    related_graph.upsert_projects([upserted_ids[i] for i in project_rows], [embeddings[i] for i in project_rows])
+    related_graph.delete_projects([doc_id for doc_id in deleted_ids if doc_id.startswith("project_")])
+    answer_cache.clear()
+    user_recommender.invalidate_users(upserted_ids + deleted_ids)
+    catalog.after_index(upserted_ids, deleted_ids)
+    if INDEX_SNAPSHOT_DIR:
+        index_snapshot.patch_snapshot(upserted_ids, embeddings, metadatas, deleted_ids)
+        index_snapshot.invalidate()
+
+
+def apply_batch(mutations):
+    """
+    Applies `mutations` (dicts with op, doc_type and id) and returns one
+    result dict per mutation, in input order.
+    """
+    results = [_result(m, "pending") for m in mutations]
+    # The last mutation for a document wins; earlier ones are superseded
+    results_by_doc = {}
+    for mutation, result in zip(mutations, results):
+        error = _validate(mutation)
+        if error:
+            result.update(status="invalid", error=error)
+            continue
+        doc_id = f"{mutation['doc_type']}_{mutation['id']}"
+        if doc_id in results_by_doc:
+            results_by_doc[doc_id]["status"] = "superseded"
+        results_by_doc[doc_id] = result
+
+    upserts = [doc_id for doc_id, r in results_by_doc.items() if r["op"] == "upsert"]
+    deletes = [doc_id for doc_id, r in results_by_doc.items() if r["op"] == "delete"]
+
+    upserted_ids, embeddings, metadatas = _apply_upserts(upserts, results_by_doc) if upserts else ([], [], [])
+    deleted_ids = _apply_deletes(deletes, results_by_doc) if deletes else []
+
+    if upserted_ids or deleted_ids:
+        _update_local_indexes(upserted_ids, embeddings, metadatas, deleted_ids)
+    return results
@@ -0,0 +1,431 @@
+"""
+Read-only, memory-mapped snapshot of the vector index.
+
+A snapshot is a copy of the Chroma collection (ids, embeddings, metadata)
+written as flat files that every worker process maps with `np.load(mmap_mode="r")`.
+The pages live in the OS page cache once, however many workers read them, and
+similarity search becomes a local matrix-vector product instead of a network
+round trip to Chroma Cloud.
+
+Layout of INDEX_SNAPSHOT_DIR:
+
+    CURRENT                      name of the active version (replaced atomically)
+    .publish.lock                serializes publishers across processes
+    <version>/manifest.json      count, dim, embedding model, doc_type row ranges
+    <version>/embeddings.npy     float32 [count, dim], L2-normalised, grouped by doc_type
+    <version>/ids.npy            fixed-width bytes [count]
+    <version>/metadata.bin       concatenated JSON metadata records
+    <version>/metadata_offsets.npy  int64 [count + 1] offsets into metadata.bin
+    <version>/embeddings_float16.npy  optional float16 copy of embeddings.npy
+    <version>/embeddings_int8.npy     optional int8 copy, with per-row scales in
+    <version>/scales_int8.npy         float32 [count]
+
+With SNAPSHOT_QUANTIZATION set to float16 or int8, candidates are generated
+by scanning the 2x / 4x smaller quantized matrix and the best
+SNAPSHOT_RESCORE_MULTIPLIER * k of them are re-scored exactly against the
+float32 rows. Only those few float32 rows are read, so the full-precision
+file stays on disk rather than in memory.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from core import metrics
+from core.config import (
+    INDEX_SNAPSHOT_DIR,
+    SNAPSHOT_REFRESH_SECONDS,
+    SNAPSHOT_QUANTIZATION,
+    SNAPSHOT_RESCORE_MULTIPLIER,
+    EMBEDDING_MODEL,
+)
+from services.embeddings import get_provider
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".publish.lock"
+KEEP_VERSIONS = 2
+QUANTIZATION_MODES = ("none", "float16", "int8")
+# Rows converted to float32 at a time while scanning a quantized matrix. Small
+# enough that the temporary block stays in CPU cache (512 x 768 x 4 B = 1.5 MB).
+SCAN_BLOCK_ROWS = 512
+
+
+def quantize(matrix, mode):
+    """
+    Returns (quantized matrix, per-row scales or None) for `mode`.
+    int8 uses a symmetric per-vector scale: row ~= int8_row * scale.
+    """
+    if mode == "float16":
+        return matrix.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def scan_scores(matrix, query, scales=None, block_rows=SCAN_BLOCK_ROWS):
+    """
+    Dot products of every row of `matrix` with `query`. Non-float32 matrices are
+    converted block by block, so the temporary float32 copy stays small.
+    """
+    if matrix.dtype == np.float32:
+        return matrix @ query
+    scores = np.empty(len(matrix), dtype=np.float32)
+    for start in range(0, len(matrix), block_rows):
+        block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        scores[start:start + block_rows] = block @ query
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+class IndexSnapshot:
+    """One loaded snapshot version. Arrays are read-only memory maps."""
+
+    def __init__(self, path, quantization=SNAPSHOT_QUANTIZATION):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.dim = self.manifest["dim"]
+        self.embedding_model = self.manifest.get("embedding_model")
+        self.ranges = {k: tuple(v) for k, v in self.manifest["ranges"].items()}
+        self.embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(path, "ids.npy"), mmap_mode="r")
+        self._metadata_blob = np.memmap(os.path.join(path, "metadata.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(path, "metadata.bin")) else np.zeros(0, dtype=np.uint8)
+        self._metadata_offsets = np.load(os.path.join(path, "metadata_offsets.npy"), mmap_mode="r")
+        self.quantization, self._scan_matrix, self._scan_scales = self._load_quantized(path, quantization)
+        self._positions = None
+        self._positions_lock = threading.Lock()
+        self._tag_masks = {}
+
+    def _load_quantized(self, path, mode):
+        if mode in (None, "", "none"):
+            return "none", None, None
+        matrix_path = os.path.join(path, f"embeddings_{mode}.npy")
+        if not os.path.exists(matrix_path):
+            # Snapshot was written without this mode: fall back to exact float32 search
+            return "none", None, None
+        scales = None
+        if mode == "int8":
+            scales = np.load(os.path.join(path, "scales_int8.npy"), mmap_mode="r")
+        return mode, np.load(matrix_path, mmap_mode="r"), scales
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scan_nbytes(self):
+        """Bytes of the matrix scanned for every query (quantized copy if enabled)."""
+        matrix = self._scan_matrix if self._scan_matrix is not None else self.embeddings
+        scales = self._scan_scales.nbytes if self._scan_scales is not None else 0
+        return matrix.nbytes + scales
+
+    def doc_id(self, row):
+        return self.ids[row].decode()
+
+    def metadata(self, row):
+        start, end = self._metadata_offsets[row], self._metadata_offsets[row + 1]
+        return json.loads(self._metadata_blob[start:end].tobytes()) if end > start else {}
+
+    def rows(self, doc_type=None):
+        """Returns the (start, end) row range holding `doc_type` (all rows if None)."""
+        if doc_type is None:
+            return 0, len(self.ids)
+        return self.ranges.get(doc_type, (0, 0))
+
+    def row_of(self, doc_id):
+        """Row number of `doc_id`, or None. The lookup table is built on first use."""
+        if self._positions is None:
+            with self._positions_lock:
+                if self._positions is None:
+                    self._positions = {raw.decode(): i for i, raw in enumerate(self.ids)}
+        return self._positions.get(doc_id)
+
+    def tag_mask(self, doc_type, key, values):
+        """
+        Boolean mask over the rows of `doc_type` whose comma-separated metadata
+        field `key` contains any of `values` (e.g. users with role "mentor").
+        Per-value masks are cached for the lifetime of the snapshot.
+        """
+        start, end = self.rows(doc_type)
+        mask = np.zeros(end - start, dtype=bool)
+        for value in values:
+            cache_key = (doc_type, key, value)
+            value_mask = self._tag_masks.get(cache_key)
+            if value_mask is None:
+                value_mask = np.fromiter(
+                    (value in str(self.metadata(row).get(key, "")).split(",") for row in range(start, end)),
+                    dtype=bool, count=end - start,
+                )
+                self._tag_masks[cache_key] = value_mask
+            mask |= value_mask
+        return mask
+
+    def score_matrix(self, query_vectors, doc_type):
+        """
+        Cosine similarity of every `doc_type` row with each query, in one
+        matrix multiply. Returns (first row number, scores[rows, queries]).
+        """
+        start, end = self.rows(doc_type)
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return start, self.embeddings[start:end] @ (queries / norms).T
+
+    def vector(self, doc_id):
+        row = self.row_of(doc_id)
+        return None if row is None else np.asarray(self.embeddings[row])
+
+    def search(self, query_vector, n_results=10, doc_type="project", rescore_multiplier=None, doc_ids=None):
+        """
+        Cosine-similarity top-k over the rows of `doc_type` (only those of
+        `doc_ids` when given). Returns a list of (doc_id, score), best first.
+        """
+        start, end = self.rows(doc_type)
+        if end <= start or n_results <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+        if doc_ids is not None:
+            # A filtered search scores just the allowed rows, exactly
+            rows = np.array(sorted(
+                row for row in (self.row_of(d) for d in doc_ids) if row is not None and start <= row < end
+            ), dtype=np.int64)
+            if not len(rows):
+                return []
+            scores = np.asarray(self.embeddings[rows], dtype=np.float32) @ query
+            best = np.argsort(-scores)[:n_results]
+            return [(self.doc_id(rows[i]), float(scores[i])) for i in best]
+        if self._scan_matrix is None:
+            scores = self.embeddings[start:end] @ query
+            k = min(n_results, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.doc_id(start + i), float(scores[i])) for i in top]
+
+        # Candidate generation on the quantized matrix...
+        scales = self._scan_scales[start:end] if self._scan_scales is not None else None
+        approx = scan_scores(self._scan_matrix[start:end], query, scales)
+        multiplier = rescore_multiplier or SNAPSHOT_RESCORE_MULTIPLIER
+        n_candidates = min(len(approx), max(n_results, n_results * multiplier))
+        candidates = np.sort(np.argpartition(-approx, n_candidates - 1)[:n_candidates])
+        # ...then an exact float32 re-score of just those rows
+        exact = np.asarray(self.embeddings[start + candidates], dtype=np.float32) @ query
+        k = min(n_results, len(exact))
+        best = np.argsort(-exact)[:k]
+        return [(self.doc_id(start + candidates[i]), float(exact[i])) for i in best]
+
+    def search_ids(self, query_vector, n_results=10, doc_type="project", rescore_multiplier=None, doc_ids=None):
+        return [doc_id for doc_id, _ in self.search(query_vector, n_results, doc_type, rescore_multiplier, doc_ids)]
+
+
+# --- Writing ---
+
+def export_from_collection(collection, page_size=1000, where=None):
+    """Reads every id, embedding and metadata record (matching `where`) from a Chroma collection."""
+    ids, embeddings, metadatas = [], [], []
+    offset = 0
+    while True:
+        with metrics.track("chroma", "get"):
+            page = collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset, where=where)
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        embeddings.extend(page["embeddings"])
+        metadatas.extend(page["metadatas"] or [{}] * len(page["ids"]))
+        offset += len(page["ids"])
+    return ids, embeddings, metadatas
+
+
+def write_snapshot(ids, embeddings, metadatas, directory=None, embedding_model=EMBEDDING_MODEL,
+                   quantization=SNAPSHOT_QUANTIZATION):
+    """
+    Writes a new snapshot version and makes it CURRENT. Rows are grouped by
+    metadata doc_type so each type is a contiguous (zero-copy) slice, and a
+    quantized copy is written when `quantization` is float16 or int8.
+    Returns the version name.
+    """
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"SNAPSHOT_QUANTIZATION must be one of {QUANTIZATION_MODES}, got {quantization!r}")
+    directory = directory or INDEX_SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    order = sorted(range(len(ids)), key=lambda i: ((metadatas[i] or {}).get("doc_type", ""), ids[i]))
+    dim = len(embeddings[order[0]]) if order else 0
+    matrix = np.asarray([embeddings[i] for i in order], dtype=np.float32).reshape(len(order), dim)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    ranges = {}
+    for row, i in enumerate(order):
+        doc_type = (metadatas[i] or {}).get("doc_type", "")
+        start, _ = ranges.get(doc_type, (row, row))
+        ranges[doc_type] = (start, row + 1)
+
+    encoded = [json.dumps(metadatas[i] or {}, separators=(",", ":")).encode() for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(e) for e in encoded], dtype=np.int64)
+
+    # Zero-padded UTC nanoseconds, so names sort in write order
+    version = f"v{time.time_ns():020d}-{os.getpid()}"
+    tmp_path = os.path.join(directory, version + ".tmp")
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "embeddings.npy"), matrix)
+    if quantization != "none":
+        quantized, scales = quantize(matrix, quantization)
+        np.save(os.path.join(tmp_path, f"embeddings_{quantization}.npy"), quantized)
+        if scales is not None:
+            np.save(os.path.join(tmp_path, f"scales_{quantization}.npy"), scales)
+    id_width = max((len(ids[i].encode()) for i in order), default=1)
+    np.save(os.path.join(tmp_path, "ids.npy"), np.asarray([ids[i].encode() for i in order], dtype=f"S{id_width}"))
+    with open(os.path.join(tmp_path, "metadata.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    np.save(os.path.join(tmp_path, "metadata_offsets.npy"), offsets)
+    with open(os.path.join(tmp_path, "manifest.json"), "w") as f:
+        json.dump({
+            "version": version,
+            "count": len(order),
+            "dim": dim,
+            "embedding_model": embedding_model,
+            "quantization": quantization,
+            "created_at": time.time(),
+            "ranges": ranges,
+        }, f)
+    os.rename(tmp_path, os.path.join(directory, version))
+
+    pointer_tmp = os.path.join(directory, CURRENT_FILE + f".{os.getpid()}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(directory, CURRENT_FILE))
+    _prune(directory, keep=version)
+    return version
+
+
+def _version_order(name):
+    # Versions named by the older local-time scheme (vYYYYMMDD-HHMMSS-...) predate every nanosecond one
+    return (len(name.split("-", 1)[0]) != 9, name)
+
+
+def _prune(directory, keep):
+    """Removes old versions, keeping the newest KEEP_VERSIONS (workers may still map the previous one)."""
+    versions = sorted(
+        (name for name in os.listdir(directory)
+         if name.startswith("v") and not name.endswith(".tmp") and os.path.isdir(os.path.join(directory, name))),
+        key=_version_order,
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        if name != keep:
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+@contextmanager
+def _publish_lock(directory):
+    """
+    Exclusive lock on the snapshot directory, so concurrent publishers (e.g.
+    two workers) never build on the same CURRENT and drop each other's changes.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def build_snapshot(collection, directory=None):
+    """Exports `collection` and publishes it as the new CURRENT snapshot."""
+    directory = directory or INDEX_SNAPSHOT_DIR
+    with _publish_lock(directory):
+        ids, embeddings, metadatas = export_from_collection(collection)
+        embedding_model = (collection.metadata or {}).get("embedding_model", EMBEDDING_MODEL)
+        return write_snapshot(ids, embeddings, metadatas, directory, embedding_model=embedding_model)
+
+
+def patch_snapshot(upsert_ids, upsert_embeddings, upsert_metadatas, delete_ids, directory=None):
+    """
+    Publishes a new version equal to CURRENT with `upsert_ids` added or
+    replaced and `delete_ids` removed, without re-exporting Chroma. Returns
+    the new version, or None when no snapshot exists yet.
+    """
+    directory = directory or INDEX_SNAPSHOT_DIR
+    with _publish_lock(directory):
+        version = _current_version(directory)
+        if version is None:
+            return None
+        current = IndexSnapshot(os.path.join(directory, version), quantization="none")
+        dropped = set(upsert_ids).union(delete_ids)
+        keep = [row for row in range(len(current)) if current.doc_id(row) not in dropped]
+        ids = [current.doc_id(row) for row in keep] + list(upsert_ids)
+        # A snapshot of an empty collection has no dimension yet
+        dim = current.dim or (len(upsert_embeddings[0]) if len(upsert_ids) else 0)
+        embeddings = np.vstack([
+            np.asarray(current.embeddings[keep], dtype=np.float32).reshape(len(keep), dim),
+            np.asarray(upsert_embeddings, dtype=np.float32).reshape(len(upsert_ids), dim),
+        ])
+        metadatas = [current.metadata(row) for row in keep] + list(upsert_metadatas)
+        return write_snapshot(ids, embeddings, metadatas, directory, embedding_model=current.embedding_model)
+
+
+# --- Loading ---
+
+_state = {"snapshot": None, "checked_at": 0.0}
+_state_lock = threading.Lock()
+
+
+def _current_version(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def get_snapshot():
+    """
+    Returns the CURRENT snapshot, or None when snapshots are disabled or none
+    has been built yet. The CURRENT pointer is re-read at most every
+    SNAPSHOT_REFRESH_SECONDS, so every worker picks up a rebuilt snapshot.
+    """
+    if not INDEX_SNAPSHOT_DIR:
+        return None
+    now = time.monotonic()
+    if now - _state["checked_at"] < SNAPSHOT_REFRESH_SECONDS:
+        return _state["snapshot"]
+    with _state_lock:
+        if now - _state["checked_at"] >= SNAPSHOT_REFRESH_SECONDS:
+            version = _current_version(INDEX_SNAPSHOT_DIR)
+            current = _state["snapshot"]
+            if version is None:
+                _state["snapshot"] = None
+            elif current is None or current.version != version:
+                snapshot = IndexSnapshot(os.path.join(INDEX_SNAPSHOT_DIR, version))
+                model = get_provider().name
+                if snapshot.embedding_model not in (None, model):
+                    # Never compare query vectors with another model's vectors
+                    logger.warning(f"Ignoring snapshot {version}: built from {snapshot.embedding_model}, not {model}.")
+                    snapshot = None
+                _state["snapshot"] = snapshot
+            _state["checked_at"] = now
+    return _state["snapshot"]
+
+
+def invalidate():
+    """Forces the next `get_snapshot()` call to re-read the CURRENT pointer."""
+    _state["checked_at"] = 0.0
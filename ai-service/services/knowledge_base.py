@@ -0,0 +1,198 @@
+"""
+Knowledge-base ingestion and passage retrieval for the RAG fallback.
+
+Ingestion splits each entry of modx_knowledge_base.json into chunks of about
+KB_CHUNK_TOKENS tokens along sentence boundaries, with KB_CHUNK_OVERLAP_TOKENS
+of overlap so a fact on a boundary survives in one piece. Chunk ids are
+stable (`kb_<entry slug>_<n>`) and every chunk carries a hash of its text, so
+re-running the ingestion only embeds chunks whose text changed and deletes
+chunks that no longer exist.
+
+Retrieval returns passage text, best match first, packed into a fixed token
+budget for the prompt.
+"""
+
+import hashlib
+import json
+import re
+
+from core import metrics
+from core.answer_cache import answer_cache
+from core.config import (
+    INDEX_SNAPSHOT_DIR,
+    KB_CHUNK_TOKENS,
+    KB_CHUNK_OVERLAP_TOKENS,
+    KB_CONTEXT_TOKENS,
+    KB_PATH,
+)
+from core.tokens import estimate_tokens, truncate_to_tokens
+from services import index_snapshot
+from services.vector_store import (
+    add_documents_to_store,
+    check_dimension,
+    delete_documents_from_store,
+    get_collection,
+    get_embeddings,
+)
+
+DOC_TYPE = "kb"
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_NON_SLUG = re.compile(r"[^a-z0-9]+")
+# A truncated last passage is only worth adding if this many tokens fit
+MIN_PASSAGE_TOKENS = 40
+
+
+def _slug(title):
+    return _NON_SLUG.sub("-", title.lower()).strip("-")[:60] or "entry"
+
+
+def _split_long(sentence, max_tokens):
+    """Splits a single over-long sentence on word boundaries."""
+    parts, current = [], []
+    for word in sentence.split():
+        if current and estimate_tokens(" ".join(current + [word])) > max_tokens:
+            parts.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def chunk_text(text, max_tokens=KB_CHUNK_TOKENS, overlap_tokens=KB_CHUNK_OVERLAP_TOKENS):
+    """
+    Packs sentences into chunks of at most `max_tokens`. Each chunk after the
+    first starts with the trailing sentences of the previous one, up to
+    `overlap_tokens`.
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if sentence:
+            sentences.extend(_split_long(sentence, max_tokens) if estimate_tokens(sentence) > max_tokens else [sentence])
+
+    chunks, current = [], []
+    for sentence in sentences:
+        if current and estimate_tokens(" ".join(current + [sentence])) > max_tokens:
+            chunks.append(" ".join(current))
+            overlap = []
+            for previous in reversed(current):
+                if estimate_tokens(" ".join([previous] + overlap + [sentence])) > min(overlap_tokens + estimate_tokens(sentence), max_tokens):
+                    break
+                overlap.insert(0, previous)
+            current = overlap
+        current.append(sentence)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def build_chunks(entries):
+    """(chunk_id, text, metadata) for every chunk of the knowledge-base entries."""
+    documents, seen = [], {}
+    for entry in entries:
+        title = entry.get("title", "").strip()
+        slug = _slug(title)
+        # Keep ids unique when two entries share a title
+        seen[slug] = seen.get(slug, 0) + 1
+        if seen[slug] > 1:
+            slug = f"{slug}-{seen[slug]}"
+        tags = ",".join(entry.get("tags", []))
+        for n, passage in enumerate(chunk_text(entry.get("content", ""))):
+            text = f"{title}: {passage}" if title else passage
+            documents.append((f"kb_{slug}_{n:03d}", text, {
+                "doc_type": DOC_TYPE,
+                "title": title,
+                "chunk": n,
+                "tags": tags,
+                "tokens": estimate_tokens(text),
+                "content_hash": content_hash(text),
+            }))
+    return documents
+
+
+def load_entries(path=KB_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _existing_hashes(collection):
+    hashes, offset = {}, 0
+    while True:
+        with metrics.track("chroma", "get"):
+            page = collection.get(where={"doc_type": DOC_TYPE}, include=["metadatas"], limit=1000, offset=offset)
+        if not page["ids"]:
+            return hashes
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            hashes[doc_id] = (metadata or {}).get("content_hash")
+        offset += len(page["ids"])
+
+
+def sync_knowledge_base(path=KB_PATH):
+    """
+    Brings the indexed chunks in line with the JSON file: embeds new and
+    changed chunks, deletes removed ones and leaves the rest untouched.
+    Returns counts of added, updated, unchanged and deleted chunks.
+    """
+    chunks = build_chunks(load_entries(path))
+    existing = _existing_hashes(get_collection())
+    changed = [c for c in chunks if existing.get(c[0]) != c[2]["content_hash"]]
+    current_ids = {c[0] for c in chunks}
+    removed = [doc_id for doc_id in existing if doc_id not in current_ids]
+
+    embeddings = add_documents_to_store(changed) if changed else []
+    deleted = delete_documents_from_store(removed) if removed else []
+
+    if changed or deleted:
+        answer_cache.clear()
+        if INDEX_SNAPSHOT_DIR:
+            index_snapshot.patch_snapshot([c[0] for c in changed], embeddings, [c[2] for c in changed], deleted)
+            index_snapshot.invalidate()
+
+    return {
+        "added": sum(1 for c in changed if c[0] not in existing),
+        "updated": sum(1 for c in changed if c[0] in existing),
+        "unchanged": len(chunks) - len(changed),
+        "deleted": len(deleted),
+    }
+
+
+def retrieve_passages(query, token_budget=KB_CONTEXT_TOKENS, n_candidates=8, query_embedding=None):
+    """
+    Most relevant knowledge-base passages for `query`, best first, as
+    (chunk_id, text) pairs whose combined size fits in `token_budget` tokens.
+    Pass `query_embedding` when the query was already embedded.
+    """
+    if query_embedding is None:
+        query_embedding = get_embeddings(query)
+    if not len(query_embedding):
+        return []
+    collection = get_collection()
+    check_dimension(collection, len(query_embedding))
+    with metrics.track("chroma", "query"):
+        results = collection.query(
+            query_embeddings=query_embedding,
+            n_results=n_candidates,
+            where={"doc_type": DOC_TYPE},
+            include=["documents"],
+        )
+
+    passages, used = [], 0
+    for doc_id, text in zip(results["ids"][0], results["documents"][0]):
+        remaining = token_budget - used
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            if remaining >= MIN_PASSAGE_TOKENS:
+                passages.append((doc_id, truncate_to_tokens(text, remaining)))
+            break
+        passages.append((doc_id, text))
+        used += tokens
+    return passages
+
+
+def retrieve_context(query, token_budget=KB_CONTEXT_TOKENS, query_embedding=None):
+    """Passages for `query` joined into a prompt-ready context block ("" if none)."""
+    return "\n\n".join(text for _, text in retrieve_passages(query, token_budget, query_embedding=query_embedding))
@@ -0,0 +1,200 @@
+"""
+Team-member matching over the indexed user vectors.
+
+A match request describes what a project needs (an indexed project, free
+skill text, or both) and is turned into a query vector. Every `user_<id>`
+vector is scored against all queries of a batch in one matrix multiply on
+the index snapshot; without a snapshot the queries go to Chroma in a single
+call. Existing members, the project leader and explicitly excluded users are
+dropped, and an optional role filter is applied before taking the top-k.
+"""
+
+import numpy as np
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from core import metrics
+from database import get_mongodb_connection
+from services import index_snapshot
+from services.vector_store import get_collection, get_embeddings
+
+USER_PREFIX = "user_"
+PROJECT_PREFIX = "project_"
+
+
+class ProjectNotIndexedError(Exception):
+    """The requested project has no vector in the index."""
+
+
+class EmbeddingUnavailableError(RuntimeError):
+    """The skill text could not be embedded (provider error or quota)."""
+
+
+def _existing_member_ids(project_id):
+    """User ids already on the project (any membership status) plus its leader."""
+    try:
+        oid = ObjectId(project_id)
+    except (InvalidId, TypeError):
+        return set()
+    db = get_mongodb_connection()
+    with metrics.track("mongo", "projectmembers.find"):
+        members = {str(m["memberId"]) for m in db["projectmembers"].find({"projectId": oid}, {"memberId": 1})}
+    with metrics.track("mongo", "projects.find_one"):
+        project = db["projects"].find_one({"_id": oid}, {"leaderId": 1})
+    if project and project.get("leaderId"):
+        members.add(str(project["leaderId"]))
+    return members
+
+
+def _project_vectors(project_ids, snapshot):
+    """Stored embeddings for `project_ids`, keyed by project id."""
+    vectors, missing = {}, []
+    for project_id in project_ids:
+        vector = snapshot.vector(PROJECT_PREFIX + project_id) if snapshot is not None else None
+        if vector is None:
+            missing.append(project_id)
+        else:
+            vectors[project_id] = vector
+    if missing:
+        with metrics.track("chroma", "get"):
+            result = get_collection().get(ids=[PROJECT_PREFIX + p for p in missing], include=["embeddings"])
+        for doc_id, embedding in zip(result["ids"], result["embeddings"]):
+            vectors[doc_id[len(PROJECT_PREFIX):]] = np.asarray(embedding, dtype=np.float32)
+    return vectors
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _query_vectors(requests, snapshot):
+    """
+    One query vector per request: the project's stored vector, the embedded
+    skill text, or the mean of both. All skill texts are embedded in one call.
+    """
+    project_ids = list({r["project_id"] for r in requests if r.get("project_id")})
+    project_vectors = _project_vectors(project_ids, snapshot) if project_ids else {}
+
+    texts = [r["skill_text"] for r in requests if r.get("skill_text")]
+    text_vectors = []
+    if texts:
+        embedded = get_embeddings(texts)
+        # A single text comes back as a bare vector, and a failure as [] either way
+        text_vectors = ([embedded] if len(embedded) else []) if len(texts) == 1 else embedded
+        if len(text_vectors) != len(texts) or any(not len(v) for v in text_vectors):
+            raise EmbeddingUnavailableError("Embedding the skill text failed")
+
+    queries, text_index = [], 0
+    for r in requests:
+        parts = []
+        if r.get("project_id"):
+            if r["project_id"] not in project_vectors:
+                raise ProjectNotIndexedError(f"Project {r['project_id']} is not indexed")
+            parts.append(_normalize(project_vectors[r["project_id"]]))
+        if r.get("skill_text"):
+            parts.append(_normalize(text_vectors[text_index]))
+            text_index += 1
+        queries.append(_normalize(np.mean(parts, axis=0)))
+    return np.vstack(queries)
+
+
+def _match_with_snapshot(snapshot, queries, requests, excluded):
+    start, scores = snapshot.score_matrix(queries, "user")
+    results = []
+    for column, r in enumerate(requests):
+        column_scores = scores[:, column].copy()
+        if r.get("roles"):
+            column_scores[~snapshot.tag_mask("user", "roles", r["roles"])] = -np.inf
+        for user_id in excluded[column]:
+            row = snapshot.row_of(USER_PREFIX + user_id)
+            if row is not None:
+                column_scores[row - start] = -np.inf
+        k = min(r["top_k"], int(np.isfinite(column_scores).sum()))
+        if k <= 0:
+            results.append([])
+            continue
+        top = np.argpartition(-column_scores, k - 1)[:k]
+        top = top[np.argsort(-column_scores[top])]
+        results.append([
+            (snapshot.doc_id(start + i)[len(USER_PREFIX):], float(column_scores[i])) for i in top
+        ])
+    return results
+
+
+def _match_with_chroma(queries, requests, excluded):
+    # Role filters cannot be expressed on the comma-separated metadata, so
+    # over-fetch and filter here.
+    n_results = max(
+        (r["top_k"] + len(excluded[i])) * (4 if r.get("roles") else 1) for i, r in enumerate(requests)
+    )
+    with metrics.track("chroma", "query"):
+        result = get_collection().query(
+            query_embeddings=queries.tolist(),
+            n_results=n_results,
+            where={"doc_type": "user"},
+            include=["metadatas", "distances"],
+        )
+    results = []
+    for column, r in enumerate(requests):
+        wanted = set(r.get("roles") or ())
+        matches = []
+        for doc_id, metadata, distance in zip(result["ids"][column], result["metadatas"][column], result["distances"][column]):
+            user_id = doc_id[len(USER_PREFIX):]
+            if user_id in excluded[column]:
+                continue
+            if wanted and not wanted.intersection(str((metadata or {}).get("roles", "")).split(",")):
+                continue
+            # Squared L2 between unit vectors is 2 - 2 * cosine
+            matches.append((user_id, 1.0 - distance / 2.0))
+            if len(matches) == r["top_k"]:
+                break
+        results.append(matches)
+    return results
+
+
+def match_members_batch(requests):
+    """
+    Ranks users for several match requests at once. Each request is a dict with
+    `project_id` and/or `skill_text`, plus optional `roles`, `exclude_user_ids`
+    and `top_k` (default 10). Returns one list of (user_id, score) per request,
+    best first. Raises ValueError for a request with neither input and
+    ProjectNotIndexedError for an unknown project.
+    """
+    if not requests:
+        return []
+    requests = [dict(r, top_k=r.get("top_k") or 10) for r in requests]
+    for r in requests:
+        if not r.get("project_id") and not r.get("skill_text"):
+            raise ValueError("Either project_id or skill_text is required")
+
+    snapshot = index_snapshot.get_snapshot()
+    queries = _query_vectors(requests, snapshot)
+
+    member_cache = {}
+    excluded = []
+    for r in requests:
+        ids = set(r.get("exclude_user_ids") or ())
+        project_id = r.get("project_id")
+        if project_id:
+            if project_id not in member_cache:
+                member_cache[project_id] = _existing_member_ids(project_id)
+            ids |= member_cache[project_id]
+        excluded.append(ids)
+
+    if snapshot is not None:
+        with metrics.track("snapshot", "match_members"):
+            return _match_with_snapshot(snapshot, queries, requests, excluded)
+    return _match_with_chroma(queries, requests, excluded)
+
+
+def match_members(project_id=None, skill_text=None, roles=None, exclude_user_ids=None, top_k=10):
+    """Ranks users for one project and/or skill description. See match_members_batch."""
+    return match_members_batch([{
+        "project_id": project_id,
+        "skill_text": skill_text,
+        "roles": roles,
+        "exclude_user_ids": exclude_user_ids,
+        "top_k": top_k,
+    }])[0]
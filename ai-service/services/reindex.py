@@ -0,0 +1,252 @@
+"""
+Blue/green reindexing of the Chroma collection.
+
+A full reindex never writes to the collection being served. It builds a new
+versioned collection (`modx_knowledge_base_v<UTC nanoseconds>-<pid>`) with every
+project, user and knowledge-base chunk, validates it, and then moves the
+alias kept by `vector_store` to it in a single metadata write. Workers follow
+the alias within COLLECTION_ALIAS_REFRESH_SECONDS. The replaced collection is
+remembered as "previous", so `rollback()` is one more alias write (plus a
+catch-up of the writes it missed).
+
+Incremental writes keep going to the served collection while the new one is
+being built. Once every worker has switched, `catch_up()` copies everything
+updated or indexed since the build started into the new collection and
+removes documents deleted in MongoDB meanwhile.
+"""
+
+import logging
+import os
+import random
+import time
+from datetime import datetime
+
+from core import rate_limiter
+from core.config import (
+    COLLECTION_ALIAS_REFRESH_SECONDS,
+    INDEX_SNAPSHOT_DIR,
+    REINDEX_VALIDATION_SAMPLES,
+    REINDEX_MIN_SELF_RECALL,
+)
+from database import get_all_documents, get_documents_changed_since, get_existing_ids, mark_as_indexed
+from services import index_snapshot, knowledge_base
+from services.vector_store import (
+    COLLECTION_NAME,
+    add_documents_to_store,
+    delete_documents_from_store,
+    get_chroma_client,
+    open_collection,
+    read_alias,
+    refresh_collection,
+    write_alias,
+)
+
+logger = logging.getLogger(__name__)
+
+VERSION_PREFIX = f"{COLLECTION_NAME}_v"
+ENTITY_COLLECTIONS = {"project": "projects", "user": "users"}
+
+
+def new_collection_name():
+    # Nanoseconds plus the pid, so two builds never pick the same name
+    return f"{VERSION_PREFIX}{time.time_ns():020d}-{os.getpid()}"
+
+
+def _version_order(name):
+    # Versions named by the older one-second scheme (vYYYYMMDDHHMMSS) predate every nanosecond one
+    return (len(name[len(VERSION_PREFIX):].split("-", 1)[0]) != 14, name)
+
+
+def _collection_names():
+    return [getattr(c, "name", c) for c in get_chroma_client().list_collections()]
+
+
+def _all_ids(collection, where, page_size=1000):
+    ids, offset = [], 0
+    while True:
+        page = collection.get(where=where, include=[], limit=page_size, offset=offset)["ids"]
+        if not page:
+            return ids
+        ids += page
+        offset += len(page)
+
+
+def list_versions():
+    """Names of the versioned collections, oldest first."""
+    return sorted((n for n in _collection_names() if n.startswith(VERSION_PREFIX)), key=_version_order)
+
+
+def collect_documents():
+    """Every document a fresh collection should hold: projects, users and knowledge-base chunks."""
+    documents = get_all_documents()
+    try:
+        documents += knowledge_base.build_chunks(knowledge_base.load_entries())
+    except FileNotFoundError:
+        logger.warning("Knowledge base file not found; the new collection will have no kb chunks.")
+    return documents
+
+
+def build_collection(documents, name=None):
+    """
+    Creates collection `name` (a new version by default) and indexes
+    `documents` into it. Raises RuntimeError if `name` already exists, so a
+    build never writes into a version that may be served or kept for rollback.
+    """
+    name = name or new_collection_name()
+    if name in _collection_names():
+        raise RuntimeError(f"Collection {name} already exists; not building into it.")
+    # create_collection also fails if another build took the name since the check
+    get_chroma_client().create_collection(name)
+    collection = open_collection(name)
+    logger.info(f"Building {collection.name} with {len(documents)} documents...")
+    with rate_limiter.priority("bulk"):
+        add_documents_to_store(documents, collection=collection)
+    return collection
+
+
+def validate_collection(collection, documents, sample_size=REINDEX_VALIDATION_SAMPLES,
+                        min_self_recall=REINDEX_MIN_SELF_RECALL, seed=None):
+    """
+    Checks the new collection before it is served: the document count per
+    doc_type must match what was indexed, and sampled documents must come
+    back among the top 3 results when queried with their own vectors.
+    Returns a report dict with `ok` and a list of `problems`.
+    """
+    problems = []
+    expected = {}
+    for _, _, metadata in {doc[0]: doc for doc in documents}.values():
+        expected[metadata.get("doc_type")] = expected.get(metadata.get("doc_type"), 0) + 1
+    counts = {}
+    for doc_type, count in expected.items():
+        counts[doc_type] = len(_all_ids(collection, {"doc_type": doc_type}))
+        if counts[doc_type] != count:
+            problems.append(f"{doc_type}: expected {count} documents, found {counts[doc_type]}")
+
+    ids = list({doc[0] for doc in documents})
+    sample = random.Random(seed).sample(ids, min(sample_size, len(ids)))
+    self_recall = 1.0
+    if sample:
+        stored = collection.get(ids=sample, include=["embeddings"])
+        results = collection.query(query_embeddings=stored["embeddings"], n_results=3, include=[])
+        hits = sum(doc_id in top for doc_id, top in zip(stored["ids"], results["ids"]))
+        self_recall = hits / len(sample)
+        if self_recall < min_self_recall:
+            problems.append(f"self-recall {self_recall:.2f} is below {min_self_recall:.2f}")
+
+    return {"ok": not problems, "problems": problems, "counts": counts, "self_recall": self_recall}
+
+
+def compare_queries(collection, other, query_embeddings, n_results=10):
+    """Average top-k overlap between two collections for the same query vectors (report only)."""
+    if not query_embeddings:
+        return None
+    a = collection.query(query_embeddings=query_embeddings, n_results=n_results, include=[])["ids"]
+    b = other.query(query_embeddings=query_embeddings, n_results=n_results, include=[])["ids"]
+    overlaps = [len(set(x) & set(y)) / max(1, len(set(x) | set(y))) for x, y in zip(a, b)]
+    return sum(overlaps) / len(overlaps)
+
+
+def _publish_snapshot(collection):
+    if INDEX_SNAPSHOT_DIR:
+        index_snapshot.build_snapshot(collection)
+        index_snapshot.invalidate()
+
+
+def switch_to(name):
+    """Points the alias at collection `name`; the served one becomes "previous". Returns it."""
+    current = read_alias()[0]
+    if current == name:
+        return current
+    write_alias(name, current)
+    refresh_collection()
+    _publish_snapshot(open_collection(name))
+    logger.info(f"Alias now points at {name} (previous: {current}).")
+    return current
+
+
+def rollback(wait_seconds=COLLECTION_ALIAS_REFRESH_SECONDS):
+    """
+    Serves the previous collection again, then replays the changes it missed
+    while it was not being served. Returns its name.
+    """
+    current, previous, switched_at = read_alias()
+    if not previous:
+        raise RuntimeError("There is no previous collection to roll back to.")
+    write_alias(previous, current)
+    refresh_collection()
+    collection = open_collection(previous)
+    _publish_snapshot(collection)
+    logger.info(f"Rolled back to {previous} (was serving {current}).")
+    if switched_at:
+        time.sleep(wait_seconds)
+        catch_up(collection, datetime.utcfromtimestamp(switched_at))
+        _publish_snapshot(collection)
+    return previous
+
+
+def catch_up(collection, since):
+    """
+    Re-applies changes made while `collection` was not being served: documents
+    updated or indexed at or after `since` are upserted, and documents
+    deleted from MongoDB are removed. Returns (upserted, deleted) counts.
+    """
+    changed = get_documents_changed_since(since)
+    with rate_limiter.priority("bulk"):
+        add_documents_to_store(changed, collection=collection)
+
+    removed = []
+    for doc_type, mongo_collection in ENTITY_COLLECTIONS.items():
+        doc_ids = _all_ids(collection, {"doc_type": doc_type})
+        entity_ids = [doc_id[len(doc_type) + 1:] for doc_id in doc_ids]
+        existing = get_existing_ids(entity_ids, mongo_collection) if entity_ids else set()
+        removed += [f"{doc_type}_{i}" for i in entity_ids if i not in existing]
+    deleted = delete_documents_from_store(removed, collection=collection) if removed else []
+    return len(changed), len(deleted)
+
+
+def prune(keep=2):
+    """Deletes versioned collections other than the served and previous ones, keeping the newest `keep`."""
+    current, previous, _ = read_alias()
+    versions = list_versions()
+    protected = {current, previous} | set(versions[-keep:] if keep else [])
+    dropped = [name for name in versions if name not in protected]
+    for name in dropped:
+        get_chroma_client().delete_collection(name)
+        logger.info(f"Deleted old collection {name}.")
+    return dropped
+
+
+def blue_green_reindex(switch=True, query_embeddings=None, wait_seconds=COLLECTION_ALIAS_REFRESH_SECONDS):
+    """
+    Builds, validates and (if `switch` and validation passed) serves a new
+    collection. Returns the validation report with the new collection's name.
+    """
+    started = datetime.utcnow()
+    documents = collect_documents()
+    collection = build_collection(documents)
+    report = validate_collection(collection, documents)
+    report["collection"] = collection.name
+
+    current = read_alias()[0]
+    try:
+        report["query_overlap"] = compare_queries(collection, open_collection(current), query_embeddings)
+    except Exception as e:
+        # The served collection may hold another embedding model
+        report["query_overlap"] = None
+        logger.warning(f"Skipping query comparison with {current}: {e}")
+
+    if not report["ok"] or not switch:
+        return report
+
+    switch_to(collection.name)
+    # Let every worker move to the new collection before replaying their writes
+    time.sleep(wait_seconds)
+    report["caught_up"] = catch_up(collection, started)
+    _publish_snapshot(collection)
+
+    for doc_type, mongo_collection in ENTITY_COLLECTIONS.items():
+        ids = [doc[0][len(doc_type) + 1:] for doc in documents if doc[0].startswith(doc_type + "_")]
+        if ids:
+            # Marked as of the build start so later edits still count as pending
+            mark_as_indexed(ids, mongo_collection, indexed_at=started)
+    return report
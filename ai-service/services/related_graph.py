@@ -0,0 +1,319 @@
+"""
+Precomputed k-nearest-neighbour graph over the project vectors.
+
+/related-projects is called for every project detail page. Instead of
+embedding the project text and searching the whole index on each request,
+every project's k nearest neighbours are computed up front (a blocked
+all-pairs matrix multiply) and a lookup is a dict access plus one row slice.
+
+The graph is patched incrementally: an upserted project gets a fresh list,
+lists that contained it are recomputed, and every other list only takes the
+project in if it beats that list's current k-th neighbour. Deleted projects
+free their row and only the lists that pointed at them are recomputed.
+Workers that did not run the indexer catch up by diffing against each newly
+published index snapshot.
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+from core import metrics
+from core.config import RELATED_GRAPH_K
+from core.lazy import Lazy
+from services import index_snapshot
+from services.vector_store import get_collection, on_collection_switch
+
+logger = logging.getLogger(__name__)
+
+PROJECT_PREFIX = "project_"
+BLOCK_ROWS = 1024
+# Above this fraction of changed projects a bulk rebuild is cheaper than patching
+REBUILD_FRACTION = 0.25
+# Vectors closer than this are treated as unchanged when diffing a snapshot
+CHANGE_TOLERANCE = 1e-5
+
+
+def _normalize_rows(matrix):
+    matrix = np.array(matrix, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores, k):
+    """Column indices and values of the k best scores in each row, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.zeros((len(scores), 0), dtype=np.int64), np.zeros((len(scores), 0), dtype=np.float32)
+    idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    vals = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-vals, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(vals, order, axis=1)
+
+
+class RelatedGraph:
+    """
+    Top-k cosine neighbour lists for a set of documents.
+
+    Rows are slots in fixed-capacity arrays; deleted rows go on a free list
+    and are reused by later inserts. Empty neighbour slots hold -1 / -inf.
+    """
+
+    def __init__(self, k=RELATED_GRAPH_K, dim=0):
+        self.k = k
+        self.source_version = None
+        self._lock = threading.RLock()
+        self._ids = []
+        self._rows = {}
+        self._free = []
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._neighbors = np.full((0, k), -1, dtype=np.int32)
+        self._scores = np.full((0, k), -np.inf, dtype=np.float32)
+
+    @classmethod
+    def build(cls, ids, vectors, k=RELATED_GRAPH_K, block_rows=BLOCK_ROWS):
+        """Bulk-builds the graph for `ids` with one blocked all-pairs pass."""
+        vectors = _normalize_rows(vectors) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+        graph = cls(k, vectors.shape[1])
+        graph._ids = list(ids)
+        graph._rows = {doc_id: row for row, doc_id in enumerate(graph._ids)}
+        graph._vectors = vectors
+        graph._alive = np.ones(len(ids), dtype=bool)
+        graph._neighbors, graph._scores = graph._knn(np.arange(len(ids)), block_rows)
+        return graph
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._rows
+
+    def _knn(self, rows, block_rows=BLOCK_ROWS):
+        """Exact neighbour lists for `rows`, `block_rows` rows of the score matrix at a time."""
+        neighbors = np.full((len(rows), self.k), -1, dtype=np.int32)
+        scores = np.full((len(rows), self.k), -np.inf, dtype=np.float32)
+        for start in range(0, len(rows), block_rows):
+            block = rows[start:start + block_rows]
+            sims = self._vectors[block] @ self._vectors.T
+            sims[:, ~self._alive] = -np.inf
+            sims[np.arange(len(block)), block] = -np.inf
+            idx, vals = _top_k(sims, self.k)
+            width = idx.shape[1]
+            neighbors[start:start + len(block), :width] = np.where(np.isfinite(vals), idx, -1)
+            scores[start:start + len(block), :width] = vals
+        return neighbors, scores
+
+    def neighbors(self, doc_id, n=None):
+        """The (doc_id, score) neighbour list of `doc_id`, best first, or None if unknown."""
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                return None
+            return [
+                (self._ids[r], float(s))
+                for r, s in zip(self._neighbors[row, :n], self._scores[row, :n]) if r >= 0
+            ]
+
+    def _allocate(self, doc_id, dim):
+        if self._vectors.shape[1] != dim:
+            if len(self._rows):
+                raise ValueError(f"Vector dimension {dim} does not match the graph ({self._vectors.shape[1]})")
+            self._vectors = np.zeros((len(self._alive), dim), dtype=np.float32)
+        if not self._free:
+            old = len(self._alive)
+            grow = max(old, 64)
+            self._ids.extend([None] * grow)
+            self._free.extend(range(old + grow - 1, old - 1, -1))
+            self._vectors = np.vstack([self._vectors, np.zeros((grow, dim), dtype=np.float32)])
+            self._alive = np.concatenate([self._alive, np.zeros(grow, dtype=bool)])
+            self._neighbors = np.vstack([self._neighbors, np.full((grow, self.k), -1, dtype=np.int32)])
+            self._scores = np.vstack([self._scores, np.full((grow, self.k), -np.inf, dtype=np.float32)])
+        row = self._free.pop()
+        self._ids[row] = doc_id
+        self._rows[doc_id] = row
+        return row
+
+    def upsert(self, ids, vectors):
+        """Adds or replaces the vectors of `ids` and repairs the affected lists."""
+        if not len(ids):
+            return
+        vectors = _normalize_rows(vectors)
+        with self._lock:
+            rows = []
+            for doc_id, vector in zip(ids, vectors):
+                row = self._rows.get(doc_id)
+                if row is None:
+                    row = self._allocate(doc_id, len(vector))
+                self._vectors[row] = vector
+                self._alive[row] = True
+                rows.append(row)
+            self._patch(np.asarray(rows, dtype=np.int64), inserted=True)
+
+    def delete(self, ids):
+        """Removes `ids` and recomputes the lists that pointed at them."""
+        with self._lock:
+            rows = [self._rows.pop(doc_id) for doc_id in ids if doc_id in self._rows]
+            for row in rows:
+                self._ids[row] = None
+                self._alive[row] = False
+                self._vectors[row] = 0.0
+                self._neighbors[row] = -1
+                self._scores[row] = -np.inf
+                self._free.append(row)
+            self._patch(np.asarray(rows, dtype=np.int64), inserted=False)
+
+    def _patch(self, changed, inserted):
+        if not len(changed):
+            return
+        # Lists that contained a changed row may lose it (or see its score drop)
+        stale = np.isin(self._neighbors, changed).any(axis=1) & self._alive
+        if inserted:
+            stale[changed] = True
+            sims = self._vectors @ self._vectors[changed].T
+            sims[changed, np.arange(len(changed))] = -np.inf
+            others = np.flatnonzero(self._alive & ~stale)
+            improved = others[sims[others].max(axis=1) > self._scores[others, -1]]
+            if len(improved):
+                idx = np.hstack([self._neighbors[improved], np.broadcast_to(changed, (len(improved), len(changed)))])
+                vals = np.hstack([self._scores[improved], sims[improved]])
+                top, top_vals = _top_k(vals, self.k)
+                self._neighbors[improved] = np.where(
+                    np.isfinite(top_vals), np.take_along_axis(idx, top, axis=1), -1
+                )
+                self._scores[improved] = top_vals
+        stale_rows = np.flatnonzero(stale)
+        if len(stale_rows):
+            self._neighbors[stale_rows], self._scores[stale_rows] = self._knn(stale_rows)
+
+    def diff(self, ids, vectors):
+        """
+        Compares the graph with a full set of (ids, vectors). Returns the
+        positions in `ids` that are new or changed, and the ids no longer present.
+        """
+        vectors = _normalize_rows(vectors) if len(ids) else np.zeros((0, self._vectors.shape[1]), dtype=np.float32)
+        with self._lock:
+            rows = np.fromiter((self._rows.get(doc_id, -1) for doc_id in ids), dtype=np.int64, count=len(ids))
+            known = rows >= 0
+            changed = ~known
+            if known.any() and vectors.shape[1] == self._vectors.shape[1]:
+                delta = np.abs(self._vectors[rows[known]] - vectors[known]).max(axis=1)
+                changed[np.flatnonzero(known)[delta > CHANGE_TOLERANCE]] = True
+            elif known.any():
+                changed[:] = True
+            removed = set(self._rows).difference(ids)
+        return np.flatnonzero(changed), removed
+
+    def check_consistency(self, sample_size=None, seed=0):
+        """
+        Compares neighbour lists against a brute-force search over the current
+        vectors. A list counts as consistent when its scores match the exact
+        top-k scores (so ties may pick different documents).
+        """
+        with self._lock:
+            alive = np.flatnonzero(self._alive)
+            if sample_size is not None and sample_size < len(alive):
+                alive = np.sort(np.random.default_rng(seed).choice(alive, sample_size, replace=False))
+            exact_neighbors, exact_scores = self._knn(alive)
+            stored_neighbors, stored_scores = self._neighbors[alive], self._scores[alive]
+        score_match = np.isclose(stored_scores, exact_scores, atol=1e-4) | (
+            np.isinf(stored_scores) & np.isinf(exact_scores)
+        )
+        inconsistent = int((~score_match.all(axis=1)).sum())
+        found = sum(
+            len(set(a[a >= 0]).intersection(b[b >= 0])) for a, b in zip(stored_neighbors, exact_neighbors)
+        )
+        expected = int((exact_neighbors >= 0).sum())
+        return {
+            "checked": len(alive),
+            "inconsistent_lists": inconsistent,
+            "recall": found / expected if expected else 1.0,
+        }
+
+
+# --- Service-wide graph ---
+
+def _load_projects():
+    """Ids, vectors and snapshot version of every indexed project."""
+    snapshot = index_snapshot.get_snapshot()
+    if snapshot is not None:
+        start, end = snapshot.rows("project")
+        ids = [snapshot.doc_id(row) for row in range(start, end)]
+        return ids, np.asarray(snapshot.embeddings[start:end], dtype=np.float32), snapshot.version
+    ids, embeddings, _ = index_snapshot.export_from_collection(get_collection(), where={"doc_type": "project"})
+    vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+    return ids, vectors, None
+
+
+def _build():
+    ids, vectors, version = _load_projects()
+    with metrics.track("related_graph", "build"):
+        graph = RelatedGraph.build(ids, vectors)
+    graph.source_version = version
+    logger.info(f"Related-projects graph built for {len(graph)} projects (k={graph.k})")
+    return graph
+
+
+_graph = Lazy(_build, name="related_graph")
+# A blue/green switch serves other vectors; rebuild from them on next use
+on_collection_switch(_graph.reset)
+_sync_lock = threading.Lock()
+
+
+def _sync_with_snapshot(graph, snapshot):
+    start, end = snapshot.rows("project")
+    ids = [snapshot.doc_id(row) for row in range(start, end)]
+    vectors = np.asarray(snapshot.embeddings[start:end], dtype=np.float32)
+    changed, removed = graph.diff(ids, vectors)
+    if len(changed) + len(removed) > REBUILD_FRACTION * max(len(ids), 1):
+        with metrics.track("related_graph", "build"):
+            fresh = RelatedGraph.build(ids, vectors, k=graph.k)
+        fresh.source_version = snapshot.version
+        _graph.set(fresh)
+        return
+    with metrics.track("related_graph", "patch"):
+        graph.delete(removed)
+        graph.upsert([ids[i] for i in changed], vectors[changed])
+    graph.source_version = snapshot.version
+
+
+def get_graph():
+    """
+    Returns the graph, building it on first use. When a newer index snapshot
+    has been published, the first caller patches the graph to match it while
+    concurrent callers keep reading the current one.
+    """
+    graph = _graph.get()
+    snapshot = index_snapshot.get_snapshot()
+    if snapshot is not None and snapshot.version != graph.source_version and _sync_lock.acquire(blocking=False):
+        try:
+            graph = _graph.get()
+            if snapshot.version != graph.source_version:
+                _sync_with_snapshot(graph, snapshot)
+        finally:
+            _sync_lock.release()
+        graph = _graph.get()
+    return graph
+
+
+def find_related_project_ids(project_id, n_results=6):
+    """Neighbour doc ids of a project, or None when it is not in the graph."""
+    with metrics.track("related_graph", "lookup"):
+        neighbors = get_graph().neighbors(PROJECT_PREFIX + project_id, n_results)
+    return None if neighbors is None else [doc_id for doc_id, _ in neighbors]
+
+
+def upsert_projects(ids, vectors):
+    """Applies freshly indexed project vectors, if the graph has been built."""
+    if _graph.is_initialized() and len(ids):
+        with metrics.track("related_graph", "patch"):
+            _graph.get().upsert(ids, vectors)
+
+
+def delete_projects(ids):
+    """Removes deleted projects, if the graph has been built."""
+    if _graph.is_initialized():
+        with metrics.track("related_graph", "patch"):
+            _graph.get().delete(ids)
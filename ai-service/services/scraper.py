@@ -1,11 +1,41 @@
 # File: services/scraper.py
 import requests
 from bs4 import BeautifulSoup
+from core.config import SCRAPER_MAX_PAGE_BYTES, SCRAPER_MAX_PAGE_CHARS
 from core.model_manager import ModelManager
+from core import metrics
+from core import rate_limiter
+from core import request_deadline
+from core.lazy import Lazy
 import concurrent.futures
+import logging
 
-# Initialize summarization model via ModelManager (handles genai client internally)
-summarization_model = ModelManager()
+try:
+    # C-backed incremental HTML parser; without it pages are parsed whole with BeautifulSoup
+    from lxml import etree
+except ImportError:
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the socket at a time while streaming a page
+FETCH_CHUNK_BYTES = 16 * 1024
+# Content types worth parsing; anything else (PDFs, images, feeds) is skipped unread
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+PAGE_BYTES = metrics.histogram(
+    "modx_ai_scraper_page_bytes",
+    "Bytes read per scraped page before extraction stopped.",
+    buckets=(4096, 16384, 65536, 131072, 262144, 524288, 1048576, 2097152),
+)
+PAGES_SKIPPED = metrics.counter(
+    "modx_ai_scraper_pages_skipped_total",
+    "Scraped pages not parsed, by reason.",
+    ["reason"],
+)
+
+# Summarization model via ModelManager (handles genai client internally), built on first use
+summarization_model = Lazy(ModelManager, name="summarization_model")
 
 # --- Helper Functions ---
 
@@ -14,7 +44,8 @@ def _get_top_search_links(query: str, num_links: int = 5) -> list[str]:
     try:
         search_url = f"https://html.duckduckgo.com/html/?q={query}"
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(search_url, headers=headers, timeout=5)
+        with metrics.track("scraper", "search"):
+            response = requests.get(search_url, headers=headers, timeout=request_deadline.bound(5))
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -23,27 +54,184 @@ def _get_top_search_links(query: str, num_links: int = 5) -> list[str]:
         links = [a['href'] for a in soup.find_all('a', class_='result__a')[:num_links]]
         return links
     except requests.RequestException as e:
-        print(f"Error fetching search results: {e}")
+        logger.warning(f"Error fetching search results: {e}")
         return []
 
+def extract_text_bs4(html, max_chars=SCRAPER_MAX_PAGE_CHARS):
+    """Paragraph text of the page's <main>, else its first <article>, else <body>, parsed whole."""
+    soup = BeautifulSoup(html, 'html.parser')
+    main_content = soup.find('main') or soup.find('article') or soup.body
+    if main_content is None:
+        return ""
+    full_text = " ".join([p.get_text(strip=True) for p in main_content.find_all('p')])
+    return full_text[:max_chars]
+
+
+class _Paragraphs:
+    """Paragraph texts collected from one container, up to a character budget."""
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.texts = []
+        self.chars = -1  # no separator before the first paragraph
+        self.started = False
+        self.closed = False
+
+    @property
+    def full(self):
+        return self.chars >= self.max_chars
+
+    def add(self, text):
+        if not self.full:
+            self.texts.append(text)
+            self.chars += len(text) + 1
+
+    def text(self):
+        return " ".join(self.texts)[:self.max_chars]
+
+
+class ParagraphExtractor:
+    """
+    Incremental version of `extract_text_bs4` on lxml's pull parser. Bytes
+    are fed as they arrive and each <p> is read when it closes, into three
+    buckets: the first <main>, the first <article> and the whole <body>.
+    `done` turns true once the best container seen so far (main, then
+    article, then body) has filled the budget, or the first <main> has
+    closed, so the caller can stop downloading. A <main> that only starts
+    after the budget is already full from an <article> or the <body> is
+    not waited for.
+    """
+
+    def __init__(self, max_chars=SCRAPER_MAX_PAGE_CHARS, encoding=None):
+        try:
+            self.parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        except LookupError:
+            # A charset libxml2 does not know; let it detect the encoding from the page
+            self.parser = etree.HTMLPullParser(events=("start", "end"))
+        self.main = _Paragraphs(max_chars)
+        self.article = _Paragraphs(max_chars)
+        self.body = _Paragraphs(max_chars)
+        self._open = {}  # "main"/"article" -> the element being read
+        self._paragraph_depth = 0
+
+    def _best(self):
+        return self.main if self.main.started else self.article if self.article.started else self.body
+
+    @property
+    def done(self):
+        return self.main.closed or self._best().full
+
+    def feed(self, data):
+        self.parser.feed(data)
+        self._read_events()
+
+    def _read_events(self):
+        for event, element in self.parser.read_events():
+            tag = element.tag
+            if not isinstance(tag, str):
+                continue
+            if event == "start":
+                if tag == "p":
+                    self._paragraph_depth += 1
+                elif tag in ("main", "article") and not getattr(self, tag).started:
+                    getattr(self, tag).started = True
+                    self._open[tag] = element
+                continue
+            if tag == "p":
+                self._paragraph_depth -= 1
+                # get_text() leaves out script and style contents too
+                etree.strip_elements(element, "script", "style", "template", with_tail=False)
+                text = "".join(s.strip() for s in element.itertext())
+                self.body.add(text)
+                for container in self._open:
+                    getattr(self, container).add(text)
+            for container, open_element in list(self._open.items()):
+                if element is open_element:
+                    getattr(self, container).closed = True
+                    del self._open[container]
+            # Free what has been read; inline elements of an open <p> are still needed
+            if self._paragraph_depth == 0 and tag not in ("html", "body"):
+                element.clear(keep_tail=True)
+
+    def text(self):
+        if not self.done:
+            try:
+                self.parser.close()
+            except etree.LxmlError:
+                pass
+            self._read_events()
+        return self._best().text()
+
+
+class _BufferedExtractor:
+    """Fallback without lxml: buffers the (byte-capped) page and parses it at the end."""
+
+    done = False
+
+    def __init__(self, max_chars=SCRAPER_MAX_PAGE_CHARS, encoding=None):
+        self.max_chars = max_chars
+        self.encoding = encoding
+        self.chunks = []
+
+    def feed(self, data):
+        self.chunks.append(data)
+
+    def text(self):
+        data = b"".join(self.chunks)
+        try:
+            html = data.decode(self.encoding or "utf-8", errors="replace")
+        except LookupError:
+            html = data.decode("utf-8", errors="replace")
+        return extract_text_bs4(html, self.max_chars)
+
+
+def _charset(content_type):
+    for param in content_type.split(";")[1:]:
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            return value.strip('"\' ').lower()
+    return None
+
+
+def read_page_text(response, max_bytes=SCRAPER_MAX_PAGE_BYTES, max_chars=SCRAPER_MAX_PAGE_CHARS):
+    """
+    Streams the body of a `stream=True` response into the paragraph extractor
+    and stops as soon as it has `max_chars` of text or `max_bytes` have been
+    read. Non-HTML responses are skipped without reading the body.
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if content_type and not content_type.split(";")[0].strip().lower().startswith(HTML_CONTENT_TYPES):
+        PAGES_SKIPPED.inc(reason="content_type")
+        return ""
+    extractor = (ParagraphExtractor if etree is not None else _BufferedExtractor)(max_chars, _charset(content_type))
+    read = 0
+    for chunk in response.iter_content(chunk_size=FETCH_CHUNK_BYTES):
+        request_deadline.check("scraper:fetch")
+        chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        extractor.feed(chunk)
+        if extractor.done:
+            break
+        if read >= max_bytes:
+            PAGES_SKIPPED.inc(reason="truncated")
+            break
+    PAGE_BYTES.observe(read)
+    return extractor.text()
+
+
 def _scrape_and_clean_page(url: str) -> str:
     """Visits a single URL and extracts the main text content."""
     try:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=7)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # A common strategy is to find the main content area and extract all paragraph text
-        main_content = soup.find('main') or soup.find('article') or soup.body
-        paragraphs = main_content.find_all('p')
-        
-        # Join all paragraph texts into a single string, limiting the total length
-        full_text = " ".join([p.get_text(strip=True) for p in paragraphs])
-        return full_text[:4000] # Limit to ~4000 characters to keep it manageable
+        # Streamed: only as much of the page is downloaded as the extraction needs
+        with metrics.track("scraper", "fetch"):
+            with requests.get(url, headers=headers, timeout=request_deadline.bound(7), stream=True) as response:
+                response.raise_for_status()
+                return read_page_text(response)
     except requests.RequestException as e:
-        print(f"Error scraping URL {url}: {e}")
+        logger.warning(f"Error scraping URL {url}: {e}")
+        return ""
+    except request_deadline.DeadlineExceeded:
         return ""
 
 def _summarize_text_with_ai(text: str) -> str:
@@ -51,14 +239,30 @@ def _summarize_text_with_ai(text: str) -> str:
     if not text:
         return ""
     try:
+        request_deadline.check("scraper:summarize")
         prompt = f"Please summarize the following text into a few key bullet points:\n\n---\n{text}\n---"
-        response = summarization_model.generate_content(prompt)
+        # Summaries queue behind interactive chat turns for Gemini quota
+        with rate_limiter.priority("background"), metrics.track("scraper", "summarize"):
+            response = summarization_model.get().generate_content(prompt)
         return response.text.strip()
+    except request_deadline.DeadlineExceeded:
+        return ""
     except Exception as e:
-        print(f"Error during AI summarization: {e}")
+        logger.warning(f"Error during AI summarization: {e}")
         return "Could not summarize content."
 
 
+def _results_in_time(futures):
+    """Results of the futures that finish before the request's deadline, in completion order."""
+    results = []
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=request_deadline.remaining()):
+            results.append(future.result())
+    except concurrent.futures.TimeoutError:
+        logger.warning(f"Scraper: deadline reached with {len(futures) - len(results)} of {len(futures)} tasks unfinished.")
+    return results
+
+
 # --- Main Scraper Function ---
 
 def scrape_for_info(query: str) -> str:
@@ -67,23 +271,29 @@ def scrape_for_info(query: str) -> str:
     It finds the top 5 links, scrapes each one in parallel, summarizes the content,
     and returns a consolidated report.
     """
-    print(f"Starting advanced web scrape for query: '{query}'")
+    logger.debug("Starting advanced web scrape for query: %r", query, extra={"event": "scraper.start"})
     
     # 1. Discover the top URLs
+    request_deadline.check("scraper:search")
     urls = _get_top_search_links(query)
     if not urls:
         return "I couldn't find any relevant websites for that topic."
 
-    # 2. Scrape and summarize each URL in parallel for speed
+    # 2. Scrape and summarize each URL in parallel for speed. Within a request
+    # deadline, pages and summaries still running when it passes are dropped.
     summaries = []
-    with concurrent.futures.ThreadPoolExecutor() as executor:
+    executor = concurrent.futures.ThreadPoolExecutor()
+    try:
         # Scrape the raw text from each page
-        future_to_url = {executor.submit(_scrape_and_clean_page, url): url for url in urls}
-        raw_texts = [future.result() for future in concurrent.futures.as_completed(future_to_url)]
+        future_to_url = {request_deadline.submit(executor, _scrape_and_clean_page, url): url for url in urls}
+        raw_texts = _results_in_time(future_to_url)
         
         # Summarize the raw text from each page
-        future_to_summary = {executor.submit(_summarize_text_with_ai, text): text for text in raw_texts}
-        summaries = [future.result() for future in concurrent.futures.as_completed(future_to_summary)]
+        future_to_summary = {request_deadline.submit(executor, _summarize_text_with_ai, text): text for text in raw_texts}
+        summaries = _results_in_time(future_to_summary)
+    finally:
+        # Don't wait for work the deadline cut off
+        executor.shutdown(wait=request_deadline.current() is None, cancel_futures=True)
 
     # 3. Consolidate the results into a final report
     final_context = "I found the following information from the web:\n\n"
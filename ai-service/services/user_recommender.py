@@ -0,0 +1,169 @@
+"""
+Project recommendations for a user, from the user's stored vector.
+
+Every indexed user already has a `user_<id>` vector in the collection (and
+in the index snapshot), built from the same profile text the backend used to
+send to /recommendations. Recommending by user id reads that vector instead
+of embedding the profile again, optionally blends in the vectors of projects
+the user recently engaged with, and searches the projects directly.
+
+Results are cached per user and invalidated when:
+- the user's document is re-indexed or deleted in this worker (`invalidate_users`);
+- a different index snapshot is being served (another worker indexed);
+- the served collection changes (blue/green switch).
+USER_RECOMMENDATION_CACHE_TTL_SECONDS bounds staleness when neither a
+snapshot nor a local re-index signals the change.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from core import metrics
+from core.config import (
+    USER_RECOMMENDATION_ACTIVITY_WEIGHT,
+    USER_RECOMMENDATION_CACHE_MAX,
+    USER_RECOMMENDATION_CACHE_TTL_SECONDS,
+)
+from services import index_snapshot
+from services.vector_store import find_projects_near, get_collection, on_collection_switch
+
+USER_PREFIX = "user_"
+PROJECT_PREFIX = "project_"
+
+USER_RECOMMENDATIONS = metrics.counter(
+    "modx_ai_user_recommendations_total",
+    "Recommend-by-user requests by how they were served (cache, stored_vector, not_indexed).",
+    ["source"],
+)
+
+
+class UserNotIndexedError(Exception):
+    """The user has no vector in the index yet."""
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _stored_vectors(doc_ids, snapshot):
+    """Stored embeddings for `doc_ids` from the snapshot, falling back to one Chroma get."""
+    vectors, missing = {}, []
+    for doc_id in doc_ids:
+        vector = snapshot.vector(doc_id) if snapshot is not None else None
+        if vector is None:
+            missing.append(doc_id)
+        else:
+            vectors[doc_id] = vector
+    if missing:
+        with metrics.track("chroma", "get"):
+            result = get_collection().get(ids=missing, include=["embeddings"])
+        for doc_id, embedding in zip(result["ids"], result["embeddings"]):
+            vectors[doc_id] = np.asarray(embedding, dtype=np.float32)
+    return vectors
+
+
+def query_vector(user_id, recent_project_ids=(), activity_weight=USER_RECOMMENDATION_ACTIVITY_WEIGHT, snapshot=None):
+    """
+    The user's stored vector, blended with the mean of the recently engaged
+    projects' vectors (`activity_weight` of the result) when there are any.
+    """
+    user_doc = USER_PREFIX + user_id
+    project_docs = [PROJECT_PREFIX + p for p in recent_project_ids]
+    vectors = _stored_vectors([user_doc] + project_docs, snapshot)
+    if user_doc not in vectors:
+        raise UserNotIndexedError(f"User {user_id} is not indexed")
+    query = _normalize(vectors[user_doc])
+    activity = [_normalize(vectors[d]) for d in project_docs if d in vectors]
+    if activity and activity_weight > 0:
+        query = _normalize((1.0 - activity_weight) * query + activity_weight * _normalize(np.mean(activity, axis=0)))
+    return query
+
+
+class RecommendationCache:
+    """LRU of recommended ids keyed by (user, recent projects, n), tagged with the snapshot version."""
+
+    def __init__(self, max_entries=USER_RECOMMENDATION_CACHE_MAX, ttl_seconds=USER_RECOMMENDATION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            ids, stored_at, stored_version = entry
+            if stored_version != version or time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return ids
+
+    def put(self, key, version, ids):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (ids, time.monotonic(), version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_users(self, user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in user_ids]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+recommendation_cache = RecommendationCache()
+# Another collection holds other vectors for every user
+on_collection_switch(recommendation_cache.clear)
+
+
+def recommend_for_user(user_id, n_results=10, recent_project_ids=()):
+    """
+    Ids of the projects to recommend to `user_id`, best first, leaving out
+    `recent_project_ids`. Raises UserNotIndexedError when the user has no
+    stored vector.
+    """
+    recent = tuple(sorted(set(recent_project_ids or ())))
+    snapshot = index_snapshot.get_snapshot()
+    version = snapshot.version if snapshot is not None else None
+    key = (user_id, recent, n_results)
+    cached = recommendation_cache.get(key, version)
+    if cached is not None:
+        USER_RECOMMENDATIONS.inc(source="cache")
+        return list(cached)
+    try:
+        query = query_vector(user_id, recent, snapshot=snapshot)
+    except UserNotIndexedError:
+        USER_RECOMMENDATIONS.inc(source="not_indexed")
+        raise
+    # The recent projects steer the query but are already the user's; never recommend them back
+    joined = {PROJECT_PREFIX + p for p in recent}
+    ids = [doc_id for doc_id in find_projects_near(query, n_results + len(joined)) if doc_id not in joined][:n_results]
+    recommendation_cache.put(key, version, tuple(ids))
+    USER_RECOMMENDATIONS.inc(source="stored_vector")
+    return ids
+
+
+def invalidate_users(doc_ids):
+    """Drops cached recommendations of the users among `doc_ids` (user_<id> document ids)."""
+    recommendation_cache.invalidate_users(
+        doc_id[len(USER_PREFIX):] for doc_id in doc_ids if doc_id.startswith(USER_PREFIX)
+    )
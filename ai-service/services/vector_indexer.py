@@ -1,23 +1,51 @@
-from database import get_new_or_updated_documents, mark_as_indexed
-from services.vector_store import add_documents_to_store
+from database import commit_sync, read_changes
+from services.vector_store import add_documents_to_store, get_collection
+from services import index_snapshot
+from services import related_graph
+from services import user_recommender
+from services import catalog
+from core.config import INDEX_SNAPSHOT_DIR
+from core.answer_cache import answer_cache
+from core import rate_limiter
 
 
 def index_new_data():
     """Index new or updated documents from MongoDB into the vector store"""
-    documents = get_new_or_updated_documents()
+    batch = read_changes()
+    documents = batch.documents
     if not documents:
+        # Still advance the watermarks past the edits that needed nothing
+        commit_sync(batch)
         return "No new documents to index."
 
-    add_documents_to_store(documents)
+    # Bulk embeddings yield Gemini quota to interactive requests
+    with rate_limiter.priority("bulk"):
+        embeddings = add_documents_to_store(documents)
 
-    # Extract project and user IDs from document IDs
-    project_ids = [d[0].split("_")[1] for d in documents if d[0].startswith("project_")]
-    user_ids = [d[0].split("_")[1] for d in documents if d[0].startswith("user_")]
+    # Mark as indexed in MongoDB and advance the watermarks (a failed run commits nothing and is retried)
+    commit_sync(batch)
 
-    # Mark as indexed in MongoDB
-    if project_ids:
-        mark_as_indexed(project_ids, "projects")
-    if user_ids:
-        mark_as_indexed(user_ids, "users")
+    # Patch the related-projects graph with the new project vectors
+    project_rows = [i for i, d in enumerate(documents) if d[0].startswith("project_")]
+    if project_rows and len(embeddings) == len(documents):
+        related_graph.upsert_projects([documents[i][0] for i in project_rows], [embeddings[i] for i in project_rows])
+
+    # Knowledge-base answers may change with the new documents
+    answer_cache.clear()
+    # Re-indexed users get fresh recommendations
+    user_recommender.invalidate_users([d[0] for d in documents])
+    # Tool calls see the new data without waiting for the catalog's own refresh
+    catalog.after_index(upserted_ids=[d[0] for d in documents])
+
+    # Publish a new snapshot version so every worker serves the new vectors,
+    # patching the current one with just the changed rows
+    if INDEX_SNAPSHOT_DIR:
+        patched = len(embeddings) == len(documents) and index_snapshot.patch_snapshot(
+            [d[0] for d in documents], embeddings, [d[2] for d in documents], []
+        )
+        if not patched:
+            # No snapshot yet: export the whole collection once
+            index_snapshot.build_snapshot(get_collection())
+        index_snapshot.invalidate()
 
     return f"Indexed {len(documents)} documents."
@@ -1,75 +1,240 @@
-from google import genai
-import chromadb
 from core.config import (
-    EMBEDDING_MODEL, 
+    EMBEDDING_MODEL,
     CHROMA_API_KEY, 
     CHROMA_TENANT, 
     CHROMA_DATABASE,
-    GEMINI_API_KEY
+    SINGLE_FLIGHT_ENABLED,
+    COLLECTION_ALIAS_REFRESH_SECONDS,
 )
+import logging
+import threading
+import time
 
-_client = genai.Client(api_key=GEMINI_API_KEY)
+from core.single_flight import SingleFlight, normalize_text
+from core.lazy import Lazy
+from core import metrics
+from services import index_snapshot
+from services.embeddings import EmbeddingModelMismatchError, get_provider
 
-client = chromadb.CloudClient(
-    tenant=CHROMA_TENANT,
-    database=CHROMA_DATABASE,
-    api_key=CHROMA_API_KEY
-)
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME = "modx_knowledge_base"
+# Collection whose metadata holds the alias: which collection is served
+# ("current") and the one it replaced ("previous", kept for rollback)
+ALIAS_COLLECTION = f"{COLLECTION_NAME}_alias"
+# Documents per embedding request / Chroma upsert (Gemini accepts at most 100 texts per call)
+INDEX_BATCH_SIZE = 100
+
+def _connect_chroma():
+    # Imported here: chromadb is slow to import and only needed once we talk to it
+    import chromadb
+    return chromadb.CloudClient(
+        tenant=CHROMA_TENANT,
+        database=CHROMA_DATABASE,
+        api_key=CHROMA_API_KEY
+    )
+
+def open_collection(name):
+    """
+    Opens (creating if needed) collection `name` and checks that it holds
+    vectors from the active embedding model, recording the model on a new
+    collection.
+    """
+    provider = get_provider()
+    collection = _chroma_client.get().get_or_create_collection(name)
+    metadata = dict(collection.metadata or {})
+    model = metadata.get("embedding_model")
+    if model is None and collection.count():
+        # Collections indexed before the model was recorded hold Gemini embeddings
+        model = EMBEDDING_MODEL
+    if model is not None and model != provider.name:
+        raise EmbeddingModelMismatchError(
+            f"Collection {name} holds {model} embeddings but the active provider is "
+            f"{provider.name}; reindex into a fresh collection before switching models."
+        )
+    if metadata.get("embedding_model") is None:
+        metadata["embedding_model"] = provider.name
+        collection.modify(metadata=metadata)
+    return collection
+
+_chroma_client = Lazy(_connect_chroma, name="chroma_client")
+
+def get_chroma_client():
+    """Returns the Chroma Cloud client, connecting on first use."""
+    return _chroma_client.get()
+
+def read_alias():
+    """
+    Returns (current, previous, switched_at) where switched_at is the Unix time
+    of the last switch. Before the first blue/green reindex the alias is unset
+    and the original collection is served.
+    """
+    metadata = _chroma_client.get().get_or_create_collection(ALIAS_COLLECTION).metadata or {}
+    return metadata.get("current") or COLLECTION_NAME, metadata.get("previous") or None, metadata.get("switched_at")
+
+def write_alias(current, previous):
+    """Points the alias at `current` in one metadata write (Chroma metadata cannot hold None)."""
+    _chroma_client.get().get_or_create_collection(ALIAS_COLLECTION).modify(
+        metadata={"current": current, "previous": previous or "", "switched_at": time.time()}
+    )
+
+# The collection being served; the alias is re-read at most every
+# COLLECTION_ALIAS_REFRESH_SECONDS so every worker follows a switch
+_serving = {"name": None, "collection": None, "checked_at": 0.0}
+_serving_lock = threading.Lock()
+_switch_listeners = []
+
+def on_collection_switch(callback):
+    """Registers `callback()` to run when the alias moves to another collection."""
+    _switch_listeners.append(callback)
+
+def get_collection():
+    """Returns the collection the alias points at, opening it on first use."""
+    now = time.monotonic()
+    if _serving["collection"] is not None and now - _serving["checked_at"] < COLLECTION_ALIAS_REFRESH_SECONDS:
+        return _serving["collection"]
+    switched = False
+    with _serving_lock:
+        if _serving["collection"] is None or now - _serving["checked_at"] >= COLLECTION_ALIAS_REFRESH_SECONDS:
+            try:
+                name = read_alias()[0]
+            except Exception as e:
+                if _serving["collection"] is None:
+                    raise
+                # Keep serving the collection we have until the alias can be read again
+                logger.warning(f"Could not read the collection alias: {e}")
+                name = _serving["name"]
+            if name != _serving["name"]:
+                switched = _serving["name"] is not None
+                _serving.update(name=name, collection=open_collection(name))
+                if switched:
+                    logger.info(f"Now serving collection {name}.")
+            _serving["checked_at"] = now
+        collection = _serving["collection"]
+    if switched:
+        for callback in _switch_listeners:
+            callback()
+    return collection
+
+def refresh_collection():
+    """Forces the next `get_collection()` call to re-read the alias."""
+    _serving["checked_at"] = 0.0
+
+def check_dimension(collection, dim):
+    """Records the vector size on first use and refuses vectors of any other size."""
+    metadata = dict(collection.metadata or {})
+    stored = metadata.get("embedding_dim")
+    if stored is None:
+        metadata["embedding_dim"] = dim
+        collection.modify(metadata=metadata)
+    elif stored != dim:
+        raise EmbeddingModelMismatchError(
+            f"Collection {collection.name} holds {stored}-dimensional embeddings, got {dim}"
+        )
 
-collection = client.get_or_create_collection("modx_knowledge_base")
+_embedding_flight = SingleFlight("embedding")
 
-def get_gemini_embeddings(texts):
-    """Helper to get embeddings from Gemini API."""
+def get_embeddings(texts):
+    """
+    Embeds `texts` with the configured provider (see services.embeddings).
+    Returns a bare vector for a single text, a list of vectors otherwise,
+    and [] if embedding failed.
+    """
     if isinstance(texts, str):
         texts = [texts]
-    
+    provider = get_provider()
     try:
-        result = _client.models.embed_content(
-            model=EMBEDDING_MODEL,
-            contents=texts,
-        )
-        # New SDK returns a list of ContentEmbedding objects
-        if isinstance(result.embeddings, list):
-            if len(result.embeddings) == 1:
-                return result.embeddings[0].values
-            return [e.values for e in result.embeddings]
-        return []
+        if SINGLE_FLIGHT_ENABLED:
+            # Identical concurrent requests (e.g. a trending search) share one call
+            key = (provider.name, tuple(normalize_text(t) for t in texts))
+            vectors = _embedding_flight.do(key, provider.embed, texts)
+        else:
+            vectors = provider.embed(texts)
+        return vectors[0] if len(vectors) == 1 else vectors
     except Exception as e:
-        print(f"Error getting Gemini embeddings: {e}")
+        logger.error(f"Error getting {provider.name} embeddings: {e}")
         return []
 
-def add_documents_to_store(documents_with_metadata):
-    """Adds documents with their metadata to Chroma Cloud."""
-    if not documents_with_metadata: return
-
-    ids = [item[0] for item in documents_with_metadata]
-    documents = [item[1] for item in documents_with_metadata]
-    metadatas = [item[2] for item in documents_with_metadata]
-    
-    embeddings = get_gemini_embeddings(documents)
-    
-    collection.upsert(
-        embeddings=embeddings,
-        documents=documents,
-        ids=ids,
-        metadatas=metadatas # <-- Save the metadata
-    )
-    print(f"Successfully upserted {len(documents)} documents.")
-
-def find_similar_document_ids(query_text: str, n_results=10) -> list[str]:
-    """Finds the most semantically similar documents based on a query."""
-    query_embedding = get_gemini_embeddings(query_text)
-    results = collection.query(
-        query_embeddings=query_embedding,
-        n_results=n_results,
-        where={"doc_type": "project"} # Filter to only search for projects
-    )
+def add_documents_to_store(documents_with_metadata, collection=None):
+    """
+    Adds documents with their metadata to Chroma Cloud (the served collection
+    unless `collection` is given), INDEX_BATCH_SIZE at a time, and returns
+    their embeddings. Raises if a batch cannot be embedded.
+    """
+    if not documents_with_metadata: return []
+
+    all_embeddings = []
+    for start in range(0, len(documents_with_metadata), INDEX_BATCH_SIZE):
+        batch = documents_with_metadata[start:start + INDEX_BATCH_SIZE]
+        ids = [item[0] for item in batch]
+        documents = [item[1] for item in batch]
+        metadatas = [item[2] for item in batch]
+
+        embeddings = get_embeddings(documents)
+        # get_embeddings returns a bare vector for a single text
+        if len(documents) == 1 and len(embeddings):
+            embeddings = [embeddings]
+        if len(embeddings) != len(documents):
+            raise RuntimeError(f"Embedding failed for {len(documents)} documents")
+
+        target = collection if collection is not None else get_collection()
+        check_dimension(target, len(embeddings[0]))
+        with metrics.track("chroma", "upsert"):
+            target.upsert(
+                embeddings=embeddings,
+                documents=documents,
+                ids=ids,
+                metadatas=metadatas # <-- Save the metadata
+            )
+        all_embeddings.extend(embeddings)
+    logger.info(f"Successfully upserted {len(documents_with_metadata)} documents.")
+    return all_embeddings
+
+def find_similar_document_ids(query_text: str, n_results=10, doc_ids=None) -> list[str]:
+    """Finds the most semantically similar documents based on a query (among `doc_ids` if given)."""
+    if doc_ids is not None and not doc_ids:
+        return []
+    query_embedding = get_embeddings(query_text)
+    if not len(query_embedding):
+        logger.warning(f"No embedding for {query_text!r}; returning no similar documents.")
+        return []
+    return find_projects_near(query_embedding, n_results, doc_ids)
+
+def find_projects_near(query_embedding, n_results=10, doc_ids=None) -> list[str]:
+    """Ids of the projects closest to an already computed vector (among `doc_ids` if given)."""
+    if doc_ids is not None and not doc_ids:
+        return []
+    # Serve from the shared memory-mapped snapshot when one is configured
+    snapshot = index_snapshot.get_snapshot()
+    if snapshot is not None:
+        with metrics.track("snapshot", "query"):
+            return snapshot.search_ids(query_embedding, n_results, doc_type="project", doc_ids=doc_ids)
+    if hasattr(query_embedding, "tolist"):
+        query_embedding = query_embedding.tolist()
+    collection = get_collection()
+    check_dimension(collection, len(query_embedding))
+    with metrics.track("chroma", "query"):
+        results = collection.query(
+            query_embeddings=query_embedding,
+            n_results=n_results,
+            where={"doc_type": "project"}, # Filter to only search for projects
+            ids=list(doc_ids) if doc_ids is not None else None,
+        )
     return results['ids'][0]
 
-def delete_document_from_store(doc_id: str):
-    """Deletes a document by its ID from ChromaDB."""
-    try:
-        collection.delete(ids=[doc_id])
-        print(f"✅ Deleted document {doc_id} from ChromaDB")
-    except Exception as e:
-        print(f"❌ Error deleting document {doc_id}: {e}")
\ No newline at end of file
+def delete_documents_from_store(doc_ids, collection=None):
+    """
+    Deletes documents by ID from ChromaDB (the served collection unless
+    `collection` is given) in one call and returns the ids that existed.
+    Errors are raised to the caller.
+    """
+    if not doc_ids:
+        return []
+    collection = collection if collection is not None else get_collection()
+    with metrics.track("chroma", "get"):
+        existing = collection.get(ids=list(doc_ids), include=[])["ids"]
+    if existing:
+        with metrics.track("chroma", "delete"):
+            collection.delete(ids=existing)
+    logger.info(f"Deleted {len(existing)} documents from ChromaDB")
+    return existing
\ No newline at end of file
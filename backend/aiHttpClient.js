@@ -2,14 +2,25 @@ const axios = require("axios");
 
 const AI_SERVICE_URL = process.env.PYTHON_AI_SERVICE_URL || "http://localhost:50051";
 
+const AI_TIMEOUT_MS = 60000; // 60 seconds
+// The AI service stops a chat turn this long before we give up on it, so its
+// partial answer still arrives in time
+const CHAT_DEADLINE_MARGIN_MS = 3000;
+
 const aiHttpClient = axios.create({
   baseURL: AI_SERVICE_URL,
-  timeout: 60000, // 60 seconds
+  timeout: AI_TIMEOUT_MS,
 });
 
-const getChatResponse = async (query) => {
+const getChatResponse = async (query, conversationId) => {
   try {
-    const response = await aiHttpClient.post("/chat", { query });
+    const payload = { query };
+    if (conversationId) {
+      payload.conversation_id = conversationId;
+    }
+    const response = await aiHttpClient.post("/chat", payload, {
+      headers: { "X-Request-Timeout-Ms": String(AI_TIMEOUT_MS - CHAT_DEADLINE_MARGIN_MS) },
+    });
     return response.data.answer;
   } catch (error) {
     console.error("AI HTTP Client Error (chat):", error.message);
@@ -17,9 +28,18 @@ const getChatResponse = async (query) => {
   }
 };
 
-const getUserRecommendations = async (queryText) => {
+// With userId the AI service recommends from the user's stored vector (no
+// embedding call) and only falls back to queryText if the user isn't indexed yet
+const getUserRecommendations = async (queryText, userId, recentProjectIds) => {
   try {
-    const response = await aiHttpClient.post("/recommendations", { query_text: queryText });
+    const payload = { query_text: queryText };
+    if (userId) {
+      payload.user_id = userId;
+    }
+    if (recentProjectIds && recentProjectIds.length > 0) {
+      payload.recent_project_ids = recentProjectIds;
+    }
+    const response = await aiHttpClient.post("/recommendations", payload);
     return response.data.recommended_ids;
   } catch (error) {
     console.error("AI HTTP Client Error (recommendations):", error.message);
@@ -27,9 +47,12 @@ const getUserRecommendations = async (queryText) => {
   }
 };
 
-const getRelatedProjects = async (queryText) => {
+const getRelatedProjects = async (queryText, projectId) => {
   try {
-    const response = await aiHttpClient.post("/related-projects", { query_text: queryText });
+    const response = await aiHttpClient.post("/related-projects", {
+      query_text: queryText,
+      project_id: projectId,
+    });
     return response.data.recommended_ids;
   } catch (error) {
     console.error("AI HTTP Client Error (related-projects):", error.message);
@@ -67,6 +90,17 @@ const deleteProjectFromIndex = async (projectId) => {
   }
 };
 
+// mutations: [{ op: "upsert" | "delete", doc_type: "project" | "user", id }]
+const applyIndexBatch = async (mutations) => {
+  try {
+    const response = await aiHttpClient.post("/index/batch", { mutations });
+    return response.data.results;
+  } catch (error) {
+    console.error("AI HTTP Client Error (index batch):", error.message);
+    return [];
+  }
+};
+
 module.exports = {
   getChatResponse,
   getUserRecommendations,
@@ -74,4 +108,5 @@ module.exports = {
   searchProjects,
   indexNewData,
   deleteProjectFromIndex,
+  applyIndexBatch,
 };
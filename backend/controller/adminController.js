@@ -1,7 +1,7 @@
 const User = require("../models/User");
 const Project = require("../models/Project");
 const ProjectMember = require("../models/ProjectMember");
-const { deleteProjectFromIndex } = require("../aiHttpClient");
+const { deleteProjectFromIndex, applyIndexBatch } = require("../aiHttpClient");
 const fs = require("fs");
 const path = require("path");
 
@@ -68,6 +68,7 @@ exports.deleteUser = async (req, res) => {
     }
 
     await User.findByIdAndDelete(req.params.userId);
+    await applyIndexBatch([{ op: "delete", doc_type: "user", id: req.params.userId }]);
 
     res.status(200).json({
       success: true,
@@ -3,18 +3,26 @@ const ErrorHandler = require("../utils/errorHandler");
 
 exports.getChatbotResponse = async (req, res, next) => {
   try {
-    const { query } = req.body;
+    const { query, conversationId } = req.body;
     if (!query) {
       return next(
         new ErrorHandler("A query is required to chat with the AI.", 400)
       );
     }
 
+    if (conversationId && !/^[A-Za-z0-9_-]{1,100}$/.test(conversationId)) {
+      return next(new ErrorHandler("Invalid conversation id.", 400));
+    }
+
     // --- FORWARD THE REQUEST using HTTP ---
-    const answer = await getAIResponse(query);
+    // Conversations are scoped to the logged-in user so ids cannot be shared
+    const answer = await getAIResponse(
+      query,
+      conversationId ? `${req.user.id}:${conversationId}` : undefined
+    );
 
     // Send the response from the Python service back to the user
-    res.status(200).json({ answer });
+    res.status(200).json({ answer, conversationId });
   } catch (error) {
     console.error("Error communicating with the Python AI service:", error);
     return next(
@@ -1,5 +1,6 @@
 const Project = require("../models/Project");
 const User = require("../models/User");
+const ProjectMember = require("../models/ProjectMember");
 const mongoose = require("mongoose");
 const {
   getUserRecommendations,
@@ -53,7 +54,7 @@ const fetchFullProjectDetails = async (projectIds) => {
 // 1. For the Explore Page (Personalized)
 exports.recommendForUser = async (req, res, next) => {
   try {
-    const user = await User.findById(req.user.id).select("interest otherInterest");
+    const user = await User.findById(req.user.id).select("interests skills bio");
     if (!user) return next(new ErrorHandler("User not found.", 404));
 
     let allProjects = [];
@@ -61,8 +62,17 @@ exports.recommendForUser = async (req, res, next) => {
     try {
       const profileText = `User with interests in ${user.interests?.join(", ") || "none"} and skills in ${user.skills?.join(", ") || "none"}. Bio: ${user.bio || "none"}`;
 
-      // Step 1: Try to get recommendations from AI service
-      const recommendedIdsStr = await getUserRecommendations(profileText);
+      // Projects the user recently joined or applied to steer the results
+      const recentMemberships = await ProjectMember.find({ memberId: req.user.id })
+        .sort({ updatedAt: -1 })
+        .limit(5)
+        .select("projectId")
+        .lean();
+      const recentProjectIds = recentMemberships.map((m) => m.projectId.toString());
+
+      // Step 1: Try to get recommendations from AI service (from the stored
+      // user vector; the profile text is only used if the user isn't indexed)
+      const recommendedIdsStr = await getUserRecommendations(profileText, req.user.id, recentProjectIds);
       const recommendedIds = extractProjectIds(recommendedIdsStr || []);
 
       if (recommendedIds.length > 0) {
@@ -131,7 +141,7 @@ exports.recommendRelated = async (req, res, next) => {
     const projectText = `Project titled "${project.title}" with description: ${project.description}. Technologies: ${techStr}. Skills: ${skillsStr}`;
 
     // Step 1: Get the top 6 related project IDs from the AI service
-    const recommendedIdsStr = await getRelatedProjects(projectText);
+    const recommendedIdsStr = await getRelatedProjects(projectText, currentProjectId);
     const recommendedIds = extractProjectIds(recommendedIdsStr || []).filter(
       (id) => id !== currentProjectId
     );
@@ -52,4 +52,7 @@ const projectSchema = new mongoose.Schema(
   }
 );
 
+// Incremental AI indexing reads documents changed since its watermark
+projectSchema.index({ updatedAt: 1 });
+
 module.exports = mongoose.model("Project", projectSchema);
@@ -34,5 +34,7 @@ const projectMemberSchema = new mongoose.Schema(
 
 // Compound index to ensure unique project-member combinations
 projectMemberSchema.index({ projectId: 1, memberId: 1 }, { unique: true });
+// A user's most recent memberships (recommendation activity signal)
+projectMemberSchema.index({ memberId: 1, updatedAt: -1 });
 
 module.exports = mongoose.model("ProjectMember", projectMemberSchema);
@@ -75,4 +75,7 @@ const userSchema = new mongoose.Schema(
   }
 );
 
+// Incremental AI indexing reads documents changed since its watermark
+userSchema.index({ updatedAt: 1 });
+
 module.exports = mongoose.model("User", userSchema);